@@ -1,3 +1,6 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import
 from .connection import Connection
+from .spool import Spool
+from .dedup import Deduplicator
+from .frames import FrameSet
@@ -0,0 +1,379 @@
+'''
+deadlineutils.balance
+=====================
+Spread the requests of one Connection over several Web Service instances::
+
+    connection = Connection('webservice01', 8082, endpoints=[
+        'webservice01:8082', 'webservice02:8082', 'webservice03:8082',
+    ])
+
+or discover them from the Pulse and Proxy Server infos::
+
+    connection.balance()
+
+Every endpoint has its own ConnectionProperty. A request goes to the healthy
+endpoint with the lowest expected wait, its moving average latency times
+the number of requests in flight plus one. Endpoints without a measurement
+are tried first.
+
+Health is checked passively. An endpoint failing max_failures requests in a
+row, with connection errors or 5xx responses, is ejected for eject_seconds,
+doubled on every ejection in a row up to max_eject_seconds. Afterwards it
+gets requests again and a success restores it. GETs failing on one endpoint,
+with a connection error or a 5xx response, are retried on the next. Writes
+are only retried when the request never reached the Web Service. When every
+endpoint is ejected the one returning first is used.
+
+With hedge=True a GET still running after the 95th percentile of recent GET
+latencies is sent again to a second endpoint and the first answer is used.
+GETs are idempotent, the slower answer is dropped.
+'''
+from __future__ import absolute_import
+import random
+import threading
+import time
+from collections import deque
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+from .spool import is_server_error, is_unreachable
+
+
+# Deadline Stat values of Pulse and Proxy Server infos that can not answer
+_OFFLINE = (2, 4)
+
+# Info fields holding the host and the Web Service port
+_HOST_FIELDS = ('Host', 'HostName', 'IP', 'Name')
+_PULSE_PORT_FIELDS = ('WebServicePort', 'WebSvcPort', 'WebPort')
+_PROXY_PORT_FIELDS = ('WebServicePort', 'WebPort', 'Port')
+
+
+class Endpoint(object):
+    '''
+    One Web Service instance and its measured health.
+
+    :param connection_property: Deadline.ConnectionProperty for the instance
+    '''
+
+    def __init__(self, connection_property):
+        self.connection_property = connection_property
+        self.address = connection_property.GetAddress()
+        self.latency = None
+        self.in_flight = 0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0
+        self.requests = 0
+        self.errors = 0
+
+    def cost(self):
+        '''Expected wait of the next request'''
+
+        if self.latency is None:
+            return 0
+        return self.latency * (self.in_flight + 1)
+
+    def __repr__(self):
+        return '<Endpoint {} latency={} in_flight={} failures={}>'.format(
+            self.address, self.latency, self.in_flight, self.failures
+        )
+
+
+def _field(info, fields):
+    for field in fields:
+        if info.get(field):
+            return info[field]
+    return None
+
+
+def discover(connection, default_port):
+    '''
+    Web Service addresses, host:port, of the running Pulse and Proxy Server
+    instances of a repository.
+
+    :param connection: deadlineutils.connection.Connection instance
+    :param default_port: Port used when an info has none
+    '''
+
+    sources = [(connection.Pulse.GetPulseInfos, _PULSE_PORT_FIELDS)]
+    # Older Standalone APIs have no ProxyServer request group
+    proxy_servers = getattr(connection, 'ProxyServer', None)
+    if proxy_servers is not None:
+        sources.append(
+            (proxy_servers.GetProxyServerInfos, _PROXY_PORT_FIELDS)
+        )
+
+    addresses = []
+    for get_infos, port_fields in sources:
+        try:
+            infos = get_infos()
+        except Exception:
+            continue
+        if not isinstance(infos, list):
+            continue
+        for info in infos:
+            if not isinstance(info, dict) or info.get('Stat') in _OFFLINE:
+                continue
+            host = _field(info, _HOST_FIELDS)
+            if not host:
+                continue
+            port = _field(info, port_fields) or default_port
+            address = '{}:{}'.format(host, port)
+            if address not in addresses:
+                addresses.append(address)
+    return addresses
+
+
+class LoadBalancer(object):
+    '''
+    Stands in for the ConnectionProperty of a Transport and sends each
+    request to one of several endpoints. Authentication settings are read
+    from the original ConnectionProperty.
+
+    :param connection_property: The original Deadline.ConnectionProperty
+    :param addresses: List of Web Service addresses, host:port
+    :param max_failures: Connection errors in a row that eject an endpoint
+    :param eject_seconds: Seconds of the first ejection
+    :param max_eject_seconds: Longest ejection
+    :param smoothing: Weight of a new latency sample in the moving average
+    :param hedge: Send a duplicate of a GET slower than the 95th percentile
+        of recent GETs to a second endpoint and use the first answer
+    :param min_samples: GET latencies measured before hedging starts
+    :param min_hedge_delay: Shortest wait before a GET is hedged
+    '''
+
+    def __init__(self, connection_property, addresses, max_failures=3,
+                 eject_seconds=10, max_eject_seconds=300, smoothing=0.3,
+                 hedge=False, min_samples=20, min_hedge_delay=0.01):
+        self.connection_property = connection_property
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.max_eject_seconds = max_eject_seconds
+        self.smoothing = smoothing
+        self.hedge = hedge
+        self.min_samples = min_samples
+        self.min_hedge_delay = min_hedge_delay
+        self.hedged = 0
+        self.endpoints = []
+        self._latencies = deque(maxlen=200)
+        self._lock = threading.Lock()
+        self.set_addresses(addresses)
+
+    def __getattr__(self, attr):
+        # GetAddress, SetAuthentication, ... of the original property
+        return getattr(self.connection_property, attr)
+
+    def set_addresses(self, addresses):
+        '''Replace the endpoints, keeping the health of known addresses'''
+
+        known = dict((endpoint.address, endpoint)
+                     for endpoint in self.endpoints)
+        endpoints = []
+        for address in addresses:
+            endpoint = known.get(address)
+            if endpoint is None:
+                endpoint = Endpoint(
+                    self.connection_property.__class__(address)
+                )
+            endpoints.append(endpoint)
+        if not endpoints:
+            raise ValueError('LoadBalancer needs at least one address')
+        with self._lock:
+            self.endpoints = endpoints
+
+    def _choose(self, exclude):
+        now = time.time()
+        with self._lock:
+            candidates = [
+                endpoint for endpoint in self.endpoints
+                if endpoint not in exclude
+            ]
+            if not candidates:
+                return None
+            healthy = [
+                endpoint for endpoint in candidates
+                if endpoint.ejected_until <= now
+            ]
+            if healthy:
+                random.shuffle(healthy)
+                endpoint = min(healthy, key=Endpoint.cost)
+            else:
+                endpoint = min(
+                    candidates, key=lambda endpoint: endpoint.ejected_until
+                )
+            endpoint.in_flight += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def _done(self, endpoint, started, error=None):
+        with self._lock:
+            endpoint.in_flight -= 1
+            if error is None:
+                latency = time.time() - started
+                if endpoint.latency is None:
+                    endpoint.latency = latency
+                else:
+                    endpoint.latency += self.smoothing * (
+                        latency - endpoint.latency
+                    )
+                endpoint.failures = 0
+                endpoint.ejections = 0
+                return
+
+            endpoint.errors += 1
+            endpoint.failures += 1
+            if endpoint.failures >= self.max_failures:
+                seconds = min(
+                    self.eject_seconds * 2 ** endpoint.ejections,
+                    self.max_eject_seconds,
+                )
+                endpoint.ejected_until = time.time() + seconds
+                endpoint.ejections += 1
+                # One more failure after the ejection ejects it again
+                endpoint.failures = self.max_failures - 1
+
+    def _sync(self, endpoint):
+        original = self.connection_property
+        target = endpoint.connection_property
+        target.useAuth = original.useAuth
+        target.user = original.user
+        target.password = original.password
+        if hasattr(original, 'timeout'):
+            target.timeout = original.timeout
+
+    def _attempt(self, endpoint, method, command, body, timeout):
+        self._sync(endpoint)
+        connection_property = endpoint.connection_property
+        args = (command,) if method in ('GET', 'DELETE') else (command, body)
+        if timeout is not None:
+            args += (timeout,)
+
+        started = time.time()
+        try:
+            if method == 'GET':
+                result = connection_property.__get__(*args)
+            elif method == 'DELETE':
+                result = connection_property.__delete__(*args)
+            elif method == 'PUT':
+                result = connection_property.__put__(*args)
+            else:
+                result = connection_property.__post__(*args)
+        except Exception as e:
+            self._done(endpoint, started, e)
+            raise
+        if is_server_error(result):
+            # DeadlineSend returns 5xx responses instead of raising
+            self._done(endpoint, started, result)
+            return result
+        self._done(endpoint, started)
+        if method == 'GET':
+            self._latencies.append(time.time() - started)
+        return result
+
+    def hedge_delay(self):
+        '''
+        Seconds after which a GET is hedged, the 95th percentile of recent
+        GET latencies. None until min_samples were measured.
+        '''
+
+        latencies = sorted(self._latencies)
+        if len(latencies) < self.min_samples:
+            return None
+        return max(latencies[int(len(latencies) * 0.95) - 1],
+                   self.min_hedge_delay)
+
+    def send(self, method, command, body=None, timeout=None):
+        '''
+        Send a request to the best endpoint, retrying on the others
+
+        :param method: GET, PUT, POST or DELETE
+        :param command: Web Service url path and query
+        :param body: Request body for PUT and POST
+        :param timeout: Timeout in seconds of this request
+        '''
+
+        if method == 'GET' and self.hedge and len(self.endpoints) > 1:
+            delay = self.hedge_delay()
+            if delay is not None:
+                return self._send_hedged(command, timeout, delay)
+        return self._send(method, command, body, timeout, [], None)
+
+    def _send(self, method, command, body, timeout, tried, failure):
+        # failure is the exception or 5xx response of the last attempt,
+        # returned or raised when no endpoint is left to try
+        while True:
+            endpoint = self._choose(tried)
+            if endpoint is None:
+                if isinstance(failure, Exception):
+                    raise failure
+                return failure
+            tried.append(endpoint)
+            try:
+                result = self._attempt(
+                    endpoint, method, command, body, timeout
+                )
+            except Exception as e:
+                failure = e
+                if method == 'GET' or is_unreachable(e):
+                    continue
+                raise
+            if method == 'GET' and is_server_error(result):
+                failure = result
+                continue
+            return result
+
+    def _send_hedged(self, command, timeout, delay):
+        results = queue.Queue()
+
+        def attempt(endpoint):
+            try:
+                result = self._attempt(
+                    endpoint, 'GET', command, None, timeout
+                )
+            except Exception as e:
+                results.put((False, e))
+            else:
+                results.put((not is_server_error(result), result))
+
+        def start(endpoint):
+            thread = threading.Thread(target=attempt, args=(endpoint,))
+            thread.daemon = True
+            thread.start()
+
+        tried = [self._choose([])]
+        start(tried[0])
+        pending = 1
+        try:
+            ok, value = results.get(timeout=delay)
+        except queue.Empty:
+            # Slower than the 95th percentile, race a second endpoint
+            second = self._choose(tried)
+            if second is not None:
+                tried.append(second)
+                self.hedged += 1
+                start(second)
+                pending += 1
+            ok, value = results.get()
+        pending -= 1
+
+        while not ok and pending:
+            ok, value = results.get()
+            pending -= 1
+        if ok:
+            return value
+        return self._send('GET', command, None, timeout, tried, value)
+
+    def __get__(self, commandString, timeout=None):
+        return self.send('GET', commandString, timeout=timeout)
+
+    def __put__(self, commandString, body, timeout=None):
+        return self.send('PUT', commandString, body, timeout)
+
+    def __delete__(self, commandString, timeout=None):
+        return self.send('DELETE', commandString, timeout=timeout)
+
+    def __post__(self, commandString, body, timeout=None):
+        return self.send('POST', commandString, body, timeout)
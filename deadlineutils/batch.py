@@ -0,0 +1,166 @@
+'''
+deadlineutils.batch
+===================
+Coalesce task and job commands into as few Web Service requests as possible::
+
+    with connection.batch() as batch:
+        for task_id in failed_task_ids:
+            connection.Tasks.RequeueJobTask(job_id, task_id)
+
+    print(batch.results)
+
+Inside the block task commands (requeue, complete, suspend, fail, resume,
+resumefailed, pend, releasepending) and single job commands (suspend,
+resume, requeue, ...) are held back and return None. On exit they are merged
+into list-form PUTs per command and job, and sent with one thread per job.
+
+Commands for the same job are sent in the order they were issued. A command is
+only merged into an earlier one when no command issued in between touches the
+same tasks, so the final state of every task matches sending them one by one.
+Other requests, including reads, pass straight through.
+'''
+from __future__ import absolute_import
+import json
+from collections import OrderedDict
+
+from .workers import run
+
+
+TASK_COMMANDS = (
+    'requeue', 'complete', 'suspend', 'fail', 'resume', 'resumefailed',
+    'pend', 'releasepending',
+)
+JOB_COMMANDS = (
+    'suspend', 'suspendnonrendering', 'resume', 'resumefailed', 'requeue',
+    'archive', 'pend', 'releasepending', 'complete', 'fail',
+    'updatesubmissiondate',
+)
+
+
+class _Group(object):
+
+    def __init__(self, route, command, tasks):
+        self.route = route
+        self.command = command
+        # None stands for every task of the job
+        self.tasks = tasks
+
+    def conflicts(self, tasks):
+        return self.tasks is None or tasks is None or bool(self.tasks & tasks)
+
+    def body(self, job_id):
+        data = OrderedDict([('Command', self.command), ('JobID', job_id)])
+        if self.tasks is not None:
+            data['TaskList'] = sorted(self.tasks)
+        return json.dumps(data)
+
+
+class Batch(object):
+    '''
+    Transport interceptor that holds back task and job commands until the
+    batch is flushed. Use Connection.batch to create one.
+
+    :param transport: deadlineutils.transport.Transport instance
+    :param max_workers: Number of jobs sent concurrently on flush
+    '''
+
+    def __init__(self, transport, max_workers=8):
+        self.transport = transport
+        self.max_workers = max_workers
+        self.results = []
+        self._jobs = OrderedDict()
+        self._send = None
+
+    def __enter__(self):
+        self.transport.push(self)
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.transport.remove(self)
+        self.flush()
+        return False
+
+    def __call__(self, method, command, body, send):
+        if method == 'PUT' and command in ('/api/tasks', '/api/jobs'):
+            self._send = send
+            if self._add(command, body):
+                return None
+        return send(method, command, body)
+
+    def _add(self, route, body):
+        try:
+            data = json.loads(body)
+        except (TypeError, ValueError):
+            return False
+
+        command = data.get('Command', '').lower()
+        job_id = data.get('JobID')
+        if not isinstance(job_id, (type(u''), str)):
+            return False
+
+        if route == '/api/tasks':
+            if command not in TASK_COMMANDS:
+                return False
+            if set(data) - set(['Command', 'JobID', 'TaskList']):
+                return False
+            tasks = data.get('TaskList')
+            if tasks is not None:
+                if not isinstance(tasks, list):
+                    tasks = [tasks]
+                tasks = set(int(task) for task in tasks)
+        else:
+            if command not in JOB_COMMANDS:
+                return False
+            if set(data) - set(['Command', 'JobID']):
+                return False
+            tasks = None
+
+        groups = self._jobs.setdefault(job_id, [])
+        for index in range(len(groups) - 1, -1, -1):
+            group = groups[index]
+            if group.route == route and group.command == command:
+                if group.tasks is not None and tasks is not None:
+                    group.tasks.update(tasks)
+                    return True
+                if route == '/api/jobs' or group.tasks is None:
+                    # Repeating a job command or an all tasks command
+                    return True
+                group.tasks = None
+                return True
+            if group.conflicts(tasks):
+                break
+
+        groups.append(_Group(route, command, tasks))
+        return True
+
+    def __len__(self):
+        '''Number of requests the batch will send'''
+
+        return sum(len(groups) for groups in self._jobs.values())
+
+    def flush(self):
+        '''
+        Send the held back commands, one thread per job. Results are appended
+        to Batch.results as (route, command, job_id, task_ids, result).
+        '''
+
+        jobs = list(self._jobs.items())
+        self._jobs = OrderedDict()
+        if not jobs:
+            return
+
+        send = self._send or self.transport.send
+
+        def send_job(item):
+            job_id, groups = item
+            results = []
+            for group in groups:
+                result = send('PUT', group.route, group.body(job_id))
+                tasks = None if group.tasks is None else sorted(group.tasks)
+                results.append(
+                    (group.route, group.command, job_id, tasks, result)
+                )
+            return results
+
+        for results in run(send_job, jobs, self.max_workers):
+            self.results.extend(results)
@@ -0,0 +1,217 @@
+'''
+deadlineutils.benchmark
+=======================
+Microbenchmarks of the client side cost of Web Service requests::
+
+    python -m deadlineutils.benchmark submit_jobs --jobs 1000
+    python -m deadlineutils.benchmark info_files --lines 10000
+
+submit_jobs times building the Jobs.SubmitJobs body of a batch of jobs, read
+whole when it is streamed, and decoding a response listing them, with every
+importable backend of Deadline.DeadlineJSON and with the previous string
+concatenation and replace-then-json.loads code. No request is sent.
+
+info_files times encoding an info file of many lines with Jobs.fileRead and
+with the previous concatenating parser, and reading a directory of info files
+one by one and with read_info_directory.
+'''
+from __future__ import absolute_import, print_function
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import timeit
+
+from .infofiles import read_info_directory, read_info_file
+from .packages.Deadline import DeadlineJSON
+from .packages.Deadline.Jobs import Jobs, fileRead
+
+
+class _Capture(object):
+    '''ConnectionProperty returning request bodies instead of sending them'''
+
+    def __post__(self, commandString, body, timeout=None):
+        return body
+
+
+def sample_job(index):
+    '''Job info and plugin info of a typical Maya render job'''
+
+    job_info = dict(
+        ('ExtraInfoKeyValue{}'.format(key), 'Value {}'.format(key))
+        for key in range(10)
+    )
+    job_info.update({
+        'Name': 'shot_{:04d}_lighting_v{:03d}'.format(index, index % 7),
+        'BatchName': 'shot_{:04d}'.format(index),
+        'UserName': 'artist',
+        'Plugin': 'MayaBatch',
+        'Frames': '1001-1100',
+        'ChunkSize': 5,
+        'Pool': 'maya',
+        'Group': 'gpu',
+        'Priority': 50,
+        'Comment': 'Lighting pass with "quotes" and \\ backslashes',
+        'OutputDirectory0': '/mnt/renders/shot_{:04d}/v001'.format(index),
+        'OutputFilename0': 'beauty.####.exr',
+    })
+    plugin_info = {
+        'SceneFile': '/mnt/projects/show/shot_{:04d}.ma'.format(index),
+        'Version': '2018',
+        'Renderer': 'arnold',
+        'ProjectPath': '/mnt/projects/show',
+        'OutputFilePath': '/mnt/renders/shot_{:04d}/v001'.format(index),
+        'Camera': 'renderCam',
+        'Width': 1920,
+        'Height': 1080,
+        'UsingRenderLayers': True,
+    }
+    return {'JobInfo': job_info, 'PluginInfo': plugin_info, 'AuxFiles': []}
+
+
+def _legacy_submit_jobs_body(jobs, dependent=False):
+    return ('{"Jobs":' + json.dumps(jobs) + ',"Dependent":"'
+            + str(dependent).lower() + '"}')
+
+
+def _drain(body):
+    '''Text of a request body, reading streamed ChunkedBody bodies whole'''
+
+    if not hasattr(body, 'read'):
+        return body
+    parts = []
+    while True:
+        part = body.read()
+        if not part:
+            return ''.join(parts)
+        parts.append(part)
+
+
+def _legacy_decode(data):
+    return json.loads(data.replace('\n', ' '))
+
+
+def _best(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat))
+
+
+def submit_jobs(count=1000, repeat=5):
+    '''
+    Seconds to encode a SubmitJobs body and decode a response of count jobs.
+    Returns a list of (codec, encode seconds, decode seconds).
+
+    :param count: Number of jobs
+    :param repeat: Runs per measurement, the fastest one is reported
+    '''
+
+    jobs = [sample_job(index) for index in range(count)]
+    response = json.dumps(
+        [dict(job, _id='{:024x}'.format(index))
+         for index, job in enumerate(jobs)],
+        indent=1,
+    )
+
+    results = [(
+        'concatenation',
+        _best(lambda: _legacy_submit_jobs_body(jobs), repeat),
+        _best(lambda: _legacy_decode(response), repeat),
+    )]
+
+    api = Jobs(_Capture())
+    previous = (
+        DeadlineJSON.GetBackend(), DeadlineJSON.dumps, DeadlineJSON.loads
+    )
+    try:
+        for name in DeadlineJSON.PREFERRED:
+            try:
+                DeadlineJSON.SetBackend(name)
+            except ImportError:
+                continue
+            results.append((
+                name,
+                _best(lambda: _drain(api.SubmitJobs(jobs)), repeat),
+                _best(lambda: DeadlineJSON.loads(response), repeat),
+            ))
+    finally:
+        DeadlineJSON.SetBackend(*previous)
+    return results
+
+
+def _legacy_file_read(filelocation):
+    obj = '{'
+    with open(filelocation, 'r') as f:
+        for line in f:
+            line = line.replace('\n', '')
+            line = line.replace('\t', '')
+            tokens = line.split('=', 1)
+            if len(tokens) == 2:
+                obj = obj + '"' + tokens[0].strip() + '":"' + \
+                    tokens[1].strip() + '",'
+    return obj[:-1] + '}'
+
+
+def _write_info_file(path, lines):
+    with open(path, 'w') as f:
+        for index in range(lines):
+            f.write('ExtraInfoKeyValue{0}=key{0}=value {0}\n'.format(index))
+
+
+def info_files(lines=10000, files=50, repeat=5):
+    '''
+    Seconds to encode an info file of lines lines and to read a directory
+    of files info files. Returns a list of (name, seconds).
+
+    :param lines: Number of key=value lines per info file
+    :param files: Number of info files in the directory
+    :param repeat: Runs per measurement, the fastest one is reported
+    '''
+
+    directory = tempfile.mkdtemp()
+    try:
+        for index in range(files):
+            _write_info_file(
+                os.path.join(directory, '{:04d}.job'.format(index)), lines
+            )
+        path = os.path.join(directory, '0000.job')
+        paths = [os.path.join(directory, name)
+                 for name in sorted(os.listdir(directory))]
+        return [
+            ('concatenation', _best(lambda: _legacy_file_read(path), repeat)),
+            ('fileRead', _best(lambda: fileRead(path), repeat)),
+            ('directory, sequential', _best(
+                lambda: [read_info_file(p) for p in paths], repeat
+            )),
+            ('directory, concurrent', _best(
+                lambda: read_info_directory(directory), repeat
+            )),
+        ]
+    finally:
+        shutil.rmtree(directory)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Microbenchmarks of deadlineutils request handling'
+    )
+    parser.add_argument('benchmark', choices=['submit_jobs', 'info_files'])
+    parser.add_argument('--jobs', type=int, default=1000)
+    parser.add_argument('--lines', type=int, default=10000)
+    parser.add_argument('--files', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.benchmark == 'info_files':
+        for name, seconds in info_files(args.lines, args.files, args.repeat):
+            print('{:<24}{:>12.1f} ms'.format(name, seconds * 1000))
+        return
+
+    print('{:<16}{:>12}{:>12}'.format('codec', 'encode ms', 'decode ms'))
+    for name, encode, decode in submit_jobs(args.jobs, args.repeat):
+        print('{:<16}{:>12.1f}{:>12.1f}'.format(
+            name, encode * 1000, decode * 1000
+        ))
+
+
+if __name__ == '__main__':
+    main()
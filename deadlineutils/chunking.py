@@ -0,0 +1,267 @@
+'''
+deadlineutils.chunking
+======================
+Choose job ChunkSize from the render times of previous jobs.
+
+Render times are collected from completed jobs with ChunkAdvisor.update and
+stored in a small JSON stats cache. ChunkAdvisor.advise only reads that cache,
+so asking for a chunk size adds no Web Service request to a submission::
+
+    advisor = get_advisor()
+    advisor.update(connection)  # nightly, or from a farm script
+    chunk_size = advisor.advise('shot010_comp_v003.nk', 'Nuke', 'Write1')
+'''
+from __future__ import absolute_import
+import json
+import os
+import re
+import time
+
+from .frames import FrameSet
+from .utils import atomic_write, data_path, parse_date
+
+
+# Job Stat value of completed jobs
+COMPLETED = 3
+
+# Job statistics fields holding the average render time of one frame
+_STATISTICS_FIELDS = ('AvgFrameRendTime', 'AverageFrameRenderTime')
+
+_TIMESPAN = re.compile(r'(?:(\d+)\.)?(\d+):(\d\d):(\d\d)(?:\.\d+)?$')
+_VERSION = re.compile(r'([._-]?v\d+)?([._-]?\d+)?$', re.IGNORECASE)
+
+
+def batch_prefix(batch_name):
+    '''
+    Strip the extension and trailing version or take number from a batch
+    name, so every version of a scene shares render time statistics::
+
+        >>> batch_prefix('shot010_comp_v003.nk')
+        'shot010_comp'
+    '''
+
+    name = os.path.splitext(batch_name)[0]
+    return _VERSION.sub('', name) or name
+
+
+def parse_timespan(value):
+    '''Parse seconds or a [d.]hh:mm:ss timespan string to seconds'''
+
+    if isinstance(value, (int, float)):
+        return float(value)
+
+    match = _TIMESPAN.match(str(value).strip())
+    if not match:
+        return None
+    days, hours, minutes, seconds = match.groups()
+    return (
+        int(days or 0) * 86400 + int(hours) * 3600 +
+        int(minutes) * 60 + int(seconds)
+    )
+
+
+def _median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+class ChunkAdvisor(object):
+    '''
+    Chooses a ChunkSize so tasks take roughly target_duration seconds.
+
+    Statistics are keyed on batch name prefix, plugin and target, where the
+    target is the Nuke write node or Maya render layer.
+
+    :param path: Path to the JSON stats cache, defaults to chunk_stats.json
+        in the deadlineutils data directory
+    :param target_duration: Desired task duration in seconds
+    :param min_chunk: Smallest ChunkSize to advise
+    :param max_chunk: Largest ChunkSize to advise
+    :param samples: Number of jobs kept per key
+    '''
+
+    def __init__(self, path=None, target_duration=600, min_chunk=1,
+                 max_chunk=100, samples=10):
+        self.path = path or data_path('chunk_stats.json')
+        self.target_duration = target_duration
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+        self.samples = samples
+        self._stats = {}
+        self._mtime = None
+
+    @staticmethod
+    def make_key(batch_name, plugin, target):
+        '''Get the stats key for a job'''
+
+        return '|'.join([batch_prefix(batch_name), plugin, target or ''])
+
+    @property
+    def stats(self):
+        '''
+        Stats cache contents, reloaded when the file changes on disk. An
+        unreadable file counts as empty.
+        '''
+
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return self._stats
+
+        if mtime != self._mtime:
+            try:
+                with open(self.path) as f:
+                    stats = json.load(f)
+            except (IOError, OSError, ValueError):
+                # An unreadable or hand-edited cache must never break a
+                # submission, it is rebuilt by the next update
+                stats = {}
+            self._stats = stats if isinstance(stats, dict) else {}
+            self._mtime = mtime
+
+        return self._stats
+
+    def save(self):
+        '''Write the stats cache to disk'''
+
+        atomic_write(self.path, json.dumps(self._stats, sort_keys=True))
+        self._mtime = os.path.getmtime(self.path)
+
+    def seconds_per_frame(self, batch_name, plugin, target):
+        '''Median render seconds per frame of recent jobs or None'''
+
+        entry = self.stats.get(self.make_key(batch_name, plugin, target))
+        if not isinstance(entry, dict) or not entry.get('samples'):
+            return None
+        return _median([sample[1] for sample in entry['samples']])
+
+    def advise(self, batch_name, plugin, target, frame_count=None,
+               default=None):
+        '''
+        Get the ChunkSize for a new job. Only reads the local stats cache.
+
+        :param batch_name: BatchName of the new job
+        :param plugin: Deadline plugin name
+        :param target: Write node or render layer name
+        :param frame_count: Number of frames in the job, caps the chunk size
+        :param default: Returned when no statistics are available
+        '''
+
+        seconds = self.seconds_per_frame(batch_name, plugin, target)
+        if not seconds:
+            return default
+
+        chunk_size = int(round(self.target_duration / seconds))
+        chunk_size = max(self.min_chunk, min(self.max_chunk, chunk_size))
+        if frame_count:
+            chunk_size = min(chunk_size, frame_count)
+        return max(1, chunk_size)
+
+    def record(self, key, job_id, seconds_per_frame):
+        '''
+        Add a job's render seconds per frame to the stats of key. Jobs that
+        were already recorded are ignored.
+        '''
+
+        stats = self.stats
+        entry = stats.setdefault(key, {'samples': []})
+        if any(sample[0] == job_id for sample in entry['samples']):
+            return
+
+        entry['samples'].append([job_id, seconds_per_frame])
+        entry['samples'] = entry['samples'][-self.samples:]
+        entry['updated'] = time.time()
+
+    def measure(self, connection, job):
+        '''
+        Get the render seconds per frame of a completed job. Uses the median
+        of its task render times, falling back to the job statistics.
+
+        :param connection: deadlineutils.connection.Connection instance
+        :param job: Job dictionary
+        '''
+
+        per_frame = []
+        for task in connection.Tasks.GetJobTasks(job['_id']) or []:
+            start = parse_date(task.get('StartRen') or task.get('Start'))
+            end = parse_date(task.get('Comp'))
+            try:
+                frames = len(FrameSet(task.get('Frames', '')))
+            except ValueError:
+                frames = 0
+            if start and end and frames and end > start:
+                per_frame.append((end - start) / frames)
+
+        if per_frame:
+            return _median(per_frame)
+
+        statistics = connection.Jobs.CalculateJobStatistics(job['_id'])
+        if isinstance(statistics, list):
+            statistics = statistics[0] if statistics else {}
+        if not isinstance(statistics, dict):
+            return None
+
+        for field in _STATISTICS_FIELDS:
+            if field in statistics:
+                return parse_timespan(statistics[field])
+
+    def update(self, connection, max_age=14 * 24 * 60 * 60):
+        '''
+        Measure completed jobs not yet in the stats cache and save it. Run
+        this outside of submission, it requests tasks for every new job.
+        Returns the number of jobs measured.
+
+        :param connection: deadlineutils.connection.Connection instance
+        :param max_age: Ignore jobs completed more than max_age seconds ago
+        '''
+
+        known = set(
+            sample[0]
+            for entry in self.stats.values()
+            for sample in entry['samples']
+        )
+        oldest = time.time() - max_age
+        measured = 0
+
+        for job in connection.Jobs.GetJobsInState('Completed') or []:
+            if job['_id'] in known or job.get('Stat', COMPLETED) != COMPLETED:
+                continue
+
+            completed = parse_date(job.get('DateComp'))
+            if completed and completed < oldest:
+                continue
+
+            props = job.get('Props', {})
+            plugin_info = props.get('PlugInfo', {})
+            target = (
+                plugin_info.get('WriteNode') or
+                plugin_info.get('RenderLayer') or ''
+            )
+            key = self.make_key(
+                props.get('Batch') or props.get('Name', ''),
+                job.get('Plug', ''),
+                target,
+            )
+
+            seconds = self.measure(connection, job)
+            if seconds:
+                self.record(key, job['_id'], seconds)
+                measured += 1
+
+        self.save()
+        return measured
+
+
+_advisor = None
+
+
+def get_advisor():
+    '''Get the process-wide ChunkAdvisor used by the submission helpers'''
+
+    global _advisor
+    if _advisor is None:
+        _advisor = ChunkAdvisor()
+    return _advisor
@@ -7,6 +7,23 @@ deadlineutils.connection
 from __future__ import print_function, absolute_import
 from collections import Counter
 from . import maya, nuke
+from .balance import LoadBalancer, discover
+from .batch import Batch
+from .chunking import get_advisor
+from .frames import FrameSet
+from .limiter import AdaptiveLimiter, RateLimiter
+from .profiling import Profile
+from .query import JobQuery, QueryPlanner
+from .spool import is_server_error, is_unreachable
+from .slaveindex import SlaveJobIndex
+from .sweeper import FailedTaskSweeper
+from .tail import tail_task_log
+from .template import submit_jobs
+from .timeouts import budget
+from .transport import Transport
+from .utils import string_types
+from .verify import OutputVerifier
+from .watch import WatchFolder
 
 try:
     from Deadline import DeadlineConnect
@@ -17,6 +34,20 @@ except ImportError:
     raise
 
 
+def _frame_list(frames):
+    '''
+    Frame list string for Deadline. Strings are checked and sent as given,
+    FrameSet would sort them and lose the order frames render in.
+    '''
+
+    if isinstance(frames, string_types):
+        FrameSet(frames)
+        return frames
+    if not isinstance(frames, FrameSet):
+        frames = FrameSet(frames)
+    return str(frames)
+
+
 class Connection(object):
     '''
     Wraps Deadline.DeadlineConnect.DeadlineCon providing additional
@@ -28,13 +59,47 @@ class Connection(object):
     Here we get the best possible pool for the next job submission with the
     prefix *maya*.
 
+    Pass a deadlineutils.spool.Spool to keep submissions that can not reach
+    the Web Service::
+
+        with Connection('localhost', 8080, spool=Spool()) as c:
+            c.submit_job(job_info, plugin_info)
+            c.flush_spool()
+
+    Pass a deadlineutils.dedup.Deduplicator to return the job id of a
+    matching recent submission instead of submitting a job again::
+
+        with Connection('localhost', 8080, dedup=Deduplicator()) as c:
+            c.submit_job(job_info, plugin_info)
+
+    Pass a list of endpoints to spread requests over several Web Service
+    instances, see balance.
+
+    timeout sets the default timeout of every request, seconds or a
+    (connect, read) tuple. A latency budget bounds a whole block, including
+    the requests made by helpers like get_best_pool::
+
+        with c.budget(2.0):
+            best_pool = c.get_best_pool(prefix='maya')
+
     see also::
 
         *Deadline Standalone Python API*
     '''
 
-    def __init__(self, addr, port):
+    def __init__(self, addr, port, spool=None, endpoints=None, timeout=None,
+                 dedup=None):
         self._connection = DeadlineConnect.DeadlineCon(addr, port)
+        self.transport = Transport.install(self._connection)
+        if timeout is not None:
+            self.transport.SetTimeout(timeout)
+        self.spool = spool
+        self.dedup = dedup
+        self.planner = QueryPlanner(self)
+        self.port = port
+        self.balancer = None
+        if endpoints:
+            self.balance(endpoints)
 
     def __getattr__(self, attr):
         return getattr(self._connection, attr)
@@ -45,6 +110,210 @@ class Connection(object):
     def __exit__(self, type, value, traceback):
         return False
 
+    def balance(self, endpoints=None, **kwargs):
+        '''
+        Spread requests over several Web Service instances. Returns the
+        deadlineutils.balance.LoadBalancer.
+
+        see also::
+
+            *deadlineutils.balance.LoadBalancer*
+
+        :param endpoints: List of Web Service addresses, host:port. Defaults
+            to the instances listed by the Pulse and Proxy Server infos
+        :param kwargs: max_failures, eject_seconds, max_eject_seconds,
+            smoothing, hedge, min_samples and min_hedge_delay of a new
+            LoadBalancer
+        '''
+
+        if endpoints is None:
+            endpoints = discover(self, self.port)
+        if not endpoints:
+            endpoints = [self.transport.GetAddress()]
+
+        if self.balancer is None:
+            self.balancer = LoadBalancer(
+                self.transport.connection_property, endpoints, **kwargs
+            )
+            self.transport.connection_property = self.balancer
+        else:
+            self.balancer.set_addresses(endpoints)
+        return self.balancer
+
+    def budget(self, seconds):
+        '''
+        Limit the time all requests inside the block may take together.
+        Requests get the time left as their timeout and raise
+        deadlineutils.timeouts.BudgetExceeded once it is used up.
+
+        see also::
+
+            *deadlineutils.timeouts.budget*
+
+        :param seconds: Latency budget of the block
+        '''
+
+        return budget(seconds)
+
+    def batch(self, max_workers=8):
+        '''
+        Hold back task and job commands and send them merged into list-form
+        requests when the block exits::
+
+            with connection.batch():
+                for task_id in task_ids:
+                    connection.Tasks.RequeueJobTask(job_id, task_id)
+
+        see also::
+
+            *deadlineutils.batch.Batch*
+
+        :param max_workers: Number of jobs sent concurrently
+        '''
+
+        return Batch(self.transport, max_workers)
+
+    def profile(self, stack_depth=6, threshold=5):
+        '''
+        Record the requests made inside the block and detect N+1 request
+        patterns::
+
+            with connection.profile() as profile:
+                for job_id in job_ids:
+                    connection.Jobs.GetJob(job_id)
+            print(profile.report())
+
+        see also::
+
+            *deadlineutils.profiling.Profile*
+
+        :param stack_depth: Number of calling frames kept per request
+        :param threshold: Number of calls with varying ids from one line of
+            code that make an N+1 pattern
+        '''
+
+        return Profile(self.transport, stack_depth, threshold)
+
+    def limit(self, rates=None, **kwargs):
+        '''
+        Adapt the number of requests in flight to the Web Service's latency
+        and cap requests per second per endpoint class. Returns the
+        deadlineutils.limiter.AdaptiveLimiter.
+
+        see also::
+
+            *deadlineutils.limiter.AdaptiveLimiter*
+            *deadlineutils.limiter.RateLimiter*
+
+        :param rates: Dictionary mapping 'reads', 'writes' and 'reports' to
+            requests per second
+        :param kwargs: initial, min_limit, max_limit, backoff, tolerance,
+            smoothing and samples of the AdaptiveLimiter
+        '''
+
+        if rates:
+            self.transport.push(RateLimiter(rates), innermost=True)
+        limiter = AdaptiveLimiter(**kwargs)
+        self.transport.push(limiter, innermost=True)
+        return limiter
+
+    def sweep_failed_tasks(self, rules=None, dry_run=False, **kwargs):
+        '''
+        Resume or requeue failed tasks across the farm. Returns a dictionary
+        mapping job ids to {action: [task ids]}.
+
+        see also::
+
+            *deadlineutils.sweeper.FailedTaskSweeper*
+
+        :param rules: List of (regex, action) tuples used to classify tasks
+        :param dry_run: Only report what would be done
+        '''
+
+        sweeper = FailedTaskSweeper(self, rules, **kwargs)
+        return sweeper.sweep(dry_run=dry_run)
+
+    def tail_task_log(self, job_id, task_id, **kwargs):
+        '''
+        Generator yielding new log lines of a task as they are reported.
+
+        see also::
+
+            *deadlineutils.tail.tail_task_log*
+
+        :param job_id: The Job ID
+        :param task_id: The Task ID
+        '''
+
+        return tail_task_log(self, job_id, task_id, **kwargs)
+
+    def query(self, state=None, pool=None, user=None, plugin=None,
+              submitted_after=None, ids=None, fields=None, max_age=None):
+        '''
+        Jobs matching all given predicates, fetched with the cheapest
+        request. Iterate the returned query to run it, explain shows the
+        plan::
+
+            query = connection.query(state='Active', pool='maya')
+            print(query.explain())
+            jobs = query.run()
+
+        see also::
+
+            *deadlineutils.query.JobQuery*
+
+        :param state: State name or list of names
+        :param pool: Pool name or list of names
+        :param user: User name or list of names
+        :param plugin: Plugin name or list of names
+        :param submitted_after: Seconds since the epoch
+        :param ids: Job ids
+        :param fields: Fields of the returned jobs, dotted for nested fields
+        :param max_age: Seconds the jobs of an earlier query may be reused
+        '''
+
+        return JobQuery(
+            self.planner, state, pool, user, plugin, submitted_after, ids,
+            fields, max_age
+        )
+
+    def verify_job_output(self, job_id, requeue=True, **kwargs):
+        '''
+        Check the output frames of a job on disk and requeue the tasks of
+        missing frames with one request. Returns the missing frames, task ids
+        and requeue result, see OutputVerifier.verify.
+
+        see also::
+
+            *deadlineutils.verify.OutputVerifier*
+
+        :param job_id: The Job ID
+        :param requeue: Requeue the tasks of missing frames
+        :param kwargs: min_size, min_ratio, max_workers and path_mapper
+        '''
+
+        job = self.Jobs.GetJob(job_id)
+        if not isinstance(job, dict):
+            raise ValueError('Job not found: {}'.format(job_id))
+        verifier = OutputVerifier(self, **kwargs)
+        return verifier.verify(job, requeue=requeue, job_id=job_id)
+
+    def watch_folder(self, directory, **kwargs):
+        '''
+        Submit info file pairs dropped into a directory in batches. Call run
+        on the returned WatchFolder to start watching.
+
+        see also::
+
+            *deadlineutils.watch.WatchFolder*
+
+        :param directory: Directory the info files are dropped into
+        :param kwargs: submitted_dir, failed_dir, job_suffix, plugin_suffix,
+            settle, batch_size and the other WatchFolder arguments
+        '''
+
+        return WatchFolder(self, directory, **kwargs)
+
     def get_active_jobs(self):
         '''
         Get a list of jobs that are currently rendering
@@ -75,6 +344,20 @@ class Connection(object):
         all_jobs = self.Jobs.GetJobs()
         return [job for job in all_jobs if job['Stat'] in stats]
 
+    def get_job_slaves(self):
+        '''
+        Get a dictionary mapping the ids of jobs being worked on to the names
+        of their slaves, using a single Slaves.GetSlaveInfos request.
+
+        see also::
+
+            *deadlineutils.slaveindex.SlaveJobIndex*
+        '''
+
+        index = SlaveJobIndex()
+        index.refresh(self)
+        return index.job_slaves()
+
     def get_used_pools(self):
         '''
         Get a list of pools currently assigned to queued and active jobs
@@ -119,23 +402,160 @@ class Connection(object):
 
         return pools.most_common()[-1][0]
 
-    def submit_job(self, job_info, plugin_info, pool=None, second_pool=None):
+    def submit_job(self, job_info, plugin_info, pool=None, second_pool=None,
+                   force=False):
         '''
         Submit a new job to deadline.
 
         see also::
 
             *Deadline.Jobs.SubmitJob*
+            *deadlineutils.dedup.Deduplicator*
+
+        When the connection has a spool and the Web Service is unreachable or
+        fails with a 5xx error, the job is recorded in the spool and None is
+        returned. Call flush_spool to post spooled jobs later. Submissions
+        the Web Service rejects are not spooled, the error is returned.
+
+        When the connection has a deduplicator and the same job was submitted
+        recently, {'_id': job id of that submission} is returned and nothing
+        is posted. When that submission was spooled None is returned and the
+        job is not spooled again.
 
         :param job_info: Job information Dictionary
         :param plugin_info: Plugin info dictionary
+        :param force: Submit even when the job is a duplicate
         '''
 
         if pool:
             job_info['Pool'] = pool
         if second_pool:
             job_info['SecondaryPool'] = second_pool
-        self.Jobs.SubmitJob(job_info, plugin_info)
+
+        digest = None
+        if self.dedup is not None and not force:
+            digest, job_id = self.dedup.existing(self, job_info, plugin_info)
+            entry_id = self.dedup.spool_entry(job_id)
+            if entry_id is not None:
+                print('Duplicate of spooled submission', entry_id,
+                      'not spooled')
+                return None
+            if job_id is not None:
+                print('Duplicate of job', job_id, 'not submitted')
+                return {'_id': job_id}
+
+        entry_id = None
+        try:
+            try:
+                result = self.Jobs.SubmitJob(job_info, plugin_info)
+            except Exception as e:
+                if self.spool is None or not is_unreachable(e):
+                    raise
+                result = None
+            if self.spool is not None and (
+                    result is None or is_server_error(result)):
+                entry_id = self.spool.add(job_info, plugin_info)
+        except Exception:
+            if digest is not None:
+                self.dedup.release(digest)
+            raise
+
+        if digest is not None:
+            if entry_id is not None:
+                # Keep the hash until the window ends so submitting again
+                # during the outage does not spool the job twice
+                self.dedup.spooled(digest, entry_id)
+            elif isinstance(result, dict) and result.get('_id'):
+                self.dedup.record(digest, result['_id'])
+            else:
+                self.dedup.release(digest)
+
+        if entry_id is not None:
+            print('Web Service unavailable, spooled submission', entry_id)
+            return None
+
+        return result
+
+    def submit_jobs(self, jobs, batch_size=500, max_workers=4):
+        '''
+        Submit many jobs in concurrent Jobs.SubmitJobs batches. Jobs are
+        taken from the iterable as batches are sent. Returns the result of
+        every batch sent, sending stops at the first batch raising an
+        exception, which is returned in place of its result.
+
+        see also::
+
+            *deadlineutils.template.submit_jobs*
+            *deadlineutils.template.JobTemplate*
+
+        :param jobs: Iterable of job dictionaries, {'JobInfo': ...,
+            'PluginInfo': ..., 'AuxFiles': [...]}, or JobTemplate variants
+        :param batch_size: Maximum number of jobs per request
+        :param max_workers: Number of requests sent concurrently
+        '''
+
+        return submit_jobs(self, jobs, batch_size, max_workers)
+
+    def flush_spool(self, max_batches=None):
+        '''
+        Submit jobs waiting in the connection's spool using Jobs.SubmitJobs.
+        Returns the number of jobs submitted.
+
+        see also::
+
+            *deadlineutils.spool.Spool.flush*
+
+        :param max_batches: Maximum number of SubmitJobs requests
+        '''
+
+        if self.spool is None:
+            return 0
+        return self.spool.flush(self, max_batches=max_batches)
+
+    def set_job_frames(self, job_id, frames, chunk_size):
+        '''
+        Replace a job's frame list.
+
+        see also::
+
+            *Deadline.Jobs.SetJobFrameRange*
+
+        :param job_id: The Job ID
+        :param frames: FrameSet or Deadline frame list string, strings are
+            sent unchanged so Deadline keeps their render order
+        :param chunk_size: The chunk size
+        '''
+
+        return self.Jobs.SetJobFrameRange(
+            job_id, _frame_list(frames), chunk_size
+        )
+
+    def append_job_frames(self, job_id, frames):
+        '''
+        Append frames to a job without touching its existing tasks.
+
+        see also::
+
+            *Deadline.Jobs.AppendJobFrameRange*
+
+        :param job_id: The Job ID
+        :param frames: FrameSet or Deadline frame list string, strings are
+            sent unchanged so Deadline keeps their render order
+        '''
+
+        return self.Jobs.AppendJobFrameRange(job_id, _frame_list(frames))
+
+    def update_chunk_stats(self, **kwargs):
+        '''
+        Measure recently completed jobs and store their render times in the
+        local stats cache used to choose ChunkSize at submission.
+
+        see also::
+
+            *deadlineutils.chunking.ChunkAdvisor.update*
+        '''
+
+        return get_advisor().update(self, **kwargs)
 
     maya_submit_job = maya.submit_job
     nuke_submit_job = nuke.submit_job
@@ -0,0 +1,266 @@
+'''
+deadlineutils.dedup
+===================
+Keep double clicks and retried scripts from submitting the same job twice::
+
+    with Connection('localhost', 8080, dedup=Deduplicator(window=600)) as c:
+        c.submit_job(job_info, plugin_info)
+        c.submit_job(job_info, plugin_info)  # returns the first job's id
+
+A submission is identified by a hash of its job info and plugin info. Keys
+are sorted and values compared as stripped strings, so 10 and '10' are the
+same. Hashes of recent submissions are kept in a local SQLite database with
+the job id they got. A submission whose hash was submitted less than window
+seconds ago returns {'_id': existing job id} instead of being posted.
+
+Every submission claims its hash before it is posted. A second process
+submitting the same job meanwhile waits up to claim_timeout seconds for the
+first one's job id, so simultaneous double clicks post once. A failed
+submission releases its claim. A spooled submission keeps its hash with the
+spool entry id, so submitting it again during the outage returns None
+without spooling it twice.
+
+With check_active=True jobs queued on the farm also count. An Active or
+Pending job with the same BatchName and Name, taken from the connection's
+query snapshot no older than max_age seconds, is returned instead of
+submitting.
+'''
+from __future__ import absolute_import
+import hashlib
+import json
+import sqlite3
+import time
+
+from .utils import data_path, string_types
+
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS submissions (
+    hash TEXT PRIMARY KEY,
+    job_id TEXT,
+    submitted REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS submissions_submitted ON submissions (submitted);
+'''
+
+# Seconds between checks for the job id of a submission claimed elsewhere
+_CLAIM_POLL = 0.2
+
+# Prefix of the job id stored for a submission waiting in the spool
+_SPOOLED = 'spool:'
+
+
+def _normalise(info):
+    normalised = {}
+    for key, value in (info or {}).items():
+        if isinstance(value, bool):
+            value = str(value).lower()
+        elif not isinstance(value, string_types):
+            value = str(value)
+        normalised[key.strip()] = value.strip()
+    return normalised
+
+
+def fingerprint(job_info, plugin_info):
+    '''
+    Stable SHA-1 hex digest of a submission, independent of key order and of
+    value types
+
+    :param job_info: Job information Dictionary
+    :param plugin_info: Plugin info dictionary
+    '''
+
+    data = json.dumps(
+        [_normalise(job_info), _normalise(plugin_info)],
+        sort_keys=True, separators=(',', ':'),
+    )
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+class Deduplicator(object):
+    '''
+    Recent submissions store of Connection.submit_job.
+
+    :param path: Path to the SQLite database, defaults to dedup.db in the
+        deadlineutils data directory
+    :param window: Seconds a submission counts as a duplicate of an earlier
+        one
+    :param check_active: Also look for Active and Pending jobs with the same
+        BatchName and Name on the farm
+    :param max_age: Seconds the job snapshot of check_active may be reused
+    :param claim_timeout: Seconds to wait for the job id of the same
+        submission posted by another process
+    '''
+
+    def __init__(self, path=None, window=300, check_active=False,
+                 max_age=30, claim_timeout=30):
+        self.path = path or data_path('dedup.db')
+        self.window = window
+        self.check_active = check_active
+        self.max_age = max_age
+        self.claim_timeout = claim_timeout
+
+        db = self._connect()
+        try:
+            db.executescript(_SCHEMA)
+        finally:
+            db.close()
+        self.purge()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.execute('PRAGMA journal_mode=WAL')
+        return db
+
+    def claim(self, digest):
+        '''
+        Claim a submission hash. Returns None when the caller should submit,
+        else the job id of the earlier submission.
+
+        :param digest: Hash returned by fingerprint
+        '''
+
+        started = time.time()
+        while True:
+            now = time.time()
+            db = self._connect()
+            try:
+                db.execute('BEGIN IMMEDIATE')
+                row = db.execute(
+                    'SELECT job_id, submitted FROM submissions WHERE hash = ?',
+                    (digest,)
+                ).fetchone()
+                if row is not None and row[0] is not None and \
+                        now - row[1] < self.window:
+                    db.execute('COMMIT')
+                    return row[0]
+                in_flight = row is not None and row[0] is None and \
+                    now - row[1] < self.claim_timeout
+                if not in_flight:
+                    db.execute(
+                        'INSERT OR REPLACE INTO submissions '
+                        '(hash, job_id, submitted) VALUES (?, NULL, ?)',
+                        (digest, now)
+                    )
+                db.execute('COMMIT')
+            finally:
+                db.close()
+
+            if not in_flight:
+                return None
+            if now - started > self.claim_timeout:
+                # The other submitter never finished, submit anyway
+                return None
+            time.sleep(_CLAIM_POLL)
+
+    def record(self, digest, job_id):
+        '''
+        Store the job id of a claimed submission
+
+        :param digest: Hash returned by fingerprint
+        :param job_id: The Job ID the Web Service returned
+        '''
+
+        db = self._connect()
+        try:
+            db.execute(
+                'INSERT OR REPLACE INTO submissions (hash, job_id, submitted) '
+                'VALUES (?, ?, ?)',
+                (digest, job_id, time.time())
+            )
+        finally:
+            db.close()
+
+    def spooled(self, digest, entry_id):
+        '''
+        Store the spool entry of a claimed submission that was spooled
+
+        :param digest: Hash returned by fingerprint
+        :param entry_id: The entry id deadlineutils.spool.Spool.add returned
+        '''
+
+        self.record(digest, _SPOOLED + entry_id)
+
+    @staticmethod
+    def spool_entry(job_id):
+        '''
+        Spool entry id when job_id, as returned by claim or existing, stands
+        for a spooled submission, else None
+        '''
+
+        if job_id is not None and job_id.startswith(_SPOOLED):
+            return job_id[len(_SPOOLED):]
+        return None
+
+    def release(self, digest):
+        '''Drop the claim of a submission that was not posted'''
+
+        db = self._connect()
+        try:
+            db.execute(
+                'DELETE FROM submissions WHERE hash = ? AND job_id IS NULL',
+                (digest,)
+            )
+        finally:
+            db.close()
+
+    def purge(self):
+        '''Forget submissions older than the window. Returns the number'''
+
+        db = self._connect()
+        try:
+            cursor = db.execute(
+                'DELETE FROM submissions WHERE submitted < ?',
+                (time.time() - max(self.window, self.claim_timeout),)
+            )
+            return cursor.rowcount
+        finally:
+            db.close()
+
+    def find_active(self, connection, job_info):
+        '''
+        Job id of an Active or Pending job with the BatchName and Name of
+        job_info, None when there is none or the job info has no Name.
+
+        :param connection: deadlineutils.connection.Connection instance
+        :param job_info: Job information Dictionary
+        '''
+
+        name = job_info.get('Name')
+        if not name:
+            return None
+        batch = job_info.get('BatchName', '')
+        jobs = connection.query(
+            state=('Active', 'Pending'),
+            fields=('_id', 'Props.Name', 'Props.Batch'),
+            max_age=self.max_age,
+        ).run()
+        for job in jobs:
+            props = job.get('Props') or {}
+            if props.get('Name') == name and \
+                    (props.get('Batch') or '') == batch:
+                return job.get('_id')
+        return None
+
+    def existing(self, connection, job_info, plugin_info):
+        '''
+        Check a submission before it is posted. Returns (hash, job id of the
+        earlier submission or None). When the job id is None the hash is
+        claimed and must be passed to record or release.
+
+        :param connection: deadlineutils.connection.Connection instance
+        :param job_info: Job information Dictionary
+        :param plugin_info: Plugin info dictionary
+        '''
+
+        digest = fingerprint(job_info, plugin_info)
+        job_id = self.claim(digest)
+        if job_id is None and self.check_active:
+            try:
+                job_id = self.find_active(connection, job_info)
+            except Exception:
+                self.release(digest)
+                raise
+            if job_id is not None:
+                self.record(digest, job_id)
+        return digest, job_id
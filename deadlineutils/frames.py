@@ -0,0 +1,635 @@
+'''
+deadlineutils.frames
+====================
+FrameSet, a compact set of frame numbers that reads and writes Deadline frame
+list syntax::
+
+    >>> frames = FrameSet('1-100,200-300x10')
+    >>> str(frames - FrameSet('50-60'))
+    '1-49,61-100,200-300x10'
+    >>> [str(chunk) for chunk in FrameSet('1-25').chunks(10)]
+    ['1-10', '11-20', '21-25']
+
+Frames are stored as disjoint ranges of (start, end, step) sorted by start,
+so contiguous and stepped sequences of any length cost a single range. Ranges
+may interleave, '1-100x3' and '2-100x3' are kept as two ranges. The frames
+two ranges share form a range stepping the least common multiple of their
+steps, found with the Chinese remainder theorem, so union, difference,
+intersection, membership and comparison work on the ranges and never expand
+them into frames. Interleaved ranges are written as separate tokens.
+'''
+from __future__ import absolute_import
+import bisect
+import heapq
+import re
+
+from .utils import string_types
+
+try:
+    xrange
+except NameError:
+    xrange = range
+
+
+_TOKEN = re.compile(
+    r'^(-?\d+)(?:\s*-\s*(-?\d+))?(?:\s*(?:x|:|step|by)\s*(\d+))?$',
+    re.IGNORECASE
+)
+_SEPARATOR = re.compile(r'[,\s]+')
+
+
+def _gcd(a, b):
+    while b:
+        a, b = b, a % b
+    return a
+
+
+def _inverse(a, modulus):
+    '''Inverse of a modulo modulus, a and modulus are coprime'''
+
+    old_r, r = a % modulus, modulus
+    old_s, s = 1, 0
+    while r:
+        quotient = old_r // r
+        old_r, r = r, old_r - quotient * r
+        old_s, s = s, old_s - quotient * s
+    return old_s % modulus
+
+
+def _first_from(segment, frame):
+    '''First member of segment greater or equal to frame or None'''
+
+    start, end, step = segment
+    if frame <= start:
+        return start
+    first = start + -(-(frame - start) // step) * step
+    return first if first <= end else None
+
+
+def _last_to(segment, frame):
+    '''Last member of segment less or equal to frame or None'''
+
+    start, end, step = segment
+    if frame >= end:
+        return end
+    if frame < start:
+        return None
+    return start + (frame - start) // step * step
+
+
+def _slice(segment, lo, hi):
+    '''Members of segment within lo and hi as a segment or None'''
+
+    first = _first_from(segment, lo)
+    last = _last_to(segment, hi)
+    if first is None or last is None or first > last:
+        return None
+    return (first, last, segment[2] if first != last else 1)
+
+
+def _count(segment):
+    start, end, step = segment
+    return (end - start) // step + 1
+
+
+def _contains(segment, frame):
+    start, end, step = segment
+    return start <= frame <= end and (frame - start) % step == 0
+
+
+def _intersect(a, b):
+    '''Members of both segments as a segment or None'''
+
+    lo = max(a[0], b[0])
+    hi = min(a[1], b[1])
+    if lo > hi:
+        return None
+
+    divisor = _gcd(a[2], b[2])
+    if (b[0] - a[0]) % divisor:
+        # The two strides never meet
+        return None
+
+    # The common frames are a[0] + a[2] * t with a[2] * t = b[0] - a[0]
+    # modulo b[2], they repeat every lcm of the steps
+    modulus = b[2] // divisor
+    t = 0
+    if modulus > 1:
+        t = (b[0] - a[0]) // divisor * \
+            _inverse(a[2] // divisor, modulus) % modulus
+    step = a[2] * modulus
+    frame = a[0] + a[2] * t
+
+    first = frame + -(-(lo - frame) // step) * step
+    last = frame + (hi - frame) // step * step
+    if first > last:
+        return None
+    return (first, last, step if first != last else 1)
+
+
+def _subtract(segment, other):
+    '''Remove the members of other from segment, returns a list of segments'''
+
+    common = _intersect(segment, other)
+    if common is None:
+        return [segment]
+
+    pieces = [
+        _slice(segment, segment[0], common[0] - 1),
+        _slice(segment, common[1] + 1, segment[1]),
+    ]
+
+    first, last, step = common
+    gaps = _count(common) - 1
+    residues = step // segment[2] - 1
+    if gaps and gaps <= residues:
+        # Few common frames, keep the stretches between them
+        pieces.extend(
+            _slice(segment, frame + 1, frame + step - 1)
+            for frame in xrange(first, last, step)
+        )
+    elif gaps:
+        # Keep the other residues of segment modulo the common step
+        for offset in xrange(1, residues + 1):
+            start = first + offset * segment[2]
+            end = last - (last - start) % step
+            if start <= end:
+                pieces.append((start, end, step if start != end else 1))
+
+    return [piece for piece in pieces if piece is not None]
+
+
+def _remove(segment, others):
+    '''
+    Remove the members of others, sorted by start, from segment. Returns a
+    list of segments.
+    '''
+
+    done = []
+    pending = [segment]
+    for other in others:
+        kept = []
+        for part in pending:
+            if part[1] < other[0]:
+                # No later segment reaches back to part
+                done.append(part)
+            else:
+                kept.extend(_subtract(part, other))
+        pending = kept
+        if not pending:
+            break
+    return done + pending
+
+
+def _merge_interleaved(segments):
+    '''
+    Merge interleaved segments sharing a step into one segment with a smaller
+    step, '1-10x3,2-8x3,3-9x3' becomes '1-10'.
+    '''
+
+    starts = {}
+    by_start = {}
+    for segment in segments:
+        if segment[2] > 1:
+            starts.setdefault(segment[2], []).append(segment[0])
+            by_start[segment[0], segment[2]] = segment
+    if len(by_start) < 2:
+        return segments
+
+    merged = []
+    absorbed = set()
+    for segment in segments:
+        start, end, step = segment
+        if (start, step) in absorbed:
+            continue
+        if step > 1:
+            step_starts = starts[step]
+            lo = bisect.bisect_right(step_starts, start)
+            hi = bisect.bisect_left(step_starts, start + step)
+            for other in step_starts[lo:hi]:
+                offset = other - start
+                if step % offset:
+                    continue
+                keys = [
+                    (start + index * offset, step)
+                    for index in xrange(1, step // offset)
+                ]
+                if any(key not in by_start or key in absorbed
+                       for key in keys):
+                    continue
+                parts = [segment] + [by_start[key] for key in keys]
+                last = max(part[1] for part in parts)
+                if all(part[1] == last - (last - part[0]) % step
+                       for part in parts):
+                    absorbed.update(keys)
+                    segment = (start, last, offset)
+                    break
+        merged.append(segment)
+    return merged
+
+
+def _coalesce(segments):
+    '''
+    Merge sorted disjoint segments into as few segments as possible, joining
+    segments that continue each other's stride and interleaved segments
+    '''
+
+    while True:
+        out = []
+        for segment in _merge_interleaved(segments):
+            if out:
+                c_start, c_end, c_step = out[-1]
+                s_start, s_end, s_step = segment
+                single = s_start == s_end
+                if s_start == c_end + c_step and (single or s_step == c_step):
+                    out[-1] = (c_start, s_end, c_step)
+                    continue
+                if c_start == c_end and s_start > c_end and (
+                        single or s_step == s_start - c_end):
+                    out[-1] = (c_start, s_end, s_start - c_end)
+                    continue
+            out.append(segment)
+        if len(out) == len(segments):
+            return out
+        segments = out
+
+
+def _normalize(segments):
+    '''
+    Union of segments that may overlap as sorted disjoint segments. Segments
+    are swept by start, each is reduced by the segments taken before it that
+    still reach it.
+    '''
+
+    heap = [segment for segment in segments if segment is not None]
+    heapq.heapify(heap)
+    out = []
+    active = []
+
+    while heap:
+        segment = heapq.heappop(heap)
+        active = [other for other in active if other[1] >= segment[0]]
+        pieces = _remove(segment, active)
+
+        for piece in sorted(pieces):
+            if heap and piece > heap[0]:
+                # Keep out sorted by start, taken again in order
+                heapq.heappush(heap, piece)
+                continue
+            out.append(piece)
+            active.append(piece)
+
+    return _coalesce(out)
+
+
+def _compress(frames):
+    '''Build segments from sorted unique frames'''
+
+    segments = []
+    for frame in frames:
+        if segments:
+            start, end, step = segments[-1]
+            if start == end:
+                segments[-1] = (start, frame, frame - start)
+                continue
+            if frame == end + step:
+                segments[-1] = (start, frame, step)
+                continue
+        segments.append((frame, frame, 1))
+    return segments
+
+
+def _tokens(frames):
+    '''
+    (first, last, step) of every token of a frame list in render order, step
+    is negative for reversed ranges
+    '''
+
+    for token in _SEPARATOR.split(frames.strip()):
+        if not token:
+            continue
+
+        match = _TOKEN.match(token)
+        if not match:
+            raise ValueError('Invalid frame list token: {!r}'.format(token))
+
+        start, end, step = match.groups()
+        start = int(start)
+        end = start if end is None else int(end)
+        step = int(step or 1)
+        if step < 1:
+            raise ValueError('Invalid frame step: {!r}'.format(token))
+
+        if end < start:
+            yield start, start - (start - end) // step * step, -step
+        else:
+            yield start, start + (end - start) // step * step, step
+
+
+def _parse(frames):
+    segments = []
+    for first, last, step in _tokens(frames):
+        if step < 0:
+            # Reversed ranges render backwards, as a set they run forwards
+            first, last, step = last, first, -step
+        segments.append((first, last, step if first != last else 1))
+    return segments
+
+
+def render_order(frames):
+    '''
+    Iterate the frames of a Deadline frame list in the order they render.
+    Reversed ranges run backwards and repeated frames are skipped. Task n of
+    a job renders frames n * ChunkSize to (n + 1) * ChunkSize - 1 of this
+    order::
+
+        >>> list(render_order('5-3,1,4'))
+        [5, 4, 3, 1]
+
+    :param frames: Deadline frame list string or an iterable of frames
+    '''
+
+    if isinstance(frames, string_types):
+        frames = (
+            frame
+            for first, last, step in _tokens(frames)
+            for frame in range(first, last + (1 if step > 0 else -1), step)
+        )
+
+    seen = set()
+    for frame in frames:
+        frame = int(frame)
+        if frame not in seen:
+            seen.add(frame)
+            yield frame
+
+
+
+
+class FrameSet(object):
+    '''
+    A set of frame numbers stored as compact ranges.
+
+    :param frames: Deadline frame list string, a single frame, an iterable of
+        frames or another FrameSet
+    '''
+
+    __slots__ = ('_segments', '_offsets', '_spanning')
+
+    def __init__(self, frames=None):
+        self._offsets = None
+        self._spanning = None
+
+        if frames is None:
+            self._segments = []
+        elif isinstance(frames, FrameSet):
+            self._segments = list(frames._segments)
+        elif isinstance(frames, string_types):
+            self._segments = _normalize(_parse(frames))
+        elif isinstance(frames, int):
+            self._segments = [(frames, frames, 1)]
+        else:
+            self._segments = _compress(
+                sorted(set(int(frame) for frame in frames))
+            )
+
+    @classmethod
+    def from_range(cls, start, end, step=1):
+        '''
+        Create a FrameSet from start to end inclusive
+
+        :param start: First frame
+        :param end: Last frame
+        :param step: Frame step
+        '''
+
+        return cls('{}-{}x{}'.format(int(start), int(end), int(step)))
+
+    @classmethod
+    def _from_segments(cls, segments):
+        frame_set = cls()
+        frame_set._segments = segments
+        return frame_set
+
+    @property
+    def ranges(self):
+        '''
+        List of (start, end, step) tuples sorted by start, end is inclusive
+        '''
+
+        return list(self._segments)
+
+    @property
+    def first(self):
+        '''Lowest frame or None when empty'''
+
+        return self._segments[0][0] if self._segments else None
+
+    @property
+    def last(self):
+        '''Highest frame or None when empty'''
+
+        if not self._segments:
+            return None
+        if not self._get_spanning():
+            return self._segments[-1][1]
+        return max(segment[1] for segment in self._segments)
+
+    def _get_offsets(self):
+        if self._offsets is None:
+            offsets = [0]
+            for segment in self._segments:
+                offsets.append(offsets[-1] + _count(segment))
+            self._offsets = offsets
+        return self._offsets
+
+    def _get_spanning(self):
+        '''Indices of segments reaching past the start of the next one'''
+
+        if self._spanning is None:
+            segments = self._segments
+            self._spanning = [
+                index for index in range(len(segments) - 1)
+                if segments[index][1] >= segments[index + 1][0]
+            ]
+        return self._spanning
+
+    def _overlapping(self, lo, hi):
+        '''Iterate segments whose bounds overlap lo to hi'''
+
+        segments = self._segments
+        first = bisect.bisect_left(segments, (lo,))
+        last = bisect.bisect_right(segments, (hi, float('inf')))
+        for index in range(first, last):
+            yield segments[index]
+
+        # Segments starting before lo, the one right before it or those
+        # interleaving with their successors
+        if first and segments[first - 1][1] >= lo:
+            yield segments[first - 1]
+        for index in self._get_spanning():
+            if index >= first - 1:
+                break
+            if segments[index][1] >= lo:
+                yield segments[index]
+
+    def __len__(self):
+        return self._get_offsets()[-1]
+
+    def __nonzero__(self):
+        return bool(self._segments)
+
+    __bool__ = __nonzero__
+
+    def __iter__(self):
+        ranges = [
+            xrange(start, end + 1, step)
+            for start, end, step in self._segments
+        ]
+        if self._get_spanning():
+            return heapq.merge(*ranges)
+        return (frame for frames in ranges for frame in frames)
+
+    def __contains__(self, frame):
+        return any(
+            _contains(segment, frame)
+            for segment in self._overlapping(frame, frame)
+        )
+
+    def index(self, frame):
+        '''
+        Position of frame in the ordered set. For frame lists rendering in
+        ascending order the task id of a frame is its index // ChunkSize, see
+        render_order for any other frame list.
+        '''
+
+        if frame not in self:
+            raise ValueError('{} is not in FrameSet'.format(frame))
+
+        index = bisect.bisect_right(self._segments, (frame, float('inf'))) - 1
+        if not self._get_spanning():
+            start, _, step = self._segments[index]
+            return self._get_offsets()[index] + (frame - start) // step
+
+        return sum(
+            _count(_slice(segment, segment[0], frame - 1))
+            for segment in self._segments[:index + 1]
+            if segment[0] < frame
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, FrameSet):
+            try:
+                other = FrameSet(other)
+            except (TypeError, ValueError):
+                return NotImplemented
+        if self._segments == other._segments:
+            return True
+        if len(self) != len(other):
+            return False
+        # Equal sets may be split into ranges differently
+        return not self.difference(other)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def union(self, *others):
+        '''Frames in this set or any of the others'''
+
+        segments = list(self._segments)
+        for other in others:
+            segments.extend(FrameSet(other)._segments)
+        return self._from_segments(_normalize(segments))
+
+    def difference(self, *others):
+        '''Frames in this set and none of the others'''
+
+        segments = self._segments
+        for other in others:
+            other = FrameSet(other)
+            result = []
+            for segment in segments:
+                result.extend(_remove(
+                    segment,
+                    sorted(other._overlapping(segment[0], segment[1])),
+                ))
+            segments = _coalesce(sorted(result))
+        return self._from_segments(list(segments))
+
+    def intersection(self, *others):
+        '''Frames in this set and all of the others'''
+
+        segments = self._segments
+        for other in others:
+            other = FrameSet(other)
+            result = []
+            for segment in segments:
+                for o in other._overlapping(segment[0], segment[1]):
+                    common = _intersect(segment, o)
+                    if common is not None:
+                        result.append(common)
+            segments = _coalesce(sorted(result))
+        return self._from_segments(list(segments))
+
+    __or__ = union
+    __sub__ = difference
+    __and__ = intersection
+
+    def chunks(self, size):
+        '''
+        Split the set into consecutive FrameSets of size frames, the way
+        Deadline splits a job's frame list into tasks.
+
+        :param size: Number of frames per chunk, the job's ChunkSize
+        '''
+
+        if size < 1:
+            raise ValueError('Chunk size must be at least 1')
+
+        if self._get_spanning():
+            chunk = []
+            for frame in self:
+                chunk.append(frame)
+                if len(chunk) == size:
+                    yield self._from_segments(_compress(chunk))
+                    chunk = []
+            if chunk:
+                yield self._from_segments(_compress(chunk))
+            return
+
+        chunk = []
+        remaining = size
+        for start, end, step in self._segments:
+            while start <= end:
+                count = min(remaining, (end - start) // step + 1)
+                last = start + (count - 1) * step
+                chunk.append((start, last, step if count > 1 else 1))
+                start = last + step
+                remaining -= count
+                if not remaining:
+                    yield self._from_segments(_coalesce(chunk))
+                    chunk = []
+                    remaining = size
+        if chunk:
+            yield self._from_segments(_coalesce(chunk))
+
+    def __str__(self):
+        parts = []
+        for start, end, step in self._segments:
+            if start == end:
+                parts.append(str(start))
+            elif end - start == step and step > 1:
+                parts.extend([str(start), str(end)])
+            elif step == 1:
+                parts.append('{}-{}'.format(start, end))
+            else:
+                parts.append('{}-{}x{}'.format(start, end, step))
+        return ','.join(parts)
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, str(self))
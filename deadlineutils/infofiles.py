@@ -0,0 +1,50 @@
+'''
+deadlineutils.infofiles
+=======================
+Read Deadline job and plugin info files, key=value lines, into dictionaries::
+
+    job_info = read_info_file('/spool/shot_010.job')
+    infos = read_info_directory('/spool', pattern='*.job')
+
+Files are read line by line through a read-only memory map in linear time.
+Keys and values are stripped, lines without = are skipped and a repeated key
+keeps its last value. Values are kept verbatim, quotes and backslashes are
+escaped when the dictionary is encoded as JSON.
+'''
+from __future__ import absolute_import
+import fnmatch
+import os
+
+from .workers import run
+
+try:
+    from Deadline.DeadlineUtility import ParseInfoFile
+except ImportError:
+    from .packages.Deadline.DeadlineUtility import ParseInfoFile
+
+
+def read_info_file(path):
+    '''
+    Dictionary of the key=value lines of an info file
+
+    :param path: Path of the job or plugin info file
+    '''
+
+    return ParseInfoFile(path)
+
+
+def read_info_directory(directory, pattern='*.job', max_workers=8):
+    '''
+    Read the info files of a directory concurrently. Returns a dictionary
+    mapping paths to info dictionaries.
+
+    :param directory: Directory holding the info files
+    :param pattern: fnmatch pattern of the file names to read
+    :param max_workers: Number of files read concurrently
+    '''
+
+    paths = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if fnmatch.fnmatch(name, pattern)
+    )
+    return dict(zip(paths, run(read_info_file, paths, max_workers)))
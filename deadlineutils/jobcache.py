@@ -0,0 +1,295 @@
+'''
+deadlineutils.jobcache
+======================
+On-disk cache for Web Service results that can no longer change because the
+job reached a terminal state::
+
+    reports = CachedJobReports(connection, JobResultCache())
+    for job in connection.Jobs.GetJobsInState('Completed'):
+        statistics = reports.job_statistics(job)
+        history = reports.job_history(job)
+
+Results are stored as zlib compressed JSON blobs in SQLite, addressed by the
+SHA-1 of their contents so identical results are stored once. Entries map a
+job id, request kind and arguments to a blob. Only results of jobs in a
+terminal state are admitted. When the blobs exceed max_bytes the least
+recently used entries are evicted.
+'''
+from __future__ import absolute_import
+import hashlib
+import json
+import sqlite3
+import time
+import zlib
+
+from .utils import data_path, string_types
+
+
+# Job Stat values whose results never change, completed
+TERMINAL_STATES = (3,)
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    job_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    args TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    last_access REAL NOT NULL,
+    PRIMARY KEY (job_id, kind, args)
+);
+CREATE INDEX IF NOT EXISTS entries_access ON entries (last_access);
+CREATE INDEX IF NOT EXISTS entries_hash ON entries (hash);
+'''
+
+
+def _is_error(result):
+    '''
+    True for missing results, error responses, which carry their HTTP status,
+    and plain strings reporting an error
+    '''
+
+    if result is None or hasattr(result, 'status'):
+        return True
+    return (
+        isinstance(result, string_types) and
+        result.lstrip().lower().startswith('error')
+    )
+
+
+class JobResultCache(object):
+    '''
+    Size bounded LRU cache of results keyed by job id.
+
+    :param path: Path to the SQLite database, defaults to jobcache.db in the
+        deadlineutils data directory
+    :param max_bytes: Maximum compressed size of all cached results
+    :param terminal_states: Job Stat values admitted to the cache
+    '''
+
+    def __init__(self, path=None, max_bytes=1024 ** 3,
+                 terminal_states=TERMINAL_STATES):
+        self.path = path or data_path('jobcache.db')
+        self.max_bytes = max_bytes
+        self.terminal_states = terminal_states
+        self.hits = 0
+        self.misses = 0
+
+        db = self._connect()
+        try:
+            db.executescript(_SCHEMA)
+        finally:
+            db.close()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute('PRAGMA journal_mode=WAL')
+        return db
+
+    def admits(self, job):
+        '''True when results of job may be cached'''
+
+        return isinstance(job, dict) and \
+            job.get('Stat') in self.terminal_states
+
+    def get(self, job_id, kind, args=()):
+        '''
+        Get a cached result. Returns (True, result) on a hit and
+        (False, None) on a miss.
+
+        :param job_id: The Job ID
+        :param kind: Name of the request, e.g. 'statistics'
+        :param args: Further request arguments, e.g. a task id
+        '''
+
+        key = (job_id, kind, json.dumps(list(args)))
+        db = self._connect()
+        try:
+            row = db.execute(
+                'SELECT blobs.data FROM entries JOIN blobs '
+                'ON blobs.hash = entries.hash '
+                'WHERE job_id = ? AND kind = ? AND args = ?',
+                key
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return False, None
+            with db:
+                db.execute(
+                    'UPDATE entries SET last_access = ? '
+                    'WHERE job_id = ? AND kind = ? AND args = ?',
+                    (time.time(),) + key
+                )
+        finally:
+            db.close()
+
+        self.hits += 1
+        return True, json.loads(zlib.decompress(bytes(row[0])).decode('utf-8'))
+
+    def put(self, job_id, kind, result, args=()):
+        '''
+        Store a result. Callers must only store results of jobs in a
+        terminal state, see admits.
+
+        :param job_id: The Job ID
+        :param kind: Name of the request
+        :param result: JSON serialisable result
+        :param args: Further request arguments
+        '''
+
+        data = json.dumps(result, sort_keys=True).encode('utf-8')
+        digest = hashlib.sha1(data).hexdigest()
+        blob = zlib.compress(data)
+
+        db = self._connect()
+        try:
+            with db:
+                db.execute(
+                    'INSERT OR IGNORE INTO blobs (hash, data, size) '
+                    'VALUES (?, ?, ?)',
+                    (digest, sqlite3.Binary(blob), len(blob))
+                )
+                db.execute(
+                    'INSERT OR REPLACE INTO entries '
+                    '(job_id, kind, args, hash, last_access) '
+                    'VALUES (?, ?, ?, ?, ?)',
+                    (job_id, kind, json.dumps(list(args)), digest, time.time())
+                )
+            self._evict(db)
+        finally:
+            db.close()
+
+    def size(self):
+        '''Compressed size of all cached results in bytes'''
+
+        db = self._connect()
+        try:
+            return db.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM blobs'
+            ).fetchone()[0]
+        finally:
+            db.close()
+
+    def _evict(self, db):
+        total = db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM blobs'
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        with db:
+            rows = db.execute(
+                'SELECT job_id, kind, args, entries.hash, size FROM entries '
+                'JOIN blobs ON blobs.hash = entries.hash '
+                'ORDER BY last_access'
+            ).fetchall()
+            for job_id, kind, args, digest, size in rows:
+                if total <= self.max_bytes:
+                    break
+                db.execute(
+                    'DELETE FROM entries '
+                    'WHERE job_id = ? AND kind = ? AND args = ?',
+                    (job_id, kind, args)
+                )
+                # Blobs are shared by identical results
+                if db.execute(
+                    'DELETE FROM blobs WHERE hash = ? AND hash NOT IN '
+                    '(SELECT hash FROM entries)', (digest,)
+                ).rowcount:
+                    total -= size
+
+    def cached(self, job, kind, fetch, args=()):
+        '''
+        Get a result from the cache or call fetch and cache what it returns
+        when the job is in a terminal state.
+
+        :param job: Job dictionary
+        :param kind: Name of the request
+        :param fetch: Callable returning the result
+        :param args: Further request arguments
+        '''
+
+        hit, result = self.get(job['_id'], kind, args)
+        if hit:
+            return result
+
+        result = fetch()
+        if self.admits(job) and not _is_error(result):
+            self.put(job['_id'], kind, result, args)
+        return result
+
+
+class CachedJobReports(object):
+    '''
+    Job statistics, history and reports served from a JobResultCache.
+
+    Pass job dictionaries so the state is known without a request. When a job
+    id is passed the job is requested on a cache miss.
+
+    :param connection: deadlineutils.connection.Connection instance
+    :param cache: JobResultCache instance
+    '''
+
+    def __init__(self, connection, cache=None):
+        self.connection = connection
+        self.cache = cache or JobResultCache()
+
+    def _job(self, job):
+        if isinstance(job, dict):
+            return job
+        # Only jobs in a terminal state are cached, a hit needs no request
+        hit, result = self.cache.get(job, 'job')
+        if hit:
+            return result
+        result = self.connection.Jobs.GetJob(job)
+        if not isinstance(result, dict):
+            return {'_id': job}
+        if self.cache.admits(result):
+            self.cache.put(job, 'job', result)
+        return result
+
+    def job_statistics(self, job):
+        '''Jobs.CalculateJobStatistics of a job'''
+
+        job = self._job(job)
+        return self.cache.cached(
+            job, 'statistics',
+            lambda: self.connection.Jobs.CalculateJobStatistics(job['_id']),
+        )
+
+    def job_history(self, job):
+        '''JobReports.GetJobHistoryEntries of a job'''
+
+        job = self._job(job)
+        reports = self.connection.JobReports
+        return self.cache.cached(
+            job, 'history',
+            lambda: reports.GetJobHistoryEntries(job['_id']),
+        )
+
+    def job_reports(self, job):
+        '''JobReports.GetAllJobReportsContents of a job'''
+
+        job = self._job(job)
+        return self.cache.cached(
+            job, 'reports',
+            lambda: self.connection.JobReports.GetAllJobReportsContents(
+                job['_id']
+            ),
+        )
+
+    def task_reports(self, job, task_id):
+        '''TaskReports.GetAllTaskReportsContents of a task'''
+
+        job = self._job(job)
+        return self.cache.cached(
+            job, 'task_reports',
+            lambda: self.connection.TaskReports.GetAllTaskReportsContents(
+                job['_id'], task_id
+            ),
+            args=(str(task_id),),
+        )
@@ -0,0 +1,230 @@
+'''
+deadlineutils.limiter
+=====================
+Adaptive concurrency limit and request rate caps shared by every thread
+using a connection::
+
+    connection.limit(max_limit=64, rates={'reads': 100, 'writes': 20})
+    connection.sweep_failed_tasks(max_workers=64)
+
+AdaptiveLimiter lets at most limit requests be in flight. The limit grows by
+one for every limit requests answered while latency stays flat, additive
+increase, and is multiplied by backoff when the recent latency of an
+endpoint rises above tolerance times the best latency seen for it, or a
+request fails to connect, times out or gets a 5xx response, multiplicative
+decrease. Latencies are tracked per endpoint, so fast requests like
+Pools.GetPoolNames next to slow ones like Jobs.GetJobs do not read as
+overload. Other exceptions, like BudgetExceeded, leave the limit alone.
+Fan-out helpers can then use many workers while the Web Service decides how
+many requests it takes.
+
+RateLimiter caps requests per second per endpoint class, reads, writes and
+report contents, with token buckets.
+'''
+from __future__ import absolute_import
+import threading
+import time
+from collections import deque
+
+try:
+    from httplib import HTTPException
+    from urlparse import parse_qsl
+except ImportError:
+    from http.client import HTTPException
+    from urllib.parse import parse_qsl
+
+
+READS = 'reads'
+WRITES = 'writes'
+REPORTS = 'reports'
+
+_REPORT_PATHS = ('/api/jobreports', '/api/taskreports', '/api/slaves')
+
+
+def endpoint_class(method, command):
+    '''Class of a request, 'reads', 'writes' or 'reports' for contents'''
+
+    if method != 'GET':
+        return WRITES
+    path, _, query = command.partition('?')
+    if path.lower() in _REPORT_PATHS:
+        data = dict(parse_qsl(query)).get('Data', '').lower()
+        if 'contents' in data or data == 'all':
+            return REPORTS
+    return READS
+
+
+def endpoint_key(method, command):
+    '''
+    Method, path and query parameter names of a request. Requests with the
+    same key do the same work on the Web Service, Jobs.GetJob and
+    Jobs.GetJobs have different keys.
+    '''
+
+    path, _, query = command.partition('?')
+    names = sorted(set(name for name, _ in parse_qsl(query)))
+    return method, path.lower(), tuple(names)
+
+
+def is_overload(result=None, error=None):
+    '''
+    True for connection errors, timeouts and 5xx responses. Other exceptions
+    are not the Web Service's load.
+    '''
+
+    if error is not None:
+        return isinstance(error, (EnvironmentError, HTTPException))
+    return getattr(result, 'status', 0) >= 500
+
+
+class AdaptiveLimiter(object):
+    '''
+    Transport interceptor limiting requests in flight with additive increase,
+    multiplicative decrease.
+
+    :param initial: Limit to start with
+    :param min_limit: Smallest limit
+    :param max_limit: Largest limit
+    :param backoff: Factor applied to the limit on overload
+    :param tolerance: Recent latency of an endpoint above tolerance times
+        its best latency counts as overload
+    :param smoothing: Weight of a new latency sample in the recent latency
+    :param samples: Number of latencies per endpoint the best latency is
+        taken from
+    '''
+
+    def __init__(self, initial=4, min_limit=1, max_limit=64, backoff=0.5,
+                 tolerance=2.0, smoothing=0.2, samples=200):
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.samples = samples
+        self.in_flight = 0
+        self.decreases = 0
+        self.latencies = {}
+        self._best = {}
+        self._last_decrease = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        '''Wait until a request may be sent'''
+
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency=None, overload=False, key=None):
+        '''
+        Record a finished request and adjust the limit
+
+        :param latency: Seconds the request took, None to leave the limit
+            alone
+        :param overload: The request failed to connect, timed out or got a
+            5xx response
+        :param key: Endpoint of the request, see endpoint_key
+        '''
+
+        with self._condition:
+            self.in_flight -= 1
+            if latency is None and not overload:
+                self._condition.notify_all()
+                return
+
+            recent = self.latencies.get(key)
+            if not overload:
+                best = self._best.get(key)
+                if best is None:
+                    best = self._best[key] = deque(maxlen=self.samples)
+                best.append(latency)
+                if recent is None:
+                    recent = latency
+                else:
+                    recent += self.smoothing * (latency - recent)
+                self.latencies[key] = recent
+                overload = recent > self.tolerance * max(min(best), 0.001)
+
+            now = time.time()
+            if overload:
+                # Requests sent before the last decrease still report the
+                # old load, decrease at most once per recent latency
+                if now - self._last_decrease > (recent or 0):
+                    self.limit = max(self.min_limit, self.limit * self.backoff)
+                    self._last_decrease = now
+                    self.decreases += 1
+            else:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+    def __call__(self, method, command, body, send):
+        key = endpoint_key(method, command)
+        self.acquire()
+        started = time.time()
+        try:
+            result = send(method, command, body)
+        except Exception as e:
+            if is_overload(error=e):
+                self.release(time.time() - started, True, key)
+            else:
+                self.release()
+            raise
+        self.release(time.time() - started, is_overload(result), key)
+        return result
+
+
+class TokenBucket(object):
+    '''
+    Allows rate events per second on average and bursts of burst events.
+
+    :param rate: Events per second
+    :param burst: Largest number of events at once, defaults to rate
+    '''
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or max(rate, 1))
+        self.tokens = self.burst
+        self.updated = time.time()
+        self._lock = threading.Lock()
+
+    def take(self):
+        '''Take a token, waiting until one is available'''
+
+        while True:
+            with self._lock:
+                now = time.time()
+                self.tokens = min(
+                    self.burst, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class RateLimiter(object):
+    '''
+    Transport interceptor capping requests per second per endpoint class.
+
+    :param rates: Dictionary mapping 'reads', 'writes' and 'reports' to
+        requests per second, classes left out are not capped
+    :param bursts: Optional dictionary of burst sizes per class
+    '''
+
+    def __init__(self, rates, bursts=None):
+        bursts = bursts or {}
+        self.buckets = dict(
+            (name, TokenBucket(rate, bursts.get(name)))
+            for name, rate in rates.items() if rate
+        )
+
+    def __call__(self, method, command, body, send):
+        bucket = self.buckets.get(endpoint_class(method, command))
+        if bucket is not None:
+            bucket.take()
+        return send(method, command, body)
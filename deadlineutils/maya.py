@@ -1,11 +1,14 @@
 '''
 deadlineutils.maya
 ==================
-Provides two methods, submit_job and get_job_info
+Provides submit_job, get_job_info and get_scene_info
 '''
 from __future__ import absolute_import, print_function
 import os
+import re
 import getpass
+from .chunking import get_advisor
+from .frames import FrameSet
 
 
 def submit_job(connection, render_path, render_prefix, render_layers,
@@ -48,10 +51,277 @@ def submit_job(connection, render_path, render_prefix, render_layers,
             print('Success!')
 
 
+# Scene introspection cached per (scene path, modification time). Cleared by
+# Maya scene callbacks and by changes to the nodes it was read from, see
+# _install_callbacks and _watch_nodes
+_scene_cache = {}
+_callback_ids = []
+_node_callback_ids = {}
+
+# Master layer of legacy render layers
+_MASTER_LAYER = 'defaultRenderLayer'
+
+# Attributes read from the scene and the key they are stored under
+_SCENE_ATTRS = {
+    'defaultRenderGlobals.startFrame': 'start_frame',
+    'defaultRenderGlobals.endFrame': 'end_frame',
+    'defaultRenderGlobals.currentRenderer': 'renderer',
+    'defaultRenderGlobals.ren': 'renderer',
+    'defaultResolution.width': 'image_width',
+    'defaultResolution.height': 'image_height',
+}
+
+# Nodes whose attribute changes make the scene cache stale, besides render
+# layers and the renderer nodes of _RENDERER_EXTENSIONS
+_WATCHED_NODES = ('defaultRenderGlobals', 'defaultResolution')
+
+
+def clear_scene_cache(*args):
+    '''Forget cached scene information. Used as a Maya callback'''
+
+    _scene_cache.clear()
+
+
+def _reset_scene(*args):
+    '''Forget cached scene information and the nodes watched for changes'''
+
+    _scene_cache.clear()
+    try:
+        from maya import OpenMaya
+    except ImportError:
+        return
+    for callback_id in _node_callback_ids.values():
+        try:
+            OpenMaya.MMessage.removeCallback(callback_id)
+        except RuntimeError:
+            pass
+    _node_callback_ids.clear()
+
+
+def _install_callbacks():
+    '''
+    Clear the scene cache whenever a scene is created, opened or saved and
+    whenever a render layer is created or deleted
+    '''
+
+    if _callback_ids:
+        return
+
+    try:
+        from maya import OpenMaya
+    except ImportError:
+        return
+
+    messages = ('kAfterNew', 'kAfterOpen', 'kAfterSave', 'kAfterImport',
+                'kAfterCreateReference', 'kAfterRemoveReference')
+    for message in messages:
+        _callback_ids.append(OpenMaya.MSceneMessage.addCallback(
+            getattr(OpenMaya.MSceneMessage, message),
+            _reset_scene
+        ))
+    _callback_ids.append(OpenMaya.MDGMessage.addNodeAddedCallback(
+        clear_scene_cache, 'renderLayer'
+    ))
+    _callback_ids.append(OpenMaya.MDGMessage.addNodeRemovedCallback(
+        clear_scene_cache, 'renderLayer'
+    ))
+
+
+def _watch_nodes(nodes):
+    '''
+    Clear the scene cache when an attribute of one of the nodes changes, so
+    render settings edited in the session without saving are read again
+    '''
+
+    try:
+        from maya import OpenMaya
+    except ImportError:
+        return
+
+    for node in nodes:
+        if node in _node_callback_ids:
+            continue
+        selection = OpenMaya.MSelectionList()
+        try:
+            selection.add(node)
+        except RuntimeError:
+            continue
+        mobject = OpenMaya.MObject()
+        selection.getDependNode(0, mobject)
+        _node_callback_ids[node] = \
+            OpenMaya.MNodeMessage.addAttributeChangedCallback(
+                mobject, clear_scene_cache
+            )
+
+
+# Render prefix tokens resolved into output filenames
+_PREFIX_TOKENS = re.compile(r'<(scene|renderlayer|layer)>', re.IGNORECASE)
+
+# Attribute holding the image format of renderers with their own setting
+_RENDERER_EXTENSIONS = {
+    'arnold': 'defaultArnoldDriver.ai_translator',
+    'vray': 'vraySettings.imageFormatStr',
+}
+
+
+def _image_extension(cmds, renderer):
+    '''File extension of the images the renderer writes'''
+
+    attr = _RENDERER_EXTENSIONS.get(renderer)
+    if attr and cmds.objExists(attr):
+        extension = cmds.getAttr(attr)
+        if extension:
+            return extension.split(' ')[0].lower()
+    return cmds.getAttr('defaultRenderGlobals.imfPluginKey') or 'iff'
+
+
+def _output_path(render_path, render_prefix, render_layer, scene_path,
+                 padding, extension):
+    '''
+    OutputDirectory0 and OutputFilename0 of a render layer, using Maya's
+    name.#.ext naming. The filename is None when the prefix holds tokens
+    other than <Scene>, <RenderLayer> and <Layer>.
+    '''
+
+    values = {
+        'scene': os.path.splitext(os.path.basename(scene_path))[0],
+        'renderlayer': render_layer,
+        'layer': render_layer,
+    }
+    prefix = _PREFIX_TOKENS.sub(
+        lambda match: values[match.group(1).lower()],
+        render_prefix or '<Scene>',
+    )
+    directory, name = os.path.split(prefix)
+    if directory:
+        render_path = os.path.join(render_path, directory)
+    if '<' in prefix:
+        return render_path, None
+    return render_path, '{}.{}.{}'.format(name, '#' * padding, extension)
+
+
+def _scene_key(scene_path):
+    try:
+        mtime = os.path.getmtime(scene_path)
+    except OSError:
+        mtime = None
+    return scene_path, mtime
+
+
+def _get_layer_overrides(cmds):
+    '''
+    Collect render layer overrides of frame range, renderer and resolution in
+    one pass over all render layers, including the current one and the
+    master layer values held while another layer is current. Never switches
+    the current layer.
+    '''
+
+    overrides = {}
+
+    for layer in cmds.ls(type='renderLayer') or []:
+        layer_overrides = {}
+        indices = cmds.getAttr(layer + '.adjustments', multiIndices=True)
+        for index in indices or []:
+            adjustment = '{}.adjustments[{}]'.format(layer, index)
+            plugs = cmds.listConnections(
+                adjustment + '.plug',
+                source=True,
+                destination=False,
+                plugs=True,
+            )
+            if not plugs or plugs[0] not in _SCENE_ATTRS:
+                continue
+            value = cmds.getAttr(adjustment + '.value')
+            layer_overrides[_SCENE_ATTRS[plugs[0]]] = value
+
+        if layer_overrides:
+            overrides[layer] = layer_overrides
+
+    return overrides
+
+
+def _get_render_settings(cmds):
+    '''Live values of the render settings cached by get_scene_info'''
+
+    return {
+        'start_frame': cmds.getAttr('defaultRenderGlobals.startFrame'),
+        'end_frame': cmds.getAttr('defaultRenderGlobals.endFrame'),
+        'image_width': cmds.getAttr('defaultResolution.width'),
+        'image_height': cmds.getAttr('defaultResolution.height'),
+        'renderer': cmds.getAttr('defaultRenderGlobals.ren'),
+    }
+
+
+def get_scene_info(scene_path=None):
+    '''
+    Get render settings of the current scene as a dictionary. Results are
+    cached per scene path and modification time until the scene changes, so
+    repeated submissions skip scene introspection. Changes to the render
+    globals, resolution, render layers and renderer settings made in the
+    session clear the cache too.
+
+    :param scene_path: Scene file, defaults to the current scene
+    '''
+
+    from maya import cmds
+
+    if scene_path is None:
+        scene_path = os.path.abspath(cmds.file(query=True, sn=True))
+
+    key = _scene_key(scene_path)
+    if key in _scene_cache:
+        return _scene_cache[key]
+
+    _install_callbacks()
+
+    layers = _get_layer_overrides(cmds)
+    settings = _get_render_settings(cmds)
+    current_layer = cmds.editRenderLayerGlobals(
+        q=True, currentRenderLayer=True
+    )
+    # While another layer is current, the master layer values of the
+    # attributes it overrides are held by adjustments of the master layer
+    master_values = layers.pop(_MASTER_LAYER, {})
+    if current_layer != _MASTER_LAYER and layers.get(current_layer):
+        # The live values hold the current layer's overrides
+        layers[current_layer] = dict(
+            (name, settings[name]) for name in layers[current_layer]
+        )
+        settings.update(master_values)
+
+    scene_info = dict(
+        settings,
+        scene_path=scene_path,
+        version=cmds.about(version=True),
+        padding=cmds.getAttr('defaultRenderGlobals.extensionPadding'),
+        project_path=cmds.workspace(q=True, rootDirectory=True),
+        layers=layers,
+    )
+    renderers = set([scene_info['renderer']])
+    for overrides in layers.values():
+        if 'renderer' in overrides:
+            renderers.add(overrides['renderer'])
+    scene_info['extensions'] = dict(
+        (renderer, _image_extension(cmds, renderer)) for renderer in renderers
+    )
+
+    _watch_nodes(
+        list(_WATCHED_NODES) + list(cmds.ls(type='renderLayer') or []) +
+        [_RENDERER_EXTENSIONS[renderer].split('.')[0]
+         for renderer in renderers if renderer in _RENDERER_EXTENSIONS]
+    )
+    _scene_cache.clear()
+    _scene_cache[key] = scene_info
+    return scene_info
+
+
 def get_job_info(render_path, render_prefix, render_layer, cache=None, **kwargs):
     '''
     Get job_info and plugin_info to use with Connection.submit_job
 
+    Scene introspection is shared through get_scene_info, render layer
+    overrides of frame range, renderer and resolution are applied on top.
+
     :param render_path: output directory for the rendered images
     :param render_prefix: filename prefix for rendered images
     :param render_layer: Render layer
@@ -72,43 +342,39 @@ def get_job_info(render_path, render_prefix, render_layer, cache=None, **kwargs)
         if cache is None:
             cache = {}
 
-        if 'sceneFile' in kwargs:
-            scene_path = kwargs['sceneFile']
-        else:
-            scene_path = os.path.abspath(cmds.file(query=True, sn=True))
-
+        scene_info = get_scene_info(kwargs.get('sceneFile'))
+        scene_path = scene_info['scene_path']
         scene_name = os.path.basename(scene_path)
-        start_frame = int(cmds.getAttr('defaultRenderGlobals.startFrame'))
-        end_frame = int(cmds.getAttr('defaultRenderGlobals.endFrame'))
-        image_width = cmds.getAttr('defaultResolution.width')
-        image_height = cmds.getAttr('defaultResolution.height')
-        version = cmds.about(version=True)
-        renderer = cmds.getAttr('defaultRenderGlobals.ren')
-        project_path = cmds.workspace(q=True, rootDirectory=True)
 
         cache.update({
+            'layers': scene_info['layers'],
+            'output': (scene_path, scene_info['padding'],
+                       scene_info['extensions']),
             'job_info': {
                 'BatchName': scene_name,
                 'UserName': getpass.getuser(),
-                'Frames': '-'.join([str(start_frame), str(end_frame)]),
+                'Frames': str(FrameSet.from_range(
+                    scene_info['start_frame'],
+                    scene_info['end_frame'],
+                )),
                 'Plugin': 'MayaBatch',
                 'OutputDirectory0': render_path,
             },
             'plugin_info': {
                 'Animation': 1,
-                'Renderer': renderer,
+                'Renderer': scene_info['renderer'],
                 'UsingRenderLayers': 1,
                 'RenderHalfFrames': 0,
                 'FrameNumberOffset': 0,
                 'LocalRendering': 0,
                 'StrictErrorChecking': 0,
                 'MaxProcessors': 0,
-                'Version': version,
+                'Version': scene_info['version'],
                 'Build': '64bit',
-                'ProjectPath': project_path,
+                'ProjectPath': scene_info['project_path'],
                 'CommandLineOptions': '',
-                'ImageWidth': image_width,
-                'ImageHeight': image_height,
+                'ImageWidth': scene_info['image_width'],
+                'ImageHeight': scene_info['image_height'],
                 'OutputFilePath': render_path,
                 'OutputFilePrefix': render_prefix,
                 'IgnoreErrorCode211': 1,
@@ -124,6 +390,38 @@ def get_job_info(render_path, render_prefix, render_layer, cache=None, **kwargs)
     job_info['Name'] = ' - '.join([job_info['BatchName'], render_layer])
     plugin_info['RenderLayer'] = render_layer
 
+    overrides = cache.get('layers', {}).get(render_layer, {})
+    if 'start_frame' in overrides or 'end_frame' in overrides:
+        frames = FrameSet(job_info['Frames'])
+        job_info['Frames'] = str(FrameSet.from_range(
+            overrides.get('start_frame', frames.first),
+            overrides.get('end_frame', frames.last),
+        ))
+    if 'renderer' in overrides:
+        plugin_info['Renderer'] = overrides['renderer']
+    if 'image_width' in overrides:
+        plugin_info['ImageWidth'] = overrides['image_width']
+    if 'image_height' in overrides:
+        plugin_info['ImageHeight'] = overrides['image_height']
+
+    scene_path, padding, extensions = cache['output']
+    directory, filename = _output_path(
+        render_path, render_prefix, render_layer, scene_path, padding,
+        extensions[plugin_info['Renderer']],
+    )
+    job_info['OutputDirectory0'] = directory
+    if filename:
+        job_info['OutputFilename0'] = filename
+
+    chunk_size = get_advisor().advise(
+        job_info['BatchName'],
+        job_info['Plugin'],
+        render_layer,
+        frame_count=len(FrameSet(job_info['Frames'])),
+    )
+    if chunk_size:
+        job_info['ChunkSize'] = chunk_size
+
     # Renderer Specific Info
     try:
         renderer_info = {
@@ -131,7 +429,7 @@ def get_job_info(render_path, render_prefix, render_layer, cache=None, **kwargs)
                 'ArnoldVerbose': 1,
             },
             'vray': {},
-        }[plugin_info['renderer']]
+        }[plugin_info['Renderer']]
     except KeyError:
         pass
     else:
@@ -7,6 +7,8 @@ from __future__ import absolute_import, print_function
 import os
 import getpass
 import re
+from .chunking import get_advisor
+from .frames import FrameSet
 
 
 def submit_job(connection, write_nodes, pool=None, second_pool=None, **kwargs):
@@ -50,7 +52,7 @@ def _get_frame_range(write_node):
     if limit:
         first = write_node['first'].getValue()
         last = write_node['last'].getValue()
-        return '{}-{}'.format(first, last)
+        return '{}-{}'.format(int(first), int(last))
 
     return str(write_node.frameRange())
 
@@ -71,7 +73,8 @@ def get_job_info(write_node, **kwargs):
     :param render_path: output directory for the rendered images
     :param render_prefix: filename prefix for rendered images
     :param write_node: Write node
-    :param kwargs: job_info/plugin_info key overrides
+    :param kwargs: job_info/plugin_info key overrides, ChunkSize defaults to
+        the chunking advisor's suggestion or 10
     '''
 
     try:
@@ -97,6 +100,16 @@ def get_job_info(write_node, **kwargs):
     dirname, basename = os.path.split(filepath)
     basename = _replace_padding_with_hashes(basename)
 
+    chunk_size = kwargs.get('ChunkSize')
+    if chunk_size is None:
+        chunk_size = get_advisor().advise(
+            script,
+            kwargs.get('Plugin', 'Nuke'),
+            write_node.fullName(),
+            frame_count=len(FrameSet(frames)),
+            default=10,
+        )
+
     job_info = {
         'BatchName': script,
         'Name': script + ' - ' + write_node.fullName(),
@@ -105,7 +118,7 @@ def get_job_info(write_node, **kwargs):
         'OutputDirectory0': dirname,
         'OutputFilename0': basename,
         'Frames': frames,
-        'ChunkSize': kwargs.get('ChunkSize', 10),
+        'ChunkSize': chunk_size,
     }
 
     plugin_info = {
@@ -1,6 +1,6 @@
 from ConnectionProperty import ConnectionProperty
 from DeadlineUtility import ArrayToCommaSeparatedString
-import json
+import DeadlineJSON
 
 class Balancer:
     """
@@ -38,9 +38,7 @@ class Balancer:
             Input: info: Json object of the Balancer info.
             Returns: Success message.
         """
-        info = json.dumps(info)
-        
-        body = '{"Command":"saveinfo", "BalancerInfo":'+info+'}'
+        body = DeadlineJSON.dumps({"Command":"saveinfo", "BalancerInfo":info})
         
         return self.connectionProperties.__put__("/api/balancer", body)
         
@@ -67,9 +65,7 @@ class Balancer:
             Input: settings: Json object of the Balancer settings.
             Returns: Success message.
         """
-        settings = json.dumps(settings)
-        
-        body = '{"Command":"savesettings", "BalancerSettings":'+settings+'}'
+        body = DeadlineJSON.dumps({"Command":"savesettings", "BalancerSettings":settings})
         
         return self.connectionProperties.__put__("/api/balancer", body)
         
@@ -12,6 +12,7 @@ class ConnectionProperty:
         self.useAuth = useAuth
         self.user = ""
         self.password = ""
+        self.timeout = None
         
     def GetAddress(self):
         return self.address
@@ -32,18 +33,31 @@ class ConnectionProperty:
     def EnableAuthentication(self, enable):
         self.useAuth = enable
         
-    def __get__(self, commandString):
+    def GetTimeout(self):
+        return self.timeout
         
-        return DeadlineSend.send(self.address,commandString, "GET", self.useAuth, self.user, self.password)
+    def SetTimeout(self, timeout):
+        """ Sets the default timeout of requests.
+            Params: timeout in seconds (number), (connect, read) tuple or None to wait forever.
+        """
+        self.timeout = timeout
         
-    def __put__(self, commandString, body):
+    def RequestTimeout(self, limit=None):
+        """ Gets the (connect, read) timeout of a request, the default timeout limited to limit seconds. """
+        return DeadlineSend.limitTimeout(self.timeout, limit)
         
-        return DeadlineSend.pSend(self.address, commandString, "PUT", body, self.useAuth, self.user, self.password)
+    def __get__(self, commandString, timeout=None):
         
-    def __delete__(self, commandString):
+        return DeadlineSend.send(self.address,commandString, "GET", self.useAuth, self.user, self.password, self.RequestTimeout(timeout))
         
-        return DeadlineSend.send(self.address,commandString, "DELETE", self.useAuth, self.user, self.password)
+    def __put__(self, commandString, body, timeout=None):
         
-    def __post__(self, commandString, body):
+        return DeadlineSend.pSend(self.address, commandString, "PUT", body, self.useAuth, self.user, self.password, self.RequestTimeout(timeout))
         
-        return DeadlineSend.pSend(self.address, commandString, "POST", body, self.useAuth, self.user, self.password)
\ No newline at end of file
+    def __delete__(self, commandString, timeout=None):
+        
+        return DeadlineSend.send(self.address,commandString, "DELETE", self.useAuth, self.user, self.password, self.RequestTimeout(timeout))
+        
+    def __post__(self, commandString, body, timeout=None):
+        
+        return DeadlineSend.pSend(self.address, commandString, "POST", body, self.useAuth, self.user, self.password, self.RequestTimeout(timeout))
\ No newline at end of file
@@ -19,6 +19,7 @@ import Plugins
 import Slaves
 import Users
 import Balancer
+import ProxyServer
 from ConnectionProperty import ConnectionProperty
 
 #http://docs.python.org/2/library/httplib.html
@@ -57,6 +58,7 @@ class DeadlineCon:
         self.Slaves = Slaves.Slaves(self.connectionProperties)
         self.Users = Users.Users(self.connectionProperties)
         self.Balancer = Balancer.Balancer(self.connectionProperties)
+        self.ProxyServer = ProxyServer.ProxyServer(self.connectionProperties)
         
     def EnableAuthentication(self, enable=True):
         """
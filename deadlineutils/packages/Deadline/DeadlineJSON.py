@@ -0,0 +1,66 @@
+import json
+
+#JSON codec used for every request body and response.
+#The fastest importable backend is used, the json module is the fallback.
+
+class Encoded(str):
+    """
+        JSON text encoded ahead of time, inserted into request bodies unchanged.
+    """
+
+def _ujsonBackend():
+    import ujson
+    def dumps(obj):
+        return ujson.dumps(obj, ensure_ascii=True, escape_forward_slashes=False)
+    return "ujson", dumps, ujson.loads
+
+def _simplejsonBackend():
+    import simplejson
+    #Without its C speedups simplejson is slower than json
+    from simplejson import _speedups
+    def loads(data):
+        return simplejson.loads(data, strict=False)
+    return "simplejson", simplejson.dumps, loads
+
+def _jsonBackend():
+    decoder = json.JSONDecoder(strict=False)
+    return "json", json.dumps, decoder.decode
+
+BACKENDS = {
+    "ujson": _ujsonBackend,
+    "simplejson": _simplejsonBackend,
+    "json": _jsonBackend,
+}
+
+PREFERRED = ("ujson", "simplejson", "json")
+
+backend = None
+dumps = None
+loads = None
+
+def SetBackend(name=None, encoder=None, decoder=None):
+    """
+        Sets the JSON backend.
+        Params: name of a backend in BACKENDS (string), None for the fastest importable one.
+                encoder and decoder functions of a custom backend, used with name.
+        Returns the name of the backend.
+        Raises ImportError when the backend can not be imported.
+    """
+    global backend, dumps, loads
+    if encoder is not None and decoder is not None:
+        backend, dumps, loads = name or "custom", encoder, decoder
+        return backend
+
+    names = PREFERRED if name is None else (name,)
+    for candidate in names:
+        try:
+            backend, dumps, loads = BACKENDS[candidate]()
+            return backend
+        except ImportError:
+            if name is not None:
+                raise
+
+def GetBackend():
+    return backend
+
+SetBackend()
@@ -1,92 +1,221 @@
+import base64
 import socket
 import httplib
-import json
+import DeadlineJSON
 import urllib2
 import traceback
 
-def send(address, message, requestType, useAuth=False, username="", password=""):
+class ErrorData(str):
+    """
+        Error message returned for an HTTP error response, a string with the HTTP status code in status.
+    """
+    def __new__(cls, data, status):
+        if isinstance(data, unicode):
+            data = data.encode("utf-8")
+        self = str.__new__(cls, data)
+        self.status = status
+        return self
+
+def errorData(data, status):
+    """
+        Wraps the body of an HTTP error response in ErrorData. JSON string bodies are decoded, JSON objects and lists are kept as text so callers never take them for results.
+    """
+    try:
+        decoded = DeadlineJSON.loads(data)
+    except:
+        decoded = None
+    if isinstance(decoded, basestring):
+        data = decoded
+    return ErrorData(data, status)
+
+class TimeoutHTTPConnection(httplib.HTTPConnection):
+    """
+        HTTPConnection connecting with the connect timeout given by urllib2 and reading with its own read timeout.
+    """
+    def __init__(self, host, readTimeout=None, **kwargs):
+        httplib.HTTPConnection.__init__(self, host, **kwargs)
+        self.readTimeout = readTimeout
+        
+    def connect(self):
+        httplib.HTTPConnection.connect(self)
+        if self.readTimeout is not None:
+            self.sock.settimeout(self.readTimeout)
+
+class ChunkedBody:
+    """
+        Request body sent with chunked transfer encoding while it is generated.
+        Params: chunks, iterable of strings joined to the body.
+                chunkSize, bytes collected from chunks before a chunk is sent.
+    """
+    def __init__(self, chunks, chunkSize=65536):
+        self.chunks = iter(chunks)
+        self.chunkSize = chunkSize
+        self.done = False
+        
+    def read(self, blocksize=-1):
+        """ Returns the next chunk framed for chunked transfer encoding, an empty string after the last one. """
+        if self.done:
+            return ""
+        
+        parts = []
+        length = 0
+        for part in self.chunks:
+            if isinstance(part, unicode):
+                part = part.encode("utf-8")
+            parts.append(part)
+            length += len(part)
+            if length >= self.chunkSize:
+                break
+        else:
+            self.done = True
+            
+        data = ""
+        if length:
+            data = "%x\r\n%s\r\n" % (length, "".join(parts))
+        if self.done:
+            data += "0\r\n\r\n"
+        return data
+
+class TimeoutHTTPHandler(urllib2.HTTPHandler):
+    """
+        HTTPHandler opening TimeoutHTTPConnections.
+    """
+    def __init__(self, readTimeout=None):
+        urllib2.HTTPHandler.__init__(self)
+        self.readTimeout = readTimeout
+        
+    def http_request(self, req):
+        body = req.data
+        if not isinstance(body, ChunkedBody):
+            return urllib2.HTTPHandler.http_request(self, req)
+        
+        #Without a data string urllib2 adds no Content-length, httplib streams bodies having read
+        req.data = None
+        req = urllib2.HTTPHandler.http_request(self, req)
+        req.data = body
+        if not req.has_header("Content-type"):
+            req.add_unredirected_header("Content-type", "application/x-www-form-urlencoded")
+        req.add_unredirected_header("Transfer-encoding", "chunked")
+        return req
+        
+    def http_open(self, req):
+        readTimeout = self.readTimeout
+        def connection(host, **kwargs):
+            return TimeoutHTTPConnection(host, readTimeout, **kwargs)
+        return self.do_open(connection, req)
+
+def splitTimeout(timeout):
+    """
+        Splits a timeout into connect and read timeouts.
+        Params: timeout in seconds (number), (connect, read) tuple or None for no timeout.
+        Returns: (connect, read) tuple, either may be None.
+    """
+    if isinstance(timeout, (tuple, list)):
+        return timeout[0], timeout[1]
+    return timeout, timeout
+
+def limitTimeout(timeout, limit):
+    """
+        Limits both parts of a timeout to at most limit seconds.
+        Params: timeout in seconds (number), (connect, read) tuple or None.
+                limit in seconds (number) or None for no limit.
+        Returns: (connect, read) tuple.
+    """
+    connect, read = splitTimeout(timeout)
+    if limit is None:
+        return connect, read
+    if connect is None or connect > limit:
+        connect = limit
+    if read is None or read > limit:
+        read = limit
+    return connect, read
+
+def openRequest(url, requestType, body, useAuth, username, password, timeout):
+    """
+        Opens a request with optional basic authentication and timeouts, returns the response.
+    """
+    connectTimeout, readTimeout = splitTimeout(timeout)
+    handlers = [TimeoutHTTPHandler(readTimeout)]
+    headers = {}
+    
+    if useAuth and isinstance(body, ChunkedBody):
+        #A streamed body can not be sent again after a 401, authenticate up front
+        credentials = base64.b64encode("%s:%s" % (username, password))
+        headers = {"Authorization": "Basic " + credentials}
+    elif useAuth:
+        password_mgr = urllib2.HTTPPasswordMgrWithDefaultRealm()
+
+        password_mgr.add_password(None, url, username, password)
+
+        handlers.append(urllib2.HTTPBasicAuthHandler(password_mgr))
+        
+    opener = urllib2.build_opener(*handlers)
+    request = urllib2.Request(url, data=body, headers=headers)
+    request.get_method = lambda: requestType
+    
+    if connectTimeout is None:
+        return opener.open(request)
+    return opener.open(request, timeout=connectTimeout)
+
+def send(address, message, requestType, useAuth=False, username="", password="", timeout=None):
     """
         Used for sending requests that do not require message body, like GET and DELETE.
         Params: address of the webservice (string).
                 message to the webservice (string).
                 request type for the message (string, GET or DELETE).
+                timeout in seconds (number), (connect, read) tuple or None to wait forever.
+        Raises socket.timeout or urllib2.URLError when the timeout expires.
     """
+    status = None
     try:
         if not address.startswith("http://"):
             address = "http://"+address
         url = address + message
         
-        if useAuth:
-            password_mgr = urllib2.HTTPPasswordMgrWithDefaultRealm()
-
-            password_mgr.add_password(None, url, username, password)
-
-            handler = urllib2.HTTPBasicAuthHandler(password_mgr)
-            opener = urllib2.build_opener(handler)
-            request = urllib2.Request(url)
-            request.get_method = lambda: requestType
-            
-            response = opener.open(request)
-        else:
-            opener = urllib2.build_opener(urllib2.HTTPHandler)
-            request = urllib2.Request(url)
-            request.get_method = lambda: requestType
-            
-            response = opener.open(request)
+        response = openRequest(url, requestType, None, useAuth, username, password, timeout)
 
         data = response.read()
-            
-        data = data.replace('\n',' ')
         
     except urllib2.HTTPError as err:
+        status = err.code
         data = traceback.format_exc()
         if err.code == 401:
             data = "Error: HTTP Status Code 401. Authentication with the Web Service failed. Please ensure that the authentication credentials are set, are correct, and that authentication mode is enabled."
         else:
             data = err.read()
+    if status is not None:
+        #Error responses stay strings carrying their status, even JSON ones
+        return errorData(data, status)
     try:
-        data = json.loads(data)
+        data = DeadlineJSON.loads(data)
     except:
-        pass
-
+        #Plain text responses keep their newlines replaced
+        data = data.replace('\n',' ')
     return data
     
-def pSend(address, message, requestType, body, useAuth=False, username="", password=""):
+def pSend(address, message, requestType, body, useAuth=False, username="", password="", timeout=None):
     """
         Used for sending requests that require a message body, like PUT and POST.
         Params: address of the webservice (string).
                 message to the webservice (string).
                 request type for the message (string, PUT or POST).
-                message body for the request (string, JSON object).
+                message body for the request (string, JSON object, or ChunkedBody to stream it).
+                timeout in seconds (number), (connect, read) tuple or None to wait forever.
+        Raises socket.timeout or urllib2.URLError when the timeout expires.
     """
     response = ""
+    status = None
     try:
         if not address.startswith("http://"):
             address = "http://"+address
         url = address + message
         
-        if useAuth:
-            password_mgr = urllib2.HTTPPasswordMgrWithDefaultRealm()
-            
-            password_mgr.add_password(None, url, username, password)
-
-            handler = urllib2.HTTPBasicAuthHandler(password_mgr)
-            opener = urllib2.build_opener(handler)
-            
-            request = urllib2.Request(url, data=body)
-            request.get_method = lambda: requestType
-            
-            response = opener.open(request)
-        
-        else:
-            opener = urllib2.build_opener(urllib2.HTTPHandler)
-            request = urllib2.Request(url, data=body)
-            request.get_method = lambda: requestType
-            response = opener.open(request)
+        response = openRequest(url, requestType, body, useAuth, username, password, timeout)
             
         data = response.read()
 
     except urllib2.HTTPError as err:
+        status = err.code
         data = traceback.format_exc()
         if err.code == 401:
             data = "Error: HTTP Status Code 401. Authentication with the Web Service failed. Please ensure that the authentication credentials are set, are correct, and that authentication mode is enabled."
@@ -94,9 +223,10 @@ def pSend(address, message, requestType, body, useAuth=False, username="", passw
             data = err.read()
 
         
+    if status is not None:
+        return errorData(data, status)
     try:
-        data = json.loads(data)
+        data = DeadlineJSON.loads(data)
     except:
         pass
-        
     return data
\ No newline at end of file
@@ -1,3 +1,6 @@
+import mmap
+import os
+
 #Helper function to separate arrays into strings.
 def ArrayToCommaSeparatedString( iterable ):
     if isinstance( iterable, basestring ):
@@ -6,4 +9,36 @@ def ArrayToCommaSeparatedString( iterable ):
     if iterable is None:
         return ""
 
-    return ",".join( str(x) for x in iterable )
\ No newline at end of file
+    return ",".join( str(x) for x in iterable )
+
+#Helper function to read the lines of a file through a read-only memory map.
+def MappedLines( filelocation ):
+    with open( filelocation, 'rb' ) as file:
+        if os.fstat( file.fileno() ).st_size == 0:
+            return
+        mapped = mmap.mmap( file.fileno(), 0, access=mmap.ACCESS_READ )
+        try:
+            line = mapped.readline()
+            while line:
+                yield line
+                line = mapped.readline()
+        finally:
+            mapped.close()
+
+#Helper function to parse a key=value job or plugin info file into a dictionary.
+#Keys and values are stripped, lines without = are skipped and later keys win.
+def ParseInfoFile( filelocation ):
+    info = {}
+    first = True
+    for line in MappedLines( filelocation ):
+        if first:
+            first = False
+            if line.startswith( "\xef\xbb\xbf" ):
+                line = line[3:]
+        key, separator, value = line.partition( "=" )
+        if not separator:
+            continue
+        key = key.strip()
+        if key:
+            info[key] = value.strip()
+    return info
@@ -1,6 +1,6 @@
 from ConnectionProperty import ConnectionProperty
 from DeadlineUtility import ArrayToCommaSeparatedString
-import json
+import DeadlineJSON
 
 class Groups:
     """
@@ -22,7 +22,7 @@ class Groups:
             Params: name: The Group name.
             Returns: Success message.
         """
-        body = '{"Group":"'+name+'"}'
+        body = DeadlineJSON.dumps({"Group":name})
         
         return self.connectionProperties.__post__("/api/groups", body)
 
@@ -31,7 +31,7 @@ class Groups:
             Params: names: List of Group names to add.
             Returns: Success message.
         """
-        body = '{"Group":'+json.dumps(names)+'}'
+        body = DeadlineJSON.dumps({"Group":names})
         
         return self.connectionProperties.__post__("/api/groups", body)
         
@@ -48,7 +48,7 @@ class Groups:
                     overwrite: Boolean flag that determines whether we are setting or adding Groups.
             Returns: Success message.
         """
-        body = '{"ReplacementGroup":"'+replacementGroup+'", "Group":'+json.dumps(groups)+', "OverWrite":'+json.dumps(overwrite)+'}'
+        body = DeadlineJSON.dumps({"ReplacementGroup":replacementGroup, "Group":groups, "OverWrite":overwrite})
         
         return self.connectionProperties.__put__("/api/groups", body)
 
@@ -1,7 +1,11 @@
-import json
+import DeadlineJSON
 import ast
 from ConnectionProperty import ConnectionProperty
-from DeadlineUtility import ArrayToCommaSeparatedString
+from DeadlineSend import ChunkedBody
+from DeadlineUtility import ArrayToCommaSeparatedString, ParseInfoFile
+
+#Number of Jobs from which SubmitJobs streams the request body
+STREAM_JOBS = 100
 
 class Jobs:
     """
@@ -64,8 +68,7 @@ class Jobs:
             Input: jobData: The Jobs information in json format.
             Returns: Success message.
         """
-        jobData = json.dumps(jobData)
-        body = '{"Command":"save", "Job":'+jobData+'}'
+        body = DeadlineJSON.dumps({"Command":"save", "Job":jobData})
 
         return self.connectionProperties.__put__("/api/jobs", body)
 
@@ -74,7 +77,7 @@ class Jobs:
             Input: id: The Job ID.
             Returns: Success message.
         """
-        body = '{"Command":"suspend", "JobID":"'+id+'"}'
+        body = DeadlineJSON.dumps({"Command":"suspend", "JobID":id})
         
         return self.connectionProperties.__put__("/api/jobs", body)
         
@@ -83,7 +86,7 @@ class Jobs:
             Input: id: The Job ID.
             Returns: Success message.
         """
-        body = '{"Command":"suspendnonrendering", "JobID":"'+id+'"}'
+        body = DeadlineJSON.dumps({"Command":"suspendnonrendering", "JobID":id})
         
         return self.connectionProperties.__put__("/api/jobs", body)
 
@@ -92,7 +95,7 @@ class Jobs:
             Input: id: The Job ID.
             Returns: Success message.
         """
-        body = '{"Command":"resume", "JobID":"'+id+'"}'
+        body = DeadlineJSON.dumps({"Command":"resume", "JobID":id})
         
         return self.connectionProperties.__put__("/api/jobs", body)
 
@@ -101,7 +104,7 @@ class Jobs:
             Input: id: The Job ID.
             Returns: Success message.
         """
-        body = '{"Command":"resumefailed", "JobID":"'+id+'"}'
+        body = DeadlineJSON.dumps({"Command":"resumefailed", "JobID":id})
         
         return self.connectionProperties.__put__("/api/jobs", body)
 
@@ -117,7 +120,7 @@ class Jobs:
             Input: id: The Job ID.
             Returns: Success message.
         """
-        body = '{"Command":"requeue", "JobID":"'+id+'"}'
+        body = DeadlineJSON.dumps({"Command":"requeue", "JobID":id})
         
         return self.connectionProperties.__put__("/api/jobs", body)
 
@@ -126,7 +129,7 @@ class Jobs:
             Input: id: The Job ID.
             Returns: Success message.
         """
-        body = '{"Command":"archive", "JobID":"'+id+'"}'
+        body = DeadlineJSON.dumps({"Command":"archive", "JobID":id})
         
         return self.connectionProperties.__put__("/api/jobs", body)
 
@@ -135,7 +138,7 @@ class Jobs:
             Input: file: file location for archived Job.
             Returns: Success message.
         """
-        body = '{"Command":"import", "File":"'+file+'"}'
+        body = DeadlineJSON.dumps({"Command":"import", "File":file})
         
         return self.connectionProperties.__put__("/api/jobs", body)
 
@@ -144,7 +147,7 @@ class Jobs:
             Input: id: The Job ID.
             Returns: Success message.
         """
-        body = '{"Command":"pend", "JobID":"'+id+'"}'
+        body = DeadlineJSON.dumps({"Command":"pend", "JobID":id})
         
         return self.connectionProperties.__put__("/api/jobs", body)
 
@@ -153,7 +156,7 @@ class Jobs:
             Input: id: The Job ID.
             Returns: Success message.
         """
-        body = '{"Command":"releasepending", "JobID":"'+id+'"}'
+        body = DeadlineJSON.dumps({"Command":"releasepending", "JobID":id})
         
         return self.connectionProperties.__put__("/api/jobs", body)
 
@@ -162,7 +165,7 @@ class Jobs:
             Input: id: The Job ID.
             Returns: Success message.
         """
-        body = '{"Command":"complete", "JobID":"'+id+'"}'
+        body = DeadlineJSON.dumps({"Command":"complete", "JobID":id})
         
         return self.connectionProperties.__put__("/api/jobs", body)
 
@@ -171,7 +174,7 @@ class Jobs:
             Input: id: The Job ID.
             Returns: Success message.
         """
-        body = '{"Command":"fail", "JobID":"'+id+'"}'
+        body = DeadlineJSON.dumps({"Command":"fail", "JobID":id})
         
         return self.connectionProperties.__put__("/api/jobs", body)
 
@@ -180,7 +183,7 @@ class Jobs:
             Input: id: The Jobs ID.
             Returns: Success message.
         """
-        body = '{"Command":"updatesubmissiondate", "JobID":"'+id+'"}'
+        body = DeadlineJSON.dumps({"Command":"updatesubmissiondate", "JobID":id})
         
         return self.connectionProperties.__put__("/api/jobs", body)
 
@@ -208,10 +211,10 @@ class Jobs:
         if not isinstance(aux, list):
             aux = [aux]
         
-        body = '{"JobInfo":'+json.dumps(info)+',"PluginInfo":'+json.dumps(plugin)+',"AuxFiles":'+json.dumps(aux)
+        body = {"JobInfo":info, "PluginInfo":plugin, "AuxFiles":aux}
         if idOnly:
-            body += ',"IdOnly":true'
-        body += '}'
+            body["IdOnly"] = True
+        body = DeadlineJSON.dumps(body)
         return self.connectionProperties.__post__("/api/jobs", body)
 
     def SubmitJobs(self, jobs=[], dependent=False):
@@ -222,12 +225,17 @@ class Jobs:
                         AuxFiles - List of any additional auxiliary submission files (defaults to empty). Required property.
                         DependsOnPrevious - True to make the Job dependent on the previously submitted Job. Defaults to false.
                     dependent: True to make each Job submitted dependent on the previous (except for the first one). Defaults to false.
+                    Lists of STREAM_JOBS or more Jobs and iterators of Jobs are encoded one Job at a time while the request is sent.
+                    Jobs may also be DeadlineJSON.Encoded JSON texts, which are always streamed.
             Returns: Success message.
         """
-        if not isinstance(jobs, list):
+        if isinstance(jobs, dict):
             jobs = [jobs]
 
-        body = '{"Jobs":' + json.dumps(jobs) + ',"Dependent":"' + str(dependent).lower() + '"}'
+        if isinstance(jobs, list) and len(jobs) < STREAM_JOBS and not any(isinstance(job, DeadlineJSON.Encoded) for job in jobs):
+            body = DeadlineJSON.dumps({"Jobs":jobs, "Dependent":str(dependent).lower()})
+        else:
+            body = ChunkedBody(streamJobSubmissions(jobs, dependent))
         return self.connectionProperties.__post__( "/api/jobs", body )
 
     #Machine Limits
@@ -239,7 +247,7 @@ class Jobs:
                     whiteListFlag: If true the Slaves in the slavelist are the only Slaves allowed to work on the Job else, the Slaves are now allowed to work on the Job.
             Returns: Success message.
         """
-        body = json.dumps({"Command":"setjobmachinelimit","JobID":id, "Limit":limit, "SlaveList":slaveList,"WhiteListFlag":whiteListFlag})
+        body = DeadlineJSON.dumps({"Command":"setjobmachinelimit","JobID":id, "Limit":limit, "SlaveList":slaveList,"WhiteListFlag":whiteListFlag})
     
         return self.connectionProperties.__put__("/api/jobs", body)
 
@@ -249,7 +257,7 @@ class Jobs:
             slaveList: The Slaves to be added to the Jobs machine limit list.
             Returns: Success message.
         """
-        body = json.dumps({"Command":"addslavestojobmachinelimitlist","JobID":id, "SlaveList":slaveList})
+        body = DeadlineJSON.dumps({"Command":"addslavestojobmachinelimitlist","JobID":id, "SlaveList":slaveList})
     
         return self.connectionProperties.__put__("/api/jobs", body)
 
@@ -259,7 +267,7 @@ class Jobs:
             slaveList: The Slaves to be removed from the Jobs machine limit list.
             Returns: Success message.
         """
-        body = json.dumps({"Command":"removeslavesfromjobmachinelimitlist","JobID":id,"SlaveList":slaveList})
+        body = DeadlineJSON.dumps({"Command":"removeslavesfromjobmachinelimitlist","JobID":id,"SlaveList":slaveList})
     
         return self.connectionProperties.__put__("/api/jobs", body)
         
@@ -269,7 +277,7 @@ class Jobs:
             slaveList: A list of Slaves which are either not allowed to work on or are the only allowed Slave for a Job.
             Returns: Success message.
         """
-        body = json.dumps({"Command":"setjobmachinelimitlistedslaves","JobID":id, "SlaveList":slaveList})
+        body = DeadlineJSON.dumps({"Command":"setjobmachinelimitlistedslaves","JobID":id, "SlaveList":slaveList})
     
         return self.connectionProperties.__put__("/api/jobs", body)
 
@@ -279,7 +287,7 @@ class Jobs:
             whiteListFlag: If true the Slaves in the slavelist are the only Slaves allowed to work on the Job else, the Slaves are now allowed to work on the Job.
             Returns: Success message.
         """
-        body = json.dumps({"Command":"setjobmachinelimitwhitelistflag","JobID":id, "WhiteListFlag":whiteListFlag})
+        body = DeadlineJSON.dumps({"Command":"setjobmachinelimitwhitelistflag","JobID":id, "WhiteListFlag":whiteListFlag})
     
         return self.connectionProperties.__put__("/api/jobs", body)
 
@@ -289,7 +297,7 @@ class Jobs:
             limit: The maximum number of Slaves that can work on this Job at any one time.
             Returns: Success message.
         """
-        body = json.dumps({"Command":"setjobmachinelimitmaximum","JobID":id, "Limit":limit})
+        body = DeadlineJSON.dumps({"Command":"setjobmachinelimitmaximum","JobID":id, "Limit":limit})
     
         return self.connectionProperties.__put__("/api/jobs", body)
 
@@ -299,7 +307,7 @@ class Jobs:
             frameList: The additional frames to append.
             Returns: Success message.
         """
-        body = json.dumps({"Command":"appendjobframerange","JobID":id, "FrameList":frameList})
+        body = DeadlineJSON.dumps({"Command":"appendjobframerange","JobID":id, "FrameList":frameList})
     
         return self.connectionProperties.__put__("/api/jobs", body)
 
@@ -310,7 +318,7 @@ class Jobs:
             chunkSize: The chunk size.
             Returns: Success message.
         """
-        body = json.dumps({"Command":"setjobframerange","JobID":id, "FrameList":frameList, "ChunkSize":chunkSize})
+        body = DeadlineJSON.dumps({"Command":"setjobframerange","JobID":id, "FrameList":frameList, "ChunkSize":chunkSize})
     
         return self.connectionProperties.__put__("/api/jobs", body)
         
@@ -358,7 +366,7 @@ class Jobs:
             Input: id: The Job ID.
             Returns: Success message.
         """
-        body = '{"Command":"undelete", "JobID":"'+id+'"}'
+        body = DeadlineJSON.dumps({"Command":"undelete", "JobID":id})
         
         return self.connectionProperties.__put__("/api/jobs", body)
         
@@ -367,40 +375,31 @@ class Jobs:
             Input: id: The Job IDs.
             Returns: Success message.
         """
-        body = json.dumps({"Command":"undelete","JobIDs":ids})
+        body = DeadlineJSON.dumps({"Command":"undelete","JobIDs":ids})
         
         return self.connectionProperties.__put__("/api/jobs", body)
         
+def streamJobSubmissions(jobs, dependent):
+    """ Yields the SubmitJobs body in pieces, encoding one Job at a time. """
+    yield '{"Jobs":['
+    separator = ''
+    for job in jobs:
+        yield separator
+        if isinstance(job, DeadlineJSON.Encoded):
+            yield job
+        else:
+            yield DeadlineJSON.dumps(job)
+        separator = ','
+    yield '],"Dependent":' + DeadlineJSON.dumps(str(dependent).lower()) + '}'
+
 def buildJobSubmission(info, plugins, aux, idOnly):
     
-    infoText = fileRead(info)
-    
-    pluginsText = fileRead(plugins)
-    
-    body = '{"JobInfo":'+infoText+',"PluginInfo":'+pluginsText+',"AuxFiles":'+json.dumps(aux)
+    body = {"JobInfo":ParseInfoFile(info), "PluginInfo":ParseInfoFile(plugins), "AuxFiles":aux}
     if idOnly:
-        body += ',"IdOnly":true'
-    body += '}'
+        body["IdOnly"] = True
     
-    return body
+    return DeadlineJSON.dumps(body)
     
 def fileRead(filelocation):
     
-    file = open(filelocation, 'r')
-    
-    obj = '{'
-    
-    for line in file:
-        
-        line = line.replace('\n', '')
-        line = line.replace('\t', '')
-        
-        tokens = line.split("=",1)
-        if len(tokens) == 2:
-            obj = obj + '"'+tokens[0].strip()+'":"'+tokens[1].strip()+'",'
-        
-    obj = obj[:-1]
-    
-    obj = obj + '}'
-    
-    return obj
\ No newline at end of file
+    return DeadlineJSON.dumps(ParseInfoFile(filelocation))
@@ -1,6 +1,6 @@
 from ConnectionProperty import ConnectionProperty
 from DeadlineUtility import ArrayToCommaSeparatedString
-import json
+import DeadlineJSON
 
 class LimitGroups:
     """
@@ -52,29 +52,29 @@ class LimitGroups:
                     excludedSlaves: The list of Slaves that will ignore this limit group.
             Returns: Success message.
         """
-        body = '{"Command":"set", "Name":"'+name+'"'
+        body = {"Command":"set", "Name":name}
             
         if limit != None:
                 
-            body = body + ',"Limit":'+str(limit)
+            body["Limit"] = limit
                 
         if WhitelistFlag != None:
                 
-            body = body + ',"White":'+str(WhitelistFlag).lower()
+            body["White"] = bool(WhitelistFlag)
                 
         if progress != None:
                 
-            body = body + ',"RelPer":'+str(progress)
+            body["RelPer"] = progress
         
         if slaveList != None:
             
-            body = body + ',"Slaves":'+json.dumps(slaveList)
+            body["Slaves"] = slaveList
             
         if excludedSlaves != None:
             
-            body = body + ',"SlavesEx":'+json.dumps(excludedSlaves)
+            body["SlavesEx"] = excludedSlaves
             
-        body = body +'}'
+        body = DeadlineJSON.dumps(body)
 
         return self.connectionProperties.__put__("/api/limitgroups", body)
 
@@ -83,9 +83,7 @@ class LimitGroups:
             Input:    info: the limit group object.
             Returns: Success message.
         """
-        info = json.dumps(info)
-        
-        body = '{"Command":"save", "LimitGroup":'+info+'}'
+        body = DeadlineJSON.dumps({"Command":"save", "LimitGroup":info})
         
         return self.connectionProperties.__put__("/api/limitgroups", body)
 
@@ -101,6 +99,6 @@ class LimitGroups:
             Input: name: The limit group name.
             Returns: Success message.
         """
-        body = '{"Command":"reset", "Name":"'+name+'"}'
+        body = DeadlineJSON.dumps({"Command":"reset", "Name":name})
         
         return self.connectionProperties.__put__("/api/limitgroups", body)
\ No newline at end of file
@@ -1,5 +1,5 @@
 from ConnectionProperty import ConnectionProperty
-import json
+import DeadlineJSON
 
 class MappedPaths:
     """
@@ -26,8 +26,8 @@ class MappedPaths:
             Returns: The list of mapped paths.
         """
         if region:
-            body = '{"OS":"' + operatingSystem + '", "Region":"' + region + '", "Paths":'+json.dumps(paths)+'}'
+            body = DeadlineJSON.dumps({"OS":operatingSystem, "Region":region, "Paths":paths})
         else:
-            body = '{"OS":"' + operatingSystem + '", "Paths":'+json.dumps(paths)+'}'
+            body = DeadlineJSON.dumps({"OS":operatingSystem, "Paths":paths})
         
         return self.connectionProperties.__post__("/api/mappedpaths", body)
\ No newline at end of file
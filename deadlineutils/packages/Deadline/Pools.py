@@ -1,6 +1,6 @@
 from ConnectionProperty import ConnectionProperty
 from DeadlineUtility import ArrayToCommaSeparatedString
-import json
+import DeadlineJSON
 
 class Pools:
     """
@@ -22,7 +22,7 @@ class Pools:
             Params: name: The Pool name.
             Returns: Success message.
         """
-        body = '{"Pool":"'+name+'"}'
+        body = DeadlineJSON.dumps({"Pool":name})
         
         return self.connectionProperties.__post__("/api/pools", body)
         
@@ -31,7 +31,7 @@ class Pools:
             Params: names: List of Pool names to add.
             Returns: Success message.
         """
-        body = '{"Pool":'+json.dumps(names)+'}'
+        body = DeadlineJSON.dumps({"Pool":names})
         
         return self.connectionProperties.__post__("/api/pools", body)
         
@@ -48,7 +48,7 @@ class Pools:
                     overwrite: Boolean flag that determines whether we are setting or adding Pools.
             Returns: Success message.
         """
-        body = '{"ReplacementPool":"'+replacementPool+'", "Pool":'+json.dumps(pools)+', "OverWrite":'+json.dumps(overwrite)+'}'
+        body = DeadlineJSON.dumps({"ReplacementPool":replacementPool, "Pool":pools, "OverWrite":overwrite})
         
         return self.connectionProperties.__put__("/api/pools", body)
 
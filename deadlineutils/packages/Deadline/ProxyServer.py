@@ -1,7 +1,7 @@
 from ConnectionProperty import ConnectionProperty
 from DeadlineUtility import ArrayToCommaSeparatedString
 
-import json
+import DeadlineJSON
 
 class ProxyServer:
     """ Class used by DeadlineCon to send ProxyServer requests.
@@ -84,8 +84,7 @@ class ProxyServer:
                 Info: JSON-serialized ProxyServerInfo object.
             Returns: Success.
         """
-        info = json.dumps( info )
-        body = '{ "Command": "saveinfo", "ProxyServerInfo": ' + info + ' }'
+        body = DeadlineJSON.dumps({"Command":"saveinfo", "ProxyServerInfo":info})
         return self.connectionProperties.__put__( self.URL, body )
         
     def SaveProxyServerSettings( self, settings ):
@@ -94,8 +93,7 @@ class ProxyServer:
                 Info: JSON-serialized ProxyServerSettings object.
             Returns: Success.
         """
-        settings = json.dumps( settings )
-        body = '{ "Command": "savesettings", "ProxyServerSettings": ' + settings + ' }'
+        body = DeadlineJSON.dumps({"Command":"savesettings", "ProxyServerSettings":settings})
         return self.connectionProperties.__put__( self.URL, body )
         
     def DeleteProxyServer( self, name ):
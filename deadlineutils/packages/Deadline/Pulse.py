@@ -1,6 +1,6 @@
 from ConnectionProperty import ConnectionProperty
 from DeadlineUtility import ArrayToCommaSeparatedString
-import json
+import DeadlineJSON
 
 class Pulse:
     """
@@ -38,9 +38,7 @@ class Pulse:
             Input: info: Json object of the Pulse info.
             Returns: Success message.
         """
-        info = json.dumps(info)
-        
-        body = '{"Command":"saveinfo", "PulseInfo":'+info+'}'
+        body = DeadlineJSON.dumps({"Command":"saveinfo", "PulseInfo":info})
         
         return self.connectionProperties.__put__("/api/pulse", body)
         
@@ -67,9 +65,7 @@ class Pulse:
             Input: settings: Json object of the Pulse settings.
             Returns: Success message.
         """
-        settings = json.dumps(settings)
-        
-        body = '{"Command":"savesettings", "PulseSettings":'+settings+'}'
+        body = DeadlineJSON.dumps({"Command":"savesettings", "PulseSettings":settings})
         
         return self.connectionProperties.__put__("/api/pulse", body)
         
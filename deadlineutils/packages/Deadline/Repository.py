@@ -1,4 +1,5 @@
 from ConnectionProperty import ConnectionProperty
+import DeadlineJSON
 
 class Repository:
     """
@@ -14,7 +15,7 @@ class Repository:
                     entry (string).
             Returns: Success if successful.
         """
-        body = '{"Command":"jobhistoryentry","JobID":"'+jobId+'","Entry":"'+entry+'"}'
+        body = DeadlineJSON.dumps({"Command":"jobhistoryentry", "JobID":jobId, "Entry":entry})
         
         return self.connectionProperties.__post__('/api/repository', body)
         
@@ -24,7 +25,7 @@ class Repository:
                     entry (string).
             Returns: Success if successful.
         """
-        body = '{"Command":"slavehistoryentry","SlaveName":"'+slaveName+'","Entry":"'+entry+'"}'
+        body = DeadlineJSON.dumps({"Command":"slavehistoryentry", "SlaveName":slaveName, "Entry":entry})
         
         return self.connectionProperties.__post__('/api/repository', body)
         
@@ -33,7 +34,7 @@ class Repository:
             Input:  entry (string).
             Returns: Success if successful.
         """
-        body = '{"Command":"repositoryhistoryentry","Entry":"'+entry+'"}'
+        body = DeadlineJSON.dumps({"Command":"repositoryhistoryentry", "Entry":entry})
         
         return self.connectionProperties.__post__('/api/repository', body)
     
@@ -1,6 +1,6 @@
 from ConnectionProperty import ConnectionProperty
 from DeadlineUtility import ArrayToCommaSeparatedString
-import json
+import DeadlineJSON
 
 class Slaves:
     """
@@ -65,8 +65,7 @@ class Slaves:
             Input:  info: Json object of the Slave info.
             Returns: Success message.
         """
-        info = json.dumps(info)
-        body = '{"Command":"saveinfo", "SlaveInfo":'+info+'}'
+        body = DeadlineJSON.dumps({"Command":"saveinfo", "SlaveInfo":info})
         return self.connectionProperties.__put__("/api/slaves", body)
 
     def GetSlaveSettings(self, name):
@@ -92,8 +91,7 @@ class Slaves:
             Input:  info: Json object of the Slave settings.
             Returns: Success message.
         """
-        info = json.dumps(info)
-        body = '{"Command":"savesettings", "SlaveSettings":'+info+'}'
+        body = DeadlineJSON.dumps({"Command":"savesettings", "SlaveSettings":info})
         
         return self.connectionProperties.__put__("/api/slaves", body)
 
@@ -110,7 +108,7 @@ class Slaves:
                     group: The name of the Group or Groups (may be a list).
             Returns: Success message.
         """
-        body = '{"Slave":'+json.dumps(slave)+', "Group":'+json.dumps(group)+'}'
+        body = DeadlineJSON.dumps({"Slave":slave, "Group":group})
         
         return self.connectionProperties.__put__("/api/groups", body)
 
@@ -120,7 +118,7 @@ class Slaves:
                     pool: The name of the Pool or Pools (may be a list).
             Returns: Success message.
         """
-        body = '{"Slave":'+json.dumps(slave)+', "Pool":'+json.dumps(pool)+'}'
+        body = DeadlineJSON.dumps({"Slave":slave, "Pool":pool})
         
         return self.connectionProperties.__put__("/api/pools", body)
 
@@ -160,7 +158,7 @@ class Slaves:
                     pool: List of Pools to be used.
             Returns: Success message.
         """
-        body = '{"OverWrite":true, "Slave":'+json.dumps(slave)+',"Pool":'+json.dumps(pool)+'}'
+        body = DeadlineJSON.dumps({"OverWrite":True, "Slave":slave, "Pool":pool})
         
         return self.connectionProperties.__put__("/api/pools", body)
 
@@ -170,7 +168,7 @@ class Slaves:
                     pool: List of Groups to be used.
             Returns: Success message.
         """
-        body = '{"OverWrite":true, "Slave":'+json.dumps(slave)+',"Group":'+json.dumps(group)+'}'
+        body = DeadlineJSON.dumps({"OverWrite":True, "Slave":slave, "Group":group})
         
         return self.connectionProperties.__put__("/api/groups", body)
 
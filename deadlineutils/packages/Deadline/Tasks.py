@@ -1,5 +1,5 @@
 from ConnectionProperty import ConnectionProperty
-import json
+import DeadlineJSON
 
 class Tasks:
     """
@@ -42,9 +42,7 @@ class Tasks:
                     taskId: The Task ID.
             Returns: Success message.
         """
-        task = str(taskId)
-        
-        body = '{"Command":"requeue", "JobID":"'+jobId+'", "TaskList":'+task+'}'
+        body = DeadlineJSON.dumps({"Command":"requeue", "JobID":jobId, "TaskList":int(taskId)})
         
         return self.connectionProperties.__put__("/api/tasks", body)
 
@@ -56,10 +54,10 @@ class Tasks:
         """
         if taskIds is not None:
             
-            body = json.dumps({"Command":"requeue", "JobID":jobId, "TaskList":taskIds})
+            body = DeadlineJSON.dumps({"Command":"requeue", "JobID":jobId, "TaskList":taskIds})
             
         else:
-            body = '{"Command":"requeue","JobID":"'+jobId+'"}'
+            body = DeadlineJSON.dumps({"Command":"requeue", "JobID":jobId})
             
         return self.connectionProperties.__put__("/api/tasks", body)
         
@@ -70,7 +68,7 @@ class Tasks:
                     taskId: The Task ID.
             Returns: Success message.
         """
-        body = '{"Command":"complete", "JobID":"'+jobId+'", "TaskList":'+str(taskId)+'}'
+        body = DeadlineJSON.dumps({"Command":"complete", "JobID":jobId, "TaskList":int(taskId)})
         
         return self.connectionProperties.__put__("/api/tasks", body)       
 
@@ -82,10 +80,10 @@ class Tasks:
         """
         if taskIds is not None:
             
-            body = json.dumps({"Command":"complete", "JobID":jobId, "TaskList":taskIds})
+            body = DeadlineJSON.dumps({"Command":"complete", "JobID":jobId, "TaskList":taskIds})
             
         else:
-            body = '{"Command":"complete","JobID":"'+jobId+'"}'
+            body = DeadlineJSON.dumps({"Command":"complete", "JobID":jobId})
             
         return self.connectionProperties.__put__("/api/tasks", body)    
 
@@ -95,7 +93,7 @@ class Tasks:
                     taskId: The Task ID.
             Returns: Success message.
         """
-        body = '{"Command":"resume", "JobID":"'+jobId+'", "TaskList":'+str(taskId)+'}'
+        body = DeadlineJSON.dumps({"Command":"resume", "JobID":jobId, "TaskList":int(taskId)})
         
         return self.connectionProperties.__put__("/api/tasks", body)             
 
@@ -107,10 +105,10 @@ class Tasks:
         """
         if taskIds is not None:
             
-            body = json.dumps({"Command":"resume", "JobID":jobId, "TaskList":taskIds})
+            body = DeadlineJSON.dumps({"Command":"resume", "JobID":jobId, "TaskList":taskIds})
             
         else:
-            body = '{"Command":"resume","JobID":"'+jobId+'"}'
+            body = DeadlineJSON.dumps({"Command":"resume", "JobID":jobId})
             
         return self.connectionProperties.__put__("/api/tasks", body)   
 
@@ -120,7 +118,7 @@ class Tasks:
                     taskId: The Task ID.
             Returns: Success message.
         """
-        body = '{"Command":"suspend", "JobID":"'+jobId+'", "TaskList":'+str(taskId)+'}'
+        body = DeadlineJSON.dumps({"Command":"suspend", "JobID":jobId, "TaskList":int(taskId)})
         
         return self.connectionProperties.__put__("/api/tasks", body)             
 
@@ -132,10 +130,10 @@ class Tasks:
         """
         if taskIds is not None:
             
-            body = json.dumps({"Command":"suspend", "JobID":jobId, "TaskList":taskIds})
+            body = DeadlineJSON.dumps({"Command":"suspend", "JobID":jobId, "TaskList":taskIds})
             
         else:
-            body = '{"Command":"suspend","JobID":"'+jobId+'"}'
+            body = DeadlineJSON.dumps({"Command":"suspend", "JobID":jobId})
             
         return self.connectionProperties.__put__("/api/tasks", body)   
 
@@ -145,7 +143,7 @@ class Tasks:
                     taskId: The Task ID.
             Returns: Success message.
         """
-        body = '{"Command":"fail", "JobID":"'+jobId+'", "TaskList":'+str(taskId)+'}'
+        body = DeadlineJSON.dumps({"Command":"fail", "JobID":jobId, "TaskList":int(taskId)})
         
         return self.connectionProperties.__put__("/api/tasks", body)             
 
@@ -157,10 +155,10 @@ class Tasks:
         """
         if taskIds is not None:
             
-            body = json.dumps({"Command":"fail", "JobID":jobId, "TaskList":taskIds})
+            body = DeadlineJSON.dumps({"Command":"fail", "JobID":jobId, "TaskList":taskIds})
             
         else:
-            body = '{"Command":"fail","JobID":"'+jobId+'"}'
+            body = DeadlineJSON.dumps({"Command":"fail", "JobID":jobId})
             
         return self.connectionProperties.__put__("/api/tasks", body)   
 
@@ -170,7 +168,7 @@ class Tasks:
                     taskId: The Task ID.
             Returns: Success message.
         """
-        body = '{"Command":"resumefailed", "JobID":"'+jobId+'", "TaskList":'+str(taskId)+'}'
+        body = DeadlineJSON.dumps({"Command":"resumefailed", "JobID":jobId, "TaskList":int(taskId)})
         
         return self.connectionProperties.__put__("/api/tasks", body)         
 
@@ -182,10 +180,10 @@ class Tasks:
         """
         if taskIds is not None:
             
-            body = json.dumps({"Command":"resumefailed", "JobID":jobId, "TaskList":taskIds})
+            body = DeadlineJSON.dumps({"Command":"resumefailed", "JobID":jobId, "TaskList":taskIds})
             
         else:
-            body = '{"Command":"resumefailed","JobID":"'+jobId+'"}'
+            body = DeadlineJSON.dumps({"Command":"resumefailed", "JobID":jobId})
             
         return self.connectionProperties.__put__("/api/tasks", body)       
 
@@ -195,7 +193,7 @@ class Tasks:
                     taskId: The Task ID.
             Returns: Success message.
         """
-        body = '{"Command":"pend", "JobID":"'+jobId+'", "TaskList":'+str(taskId)+'}'
+        body = DeadlineJSON.dumps({"Command":"pend", "JobID":jobId, "TaskList":int(taskId)})
         
         return self.connectionProperties.__put__("/api/tasks", body)         
 
@@ -207,10 +205,10 @@ class Tasks:
         """
         if taskIds is not None:
             
-            body = json.dumps({"Command":"pend", "JobID":jobId, "TaskList":taskIds})
+            body = DeadlineJSON.dumps({"Command":"pend", "JobID":jobId, "TaskList":taskIds})
             
         else:
-            body = '{"Command":"pend","JobID":"'+jobId+'"}'
+            body = DeadlineJSON.dumps({"Command":"pend", "JobID":jobId})
             
         return self.connectionProperties.__put__("/api/tasks", body)
 
@@ -220,7 +218,7 @@ class Tasks:
                     taskId: The Task ID.
             Returns: Success message.
         """
-        body = '{"Command":"releasepending", "JobID":"'+jobId+'", "TaskList":'+str(taskId)+'}'
+        body = DeadlineJSON.dumps({"Command":"releasepending", "JobID":jobId, "TaskList":int(taskId)})
         
         return self.connectionProperties.__put__("/api/tasks", body)        
 
@@ -232,9 +230,9 @@ class Tasks:
         """
         if taskIds is not None:
             
-            body = json.dumps({"Command":"releasepending", "JobID":jobId, "TaskList":taskIds})
+            body = DeadlineJSON.dumps({"Command":"releasepending", "JobID":jobId, "TaskList":taskIds})
             
         else:
-            body = '{"Command":"releasepending","JobID":"'+jobId+'"}'
+            body = DeadlineJSON.dumps({"Command":"releasepending", "JobID":jobId})
             
         return self.connectionProperties.__put__("/api/tasks", body)
\ No newline at end of file
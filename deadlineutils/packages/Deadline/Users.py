@@ -1,6 +1,6 @@
 from ConnectionProperty import ConnectionProperty
 from DeadlineUtility import ArrayToCommaSeparatedString
-import json
+import DeadlineJSON
 
 class Users:
     """
@@ -44,7 +44,7 @@ class Users:
             Input:  info: The Json object holding the Users info.
             Returns: Success message, or User name and ID if the User info is for a new User.
         """
-        info = json.dumps(info)
+        info = DeadlineJSON.dumps(info)
             
         return self.connectionProperties.__put__("/api/users", info)
 
@@ -61,7 +61,7 @@ class Users:
             group: The User Group (may be a list).
             Returns: Success message.
         """ 
-        body = '{"Command":"add","User":'+json.dumps(user)+',"Group":'+json.dumps(group)+'}'
+        body = DeadlineJSON.dumps({"Command":"add", "User":user, "Group":group})
             
         return self.connectionProperties.__put__("/api/usergroups", body)
 
@@ -71,7 +71,7 @@ class Users:
             group: The User Group (may be a list).
             Returns: Success message.
         """
-        body = '{"Command":"remove", "User":'+json.dumps(user)+',"Group":'+json.dumps(group)+'}'
+        body = DeadlineJSON.dumps({"Command":"remove", "User":user, "Group":group})
         
         return self.connectionProperties.__put__("/api/usergroups", body)
 
@@ -81,7 +81,7 @@ class Users:
             group: The User Group (may be a list).
             Returns: Success message.
         """ 
-        body = '{"Command":"set", "User":'+json.dumps(user)+',"Group":'+json.dumps(group)+'}'
+        body = DeadlineJSON.dumps({"Command":"set", "User":user, "Group":group})
         
         return self.connectionProperties.__put__("/api/usergroups", body)
         
@@ -114,7 +114,7 @@ class Users:
             Input: The names for the new User Group names. Any names that match existing user. Group names will be ignored.
             Returns: Success message.
         """
-        body = '{"Group":'+json.dumps(names)+'}'
+        body = DeadlineJSON.dumps({"Group":names})
         
         return self.connectionProperties.__post__("/api/usergroups", body)
         
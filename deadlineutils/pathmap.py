@@ -0,0 +1,245 @@
+'''
+deadlineutils.pathmap
+=====================
+Map paths locally with the repository's path mapping rules instead of one
+MappedPaths request per path::
+
+    mapper = PathMapper(connection, rules='mappedpaths.json')
+    mapper.map_path('\\\\server\\projects\\shot010\\comp.nk', 'Linux')
+    '/mnt/projects/shot010/comp.nk'
+
+The Web Service has no request returning the rules, so they are passed as a
+list of dictionaries or a JSON file exported from the Repository Options::
+
+    [{"Path": "\\\\server\\projects", "WindowsPath": "P:\\",
+      "LinuxPath": "/mnt/projects", "MacPath": "/Volumes/projects",
+      "Region": "All", "CaseSensitive": false}]
+
+Rules are compiled into a character trie per operating system and region.
+Like Deadline the first rule, in rule order, whose Path starts the path
+replaces that prefix. Back and forward slashes match each other and a mapped
+path gets the separators of the target operating system. Paths no rule
+matches are returned unchanged.
+
+Rules that can not be evaluated locally, regular expression rules, and paths
+no local rule decides are mapped with MappedPaths.MapPaths, one request for
+all of them. Results are kept in an LRU cache.
+'''
+from __future__ import absolute_import
+import json
+import threading
+from collections import OrderedDict
+
+from .utils import string_types
+
+
+OPERATING_SYSTEMS = ('Windows', 'Linux', 'Mac')
+
+# Rule Region values applying to every region
+_ALL_REGIONS = ('', 'All', 'all', None)
+
+# Marks the rule index on a trie node
+_RULE = ''
+
+
+def _normalize(path, case_sensitive):
+    path = path.replace('\\', '/')
+    return path if case_sensitive else path.lower()
+
+
+def _separators(path, operating_system):
+    if operating_system == 'Windows':
+        return path.replace('/', '\\')
+    return path.replace('\\', '/')
+
+
+class _Trie(object):
+    '''Prefix trie of the rules of one operating system and region'''
+
+    def __init__(self):
+        self.exact = {}
+        self.folded = {}
+        # Index of the first rule that can only be evaluated by the server
+        self.server_rule = None
+
+    def add(self, prefix, index, case_sensitive):
+        node = self.exact if case_sensitive else self.folded
+        for char in _normalize(prefix, case_sensitive):
+            node = node.setdefault(char, {})
+        node.setdefault(_RULE, index)
+
+    def match(self, path):
+        '''(rule index, prefix length) of the first matching rule or None'''
+
+        best = None
+        for node, case_sensitive in ((self.exact, True), (self.folded, False)):
+            normalized = _normalize(path, case_sensitive)
+            node_best = None
+            for length, char in enumerate(normalized):
+                index = node.get(_RULE)
+                if index is not None and (
+                        node_best is None or index < node_best[0]):
+                    node_best = (index, length)
+                node = node.get(char)
+                if node is None:
+                    break
+            else:
+                index = node.get(_RULE)
+                if index is not None and (
+                        node_best is None or index < node_best[0]):
+                    node_best = (index, len(normalized))
+            if node_best is not None and (
+                    best is None or node_best[0] < best[0]):
+                best = node_best
+        return best
+
+
+class PathMapper(object):
+    '''
+    Maps paths with path mapping rules compiled into prefix tries, falling
+    back to MappedPaths.MapPaths.
+
+    :param connection: deadlineutils.connection.Connection instance, used for
+        paths the rules do not decide. Without one such paths are returned
+        unchanged
+    :param rules: List of rule dictionaries or the path of a JSON file
+        holding them
+    :param cache_size: Number of mapped paths kept
+    '''
+
+    def __init__(self, connection=None, rules=None, cache_size=10000):
+        self.connection = connection
+        self.cache_size = cache_size
+        self.rules = []
+        self.server_requests = 0
+        self._tries = {}
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        if rules is not None:
+            self.load(rules)
+
+    def load(self, rules):
+        '''
+        Replace the rules and clear compiled tries and cached paths
+
+        :param rules: List of rule dictionaries or the path of a JSON file
+        '''
+
+        if isinstance(rules, string_types):
+            with open(rules) as f:
+                rules = json.load(f)
+        with self._lock:
+            self.rules = list(rules)
+            self._tries.clear()
+            self._cache.clear()
+
+    def _trie(self, operating_system, region):
+        key = (operating_system, region)
+        trie = self._tries.get(key)
+        if trie is not None:
+            return trie
+
+        trie = _Trie()
+        for index, rule in enumerate(self.rules):
+            if rule.get('Region') not in _ALL_REGIONS and \
+                    rule.get('Region') != region:
+                continue
+            if rule.get('Regex') or rule.get('RegularExpression') or \
+                    not rule.get('Path') or \
+                    rule.get(operating_system + 'Path') is None:
+                if trie.server_rule is None:
+                    trie.server_rule = index
+                continue
+            trie.add(rule['Path'], index, rule.get('CaseSensitive', False))
+
+        with self._lock:
+            self._tries[key] = trie
+        return trie
+
+    def _local(self, path, operating_system, region):
+        '''Mapped path, or None when the server has to decide'''
+
+        trie = self._trie(operating_system, region)
+        match = trie.match(path)
+        if trie.server_rule is not None and (
+                match is None or trie.server_rule < match[0]):
+            return None
+        if match is None:
+            return path
+
+        index, length = match
+        replacement = self.rules[index][operating_system + 'Path']
+        rest = path[length:]
+        if replacement.endswith(('/', '\\')) and rest.startswith(('/', '\\')):
+            rest = rest[1:]
+        return _separators(replacement + rest, operating_system)
+
+    def _cached(self, key):
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache[key] = self._cache.pop(key)
+            return result
+
+    def _store(self, key, result):
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def map_paths(self, paths, operating_system, region='none'):
+        '''
+        Map a list of paths. Paths the rules do not decide are mapped with a
+        single MappedPaths.MapPaths request.
+
+        :param paths: List of paths
+        :param operating_system: Windows, Linux or Mac
+        :param region: Name of the region
+        '''
+
+        if operating_system not in OPERATING_SYSTEMS:
+            raise ValueError(
+                'Unknown operating system: {}'.format(operating_system)
+            )
+
+        results = []
+        missing = OrderedDict()
+        for index, path in enumerate(paths):
+            key = (path, operating_system, region)
+            result = self._cached(key)
+            if result is None:
+                result = self._local(path, operating_system, region)
+                if result is None:
+                    missing.setdefault(path, []).append(index)
+                else:
+                    self._store(key, result)
+            results.append(result)
+
+        if missing:
+            mapped = None
+            if self.connection is not None:
+                self.server_requests += 1
+                mapped = self.connection.MappedPaths.MapPaths(
+                    list(missing), operating_system, region
+                )
+            if not isinstance(mapped, list) or len(mapped) != len(missing):
+                mapped = list(missing)
+            else:
+                for path, result in zip(missing, mapped):
+                    self._store((path, operating_system, region), result)
+            for path, result in zip(missing, mapped):
+                for index in missing[path]:
+                    results[index] = result
+
+        return results
+
+    def map_path(self, path, operating_system, region='none'):
+        '''
+        Map a single path
+
+        :param path: The path
+        :param operating_system: Windows, Linux or Mac
+        :param region: Name of the region
+        '''
+
+        return self.map_paths([path], operating_system, region)[0]
@@ -0,0 +1,334 @@
+'''
+deadlineutils.profiling
+=======================
+Record the Web Service requests made by a block of code::
+
+    with connection.profile() as profile:
+        for job_id in job_ids:
+            connection.Jobs.GetJob(job_id)
+
+    print(profile.report())
+
+The profile sits innermost on the transport and records requests as they are
+sent, after batching. Requests are grouped by endpoint, the method, path and
+command with id values left out, and by the line of calling code outside
+deadlineutils that made them. Requests sent from deadlineutils worker
+threads belong to the code that started the workers. An endpoint called
+repeatedly from one line with varying ids is an N+1 pattern, report lists
+them with the batched request to use instead. Task commands sent once per
+job, as Connection.batch sends them, are not.
+
+Profiles also serve as request count assertions in tests::
+
+    with connection.profile() as profile:
+        sweep(connection)
+    profile.assert_requests(max_count=3)
+    profile.assert_no_n_plus_one()
+'''
+from __future__ import absolute_import
+import json
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict, namedtuple
+
+try:
+    from urlparse import parse_qsl
+except ImportError:
+    from urllib.parse import parse_qsl
+
+from .utils import string_types
+from .workers import submitted_from
+
+
+# Request parameters holding the ids that vary in an N+1 loop
+_ID_KEYS = ('Name', 'Names', 'TaskList', 'Slaves', 'JobInfo')
+
+# Batched task commands of the Tasks request group
+_TASK_COMMANDS = {
+    'requeue': 'RequeueJobTasks',
+    'complete': 'CompleteJobTasks',
+    'resume': 'ResumeJobTasks',
+    'suspend': 'SuspendJobTasks',
+    'fail': 'FailJobTasks',
+    'resumefailed': 'ResumeFailedJobTasks',
+    'pend': 'PendJobTasks',
+    'releasepending': 'ReleasePendingJobTasks',
+}
+
+# Slaves request group methods taking a list of names, by Data parameter
+_SLAVE_DATA = {
+    'info': 'Slaves.GetSlaveInfos(names)',
+    'settings': 'Slaves.GetSlavesSettings(names)',
+    'infosettings': 'Slaves.GetSlavesInfoSettings(names)',
+}
+
+_PACKAGE = os.path.dirname(os.path.abspath(__file__))
+_THREADING = os.path.splitext(os.path.abspath(threading.__file__))[0]
+
+Request = namedtuple(
+    'Request', 'method command endpoint ids duration call_site stack'
+)
+
+Finding = namedtuple('Finding', 'endpoint call_site count ids suggestion')
+
+
+def _is_id_key(key):
+    return key.lower().endswith(('id', 'ids')) or key in _ID_KEYS
+
+
+def endpoint(method, command, body=None):
+    '''
+    Split a request into its endpoint and id values::
+
+        >>> endpoint('GET', '/api/jobs?JobID=5a1c&Statistics=true')
+        ('GET /api/jobs?JobID=<id>&Statistics=true', ('5a1c',))
+    '''
+
+    path, _, query = command.partition('?')
+    params = parse_qsl(query, keep_blank_values=True)
+
+    if isinstance(body, string_types):
+        try:
+            body = json.loads(body)
+        except ValueError:
+            body = None
+    if isinstance(body, dict):
+        params.extend(sorted(body.items()))
+
+    parts = []
+    ids = []
+    for key, value in params:
+        if _is_id_key(key):
+            parts.append('{}=<id>'.format(key))
+            ids.append(value if isinstance(value, string_types)
+                       else json.dumps(value, sort_keys=True))
+        elif isinstance(value, (dict, list)):
+            parts.append('{}=<data>'.format(key))
+        else:
+            parts.append('{}={}'.format(key, value))
+
+    name = '{} {}'.format(method, path)
+    if parts:
+        name += '?' + '&'.join(parts)
+    return name, tuple(ids)
+
+
+def suggest(endpoint_name):
+    '''The batched request replacing repeated calls of an endpoint or None'''
+
+    method, _, command = endpoint_name.partition(' ')
+    path, _, query = command.partition('?')
+    params = dict(parse_qsl(query, keep_blank_values=True))
+
+    if path == '/api/tasks' and method == 'PUT':
+        name = _TASK_COMMANDS.get(params.get('Command'))
+        if name:
+            return 'Tasks.{}(job_id, task_ids) or Connection.batch()'.format(
+                name
+            )
+    if path == '/api/jobs':
+        if method == 'PUT' and 'Command' in params:
+            return 'Connection.batch()'
+        if method == 'POST':
+            return 'Jobs.SubmitJobs(jobs)'
+        if method == 'GET' and 'JobID' in params:
+            if 'Statistics' in params:
+                return None
+            return 'Jobs.GetJobs(ids) or Connection.query(ids=ids)'
+    if path == '/api/tasks' and method == 'GET' and 'TaskID' in params:
+        return 'Tasks.GetJobTasks(job_id)'
+    if path == '/api/slaves' and method == 'GET' and 'Name' in params:
+        return _SLAVE_DATA.get(params.get('Data'))
+    if path == '/api/slavesrenderingjob':
+        return 'Connection.get_job_slaves()'
+    return None
+
+
+def _id_values(endpoint_name, ids):
+    '''Dictionary mapping the id keys of an endpoint to a request's ids'''
+
+    query = endpoint_name.partition('?')[2]
+    keys = [
+        part.partition('=')[0] for part in query.split('&')
+        if part.endswith('=<id>')
+    ]
+    return dict(zip(keys, ids))
+
+
+def _one_per_job(endpoint_name, requests):
+    '''
+    True for task commands sent at most once per job, the Web Service takes
+    them for one job at a time
+    '''
+
+    method, _, command = endpoint_name.partition(' ')
+    path, _, query = command.partition('?')
+    params = dict(parse_qsl(query, keep_blank_values=True))
+    if method != 'PUT' or path != '/api/tasks' or \
+            params.get('Command') not in _TASK_COMMANDS:
+        return False
+    jobs = [
+        _id_values(endpoint_name, request.ids).get('JobID')
+        for request in requests
+    ]
+    return len(set(jobs)) == len(jobs)
+
+
+def _caller_stack(depth):
+    '''
+    Innermost frames of the calling code, outside deadlineutils. In worker
+    threads the code that handed the thread its work comes first.
+    '''
+
+    stack = []
+    frames = submitted_from() + tuple(
+        frame[:3] for frame in traceback.extract_stack()
+    )
+    for frame in frames:
+        path = os.path.abspath(frame[0])
+        if path.startswith(_PACKAGE):
+            continue
+        if os.path.splitext(path)[0] == _THREADING:
+            continue
+        # A separately installed Deadline Standalone API
+        if os.path.basename(os.path.dirname(path)) == 'Deadline':
+            continue
+        stack.append((frame[0], frame[1], frame[2]))
+    return tuple(stack[-depth:])
+
+
+class Profile(object):
+    '''
+    Transport interceptor recording every request with its endpoint,
+    duration and calling code. Use Connection.profile to create one.
+
+    :param transport: deadlineutils.transport.Transport instance
+    :param stack_depth: Number of calling frames kept per request
+    :param threshold: Number of calls with varying ids from one line of
+        code that make an N+1 pattern
+    '''
+
+    def __init__(self, transport, stack_depth=6, threshold=5):
+        self.transport = transport
+        self.stack_depth = stack_depth
+        self.threshold = threshold
+        self.requests = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.transport.push(self, innermost=True)
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.transport.remove(self)
+        return False
+
+    def __call__(self, method, command, body, send):
+        stack = _caller_stack(self.stack_depth)
+        started = time.time()
+        try:
+            return send(method, command, body)
+        finally:
+            name, ids = endpoint(method, command, body)
+            request = Request(
+                method, command, name, ids, time.time() - started,
+                stack[-1] if stack else None, stack,
+            )
+            with self._lock:
+                self.requests.append(request)
+
+    def count(self, endpoint_prefix=None):
+        '''
+        Number of requests, optionally only those whose endpoint starts with
+        endpoint_prefix, e.g. 'GET /api/jobs'
+        '''
+
+        return sum(
+            1 for request in self.requests
+            if endpoint_prefix is None or
+            request.endpoint.startswith(endpoint_prefix)
+        )
+
+    def by_endpoint(self):
+        '''Ordered dictionary mapping endpoints to their requests'''
+
+        groups = OrderedDict()
+        for request in self.requests:
+            groups.setdefault(request.endpoint, []).append(request)
+        return groups
+
+    def n_plus_one(self):
+        '''List of Findings, endpoints called in a loop with varying ids'''
+
+        groups = OrderedDict()
+        for request in self.requests:
+            if request.ids and request.call_site:
+                key = (request.endpoint, request.call_site)
+                groups.setdefault(key, []).append(request)
+
+        findings = []
+        for (name, call_site), requests in groups.items():
+            ids = set(request.ids for request in requests)
+            if len(requests) < self.threshold or len(ids) < 2:
+                continue
+            if not _one_per_job(name, requests):
+                findings.append(Finding(
+                    name, call_site, len(requests), len(ids), suggest(name)
+                ))
+        return findings
+
+    def assert_requests(self, max_count, endpoint_prefix=None):
+        '''
+        Raise AssertionError when more than max_count requests were made
+
+        :param max_count: Maximum number of requests
+        :param endpoint_prefix: Only count matching endpoints
+        '''
+
+        count = self.count(endpoint_prefix)
+        if count > max_count:
+            raise AssertionError(
+                'Expected at most {} requests{}, made {}\n{}'.format(
+                    max_count,
+                    ' to ' + endpoint_prefix if endpoint_prefix else '',
+                    count,
+                    self.report(),
+                )
+            )
+
+    def assert_no_n_plus_one(self):
+        '''Raise AssertionError when an N+1 pattern was recorded'''
+
+        if self.n_plus_one():
+            raise AssertionError(
+                'N+1 request pattern\n{}'.format(self.report())
+            )
+
+    def report(self):
+        '''Requests per endpoint and N+1 patterns as text'''
+
+        lines = ['{} requests, {:.3f}s'.format(
+            len(self.requests),
+            sum(request.duration for request in self.requests),
+        )]
+        groups = sorted(
+            self.by_endpoint().items(), key=lambda item: -len(item[1])
+        )
+        for name, requests in groups:
+            lines.append('  {:5d}  {:8.3f}s  {}'.format(
+                len(requests),
+                sum(request.duration for request in requests),
+                name,
+            ))
+
+        for finding in self.n_plus_one():
+            lines.append('N+1: {} called {} times with {} ids'.format(
+                finding.endpoint, finding.count, finding.ids
+            ))
+            if finding.call_site:
+                lines.append('  at {}:{} in {}'.format(*finding.call_site))
+            if finding.suggestion:
+                lines.append('  use {}'.format(finding.suggestion))
+        return '\n'.join(lines)
@@ -0,0 +1,399 @@
+'''
+deadlineutils.proxy
+===================
+Caching HTTP proxy run in front of the Deadline Web Service::
+
+    python -m deadlineutils.proxy --upstream webservice:8082 --port 8080
+
+Clients point DeadlineCon, or a deadlineutils Connection, at the proxy
+instead of the Web Service. Requests and responses are passed on unchanged,
+except for hop-by-hop headers, so authentication challenges reach clients.
+
+GET responses of cacheable routes are kept for the route's TTL in seconds,
+see ROUTE_TTLS. Identical GETs arriving while one is sent upstream wait for
+its response instead of sending their own. PUT, POST and DELETE requests are
+always passed through and drop cached responses of the routes they affect,
+see INVALIDATES. Streamed request bodies, like those of large
+Jobs.SubmitJobs requests, are collected and sent upstream whole. Responses
+are cached per Authorization header.
+
+GET /proxy/metrics returns hits, misses, coalesced requests, upstream
+requests and errors and the hit rate as JSON.
+'''
+from __future__ import absolute_import, print_function
+import argparse
+import json
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import httplib
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+except ImportError:
+    import http.client as httplib
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+
+
+# Seconds GET responses are cached, by longest matching path prefix
+ROUTE_TTLS = OrderedDict([
+    ('/api/pools', 30),
+    ('/api/groups', 30),
+    ('/api/limitgroups', 30),
+    ('/api/users', 60),
+    ('/api/plugins', 300),
+    ('/api/repository', 300),
+    ('/api/slaves', 10),
+    ('/api/pulse', 10),
+    ('/api/proxyserver', 10),
+    ('/api/jobs', 5),
+    ('/api/tasks', 5),
+    ('/api/slavesrenderingjob', 5),
+])
+
+# Routes whose cached responses a write to a route makes stale
+INVALIDATES = {
+    '/api/jobs': ('/api/jobs', '/api/tasks', '/api/slavesrenderingjob'),
+    '/api/tasks': ('/api/tasks', '/api/jobs', '/api/slavesrenderingjob'),
+    '/api/slaves': ('/api/slaves', '/api/pools', '/api/groups'),
+    '/api/pools': ('/api/pools', '/api/slaves', '/api/jobs'),
+    '/api/groups': ('/api/groups', '/api/slaves', '/api/jobs'),
+    '/api/limitgroups': ('/api/limitgroups', '/api/jobs'),
+    '/api/users': ('/api/users',),
+    '/api/pulse': ('/api/pulse',),
+}
+
+METRICS_PATH = '/proxy/metrics'
+
+# Request headers passed upstream, everything else is dropped
+_HEADERS = ('Authorization', 'Content-Type', 'Accept')
+
+# Response headers not passed to clients, hop-by-hop headers and those the
+# proxy sets itself
+_HOP_BY_HOP = frozenset((
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'te', 'trailer', 'trailers', 'transfer-encoding', 'upgrade',
+    'content-length', 'date', 'server',
+))
+
+
+def _route(path):
+    return path.split('?', 1)[0].rstrip('/').lower()
+
+
+class _Pending(object):
+    '''A GET sent upstream that identical requests wait for'''
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.response = None
+
+
+class ProxyCache(object):
+    '''
+    Response cache, request coalescing and metrics of a proxy.
+
+    :param upstream: Web Service address, host:port
+    :param ttls: Dictionary mapping path prefixes to cache seconds
+    :param invalidates: Dictionary mapping written routes to stale routes
+    :param max_entries: Maximum number of cached responses
+    :param timeout: Upstream socket timeout in seconds
+    '''
+
+    def __init__(self, upstream, ttls=None, invalidates=None,
+                 max_entries=10000, timeout=60):
+        self.upstream = upstream.replace('http://', '').rstrip('/')
+        self.ttls = ROUTE_TTLS if ttls is None else ttls
+        self.invalidates = INVALIDATES if invalidates is None else invalidates
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.metrics = OrderedDict((key, 0) for key in (
+            'hits', 'misses', 'coalesced', 'passed', 'upstream_requests',
+            'upstream_errors', 'invalidations',
+        ))
+        self._cache = OrderedDict()
+        self._pending = {}
+        self._generations = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def ttl(self, path):
+        '''Cache seconds of a path, 0 when its route is not cached'''
+
+        route = _route(path)
+        best = None
+        for prefix, ttl in self.ttls.items():
+            if route.startswith(prefix) and (
+                    best is None or len(prefix) > len(best[0])):
+                best = (prefix, ttl)
+        return best[1] if best else 0
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.metrics[key] += amount
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = httplib.HTTPConnection(
+                self.upstream, timeout=self.timeout
+            )
+            self._local.connection = connection
+        return connection
+
+    def forward(self, method, path, headers, body):
+        '''
+        Send a request upstream. Returns (status, response headers, body),
+        502 when the Web Service can not be reached.
+
+        GETs are sent again once when the request fails. PUT, POST and DELETE
+        requests are sent on a fresh connection and only sent again when it
+        could not be opened, a request the Web Service may have received is
+        never sent twice.
+        '''
+
+        self._count('upstream_requests')
+        for attempt in range(2):
+            connection = self._connection()
+            sent = False
+            try:
+                if method != 'GET':
+                    # A kept-alive connection may have been closed by the
+                    # server, which is only noticed after sending
+                    connection.close()
+                    connection.connect()
+                sent = True
+                connection.request(method, path, body, headers)
+                response = connection.getresponse()
+                data = response.read()
+                return (
+                    response.status,
+                    [(name, value) for name, value in response.getheaders()
+                     if name.lower() not in _HOP_BY_HOP],
+                    data,
+                )
+            except (httplib.HTTPException, IOError) as e:
+                connection.close()
+                self._local.connection = None
+                error = e
+                if sent and method != 'GET':
+                    break
+        self._count('upstream_errors')
+        return (
+            502, [('Content-Type', 'text/plain')],
+            'Error: {}'.format(error).encode('utf-8'),
+        )
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._cache[key]
+                return None
+            return entry[1]
+
+    def _store(self, key, route, generation, response):
+        with self._lock:
+            # A write to the route while the GET was in flight
+            if self._generations.get(route, 0) != generation:
+                return
+            self._cache.pop(key, None)
+            self._cache[key] = (time.time() + self.ttl(key[0]), response)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def get(self, path, headers):
+        '''Answer a GET from the cache, a pending request or upstream'''
+
+        if not self.ttl(path):
+            self._count('passed')
+            return self.forward('GET', path, headers, None)
+
+        key = (path, headers.get('Authorization'))
+        response = self._lookup(key)
+        if response is not None:
+            self._count('hits')
+            return response
+
+        with self._lock:
+            pending = self._pending.get(key)
+            owner = pending is None
+            if owner:
+                pending = self._pending[key] = _Pending()
+                route = _route(path)
+                generation = self._generations.get(route, 0)
+
+        if not owner:
+            self._count('coalesced')
+            pending.event.wait(self.timeout)
+            if pending.response is not None:
+                return pending.response
+            return self.forward('GET', path, headers, None)
+
+        self._count('misses')
+        try:
+            response = self.forward('GET', path, headers, None)
+            if response[0] == 200:
+                self._store(key, route, generation, response)
+            pending.response = response
+            return response
+        finally:
+            with self._lock:
+                del self._pending[key]
+            pending.event.set()
+
+    def write(self, method, path, headers, body):
+        '''Pass a write upstream and drop the responses it makes stale'''
+
+        self.invalidate(_route(path))
+        self._count('passed')
+        response = self.forward(method, path, headers, body)
+        self.invalidate(_route(path))
+        return response
+
+    def invalidate(self, route):
+        '''Drop cached responses of the routes a write to route affects'''
+
+        stale = self.invalidates.get(route, (route,))
+        with self._lock:
+            for stale_route in stale:
+                self._generations[stale_route] = \
+                    self._generations.get(stale_route, 0) + 1
+            for key in list(self._cache):
+                if _route(key[0]) in stale:
+                    del self._cache[key]
+                    self.metrics['invalidations'] += 1
+
+    def snapshot(self):
+        '''Metrics dictionary including the hit rate and cache size'''
+
+        with self._lock:
+            metrics = OrderedDict(self.metrics)
+            metrics['entries'] = len(self._cache)
+        lookups = metrics['hits'] + metrics['misses'] + metrics['coalesced']
+        metrics['hit_rate'] = (
+            float(metrics['hits'] + metrics['coalesced']) / lookups
+            if lookups else 0.0
+        )
+        return metrics
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    '''Request handler of ProxyServer, its server holds the ProxyCache'''
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def _headers(self):
+        return dict(
+            (name, self.headers.get(name)) for name in _HEADERS
+            if self.headers.get(name) is not None
+        )
+
+    def _body(self):
+        encoding = self.headers.get('Transfer-Encoding') or ''
+        if 'chunked' in encoding.lower():
+            return self._chunked_body()
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else None
+
+    def _chunked_body(self):
+        '''Body of a request sent with chunked transfer encoding'''
+
+        chunks = []
+        while True:
+            size = int(self.rfile.readline().split(b';', 1)[0].strip(), 16)
+            if not size:
+                break
+            chunks.append(self.rfile.read(size))
+            self.rfile.readline()
+        # Trailer headers up to the closing empty line
+        while self.rfile.readline().strip():
+            pass
+        return b''.join(chunks)
+
+    def _reply(self, response):
+        status, headers, data = response
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == METRICS_PATH:
+            data = json.dumps(self.server.cache.snapshot()).encode('utf-8')
+            return self._reply(
+                (200, [('Content-Type', 'application/json')], data)
+            )
+        self._reply(self.server.cache.get(self.path, self._headers()))
+
+    def _write(self):
+        self._reply(self.server.cache.write(
+            self.command, self.path, self._headers(), self._body()
+        ))
+
+    do_PUT = do_POST = do_DELETE = _write
+
+
+class ProxyServer(ThreadingMixIn, HTTPServer):
+    '''
+    Threaded HTTP server answering Web Service requests through a
+    ProxyCache::
+
+        server = ProxyServer(('', 8080), ProxyCache('webservice:8082'))
+        server.serve_forever()
+
+    :param address: (host, port) to listen on
+    :param cache: ProxyCache instance
+    :param verbose: Log every request
+    '''
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, cache, verbose=False):
+        HTTPServer.__init__(self, address, ProxyHandler)
+        self.cache = cache
+        self.verbose = verbose
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Caching proxy for the Deadline Web Service'
+    )
+    parser.add_argument('--upstream', required=True,
+                        help='Web Service address, host:port')
+    parser.add_argument('--host', default='')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--ttl', action='append', default=[],
+                        metavar='ROUTE=SECONDS',
+                        help='Cache seconds of a route, 0 disables caching')
+    parser.add_argument('--max-entries', type=int, default=10000)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args(argv)
+
+    ttls = OrderedDict(ROUTE_TTLS)
+    for item in args.ttl:
+        route, _, seconds = item.partition('=')
+        ttls[route.rstrip('/').lower()] = float(seconds)
+
+    cache = ProxyCache(args.upstream, ttls, max_entries=args.max_entries)
+    server = ProxyServer((args.host, args.port), cache, args.verbose)
+    print('Proxying {} on port {}'.format(args.upstream, args.port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
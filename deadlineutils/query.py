@@ -0,0 +1,373 @@
+'''
+deadlineutils.query
+===================
+Declarative job queries that pick the cheapest Jobs request::
+
+    query = connection.query(state='Active', pool='maya', user='bob',
+                             fields=('_id', 'Props.Name'))
+    print(query.explain())
+    for job in query:
+        print(job['_id'], job['Props']['Name'])
+
+A QueryPlanner is shared by all queries of a Connection. It remembers the
+jobs returned by recent requests and the number and size of jobs per state.
+A query is answered by the cheapest of
+
+* snapshot reuse, jobs returned by a request younger than max_age
+* an ID-list fetch, Jobs.GetJobs(ids), when the query names job ids
+* state pushdown, Jobs.GetJobsInStates(states)
+* a full Jobs.GetJobs request
+
+Predicates the request does not cover are applied client-side and the result
+is projected to the requested fields.
+'''
+from __future__ import absolute_import
+import json
+import threading
+import time
+
+from .utils import parse_date, string_types
+
+
+# Job Stat values of the states accepted by Jobs.GetJobsInStates
+STATES = {
+    'Active': 1,
+    'Suspended': 2,
+    'Completed': 3,
+    'Failed': 4,
+    'Pending': 6,
+}
+
+# Size of a job in bytes assumed before any job was seen
+DEFAULT_JOB_BYTES = 4096
+
+# Number of jobs assumed on a farm before any full request
+DEFAULT_JOB_COUNT = 1000
+
+# Job ids per Jobs.GetJobs request of an ID-list fetch, keeps URLs short
+IDS_PER_REQUEST = 200
+
+_MISSING = object()
+
+
+def _values(value):
+    if value is None:
+        return None
+    if isinstance(value, string_types):
+        return (value,)
+    return tuple(value)
+
+
+def _get(job, field, default=None):
+    value = job
+    for key in field.split('.'):
+        if not isinstance(value, dict) or key not in value:
+            return default
+        value = value[key]
+    return value
+
+
+def project(job, fields):
+    '''
+    Copy of job with only fields, dotted names select nested values::
+
+        >>> project(job, ('_id', 'Props.Name'))
+        {'_id': '5a1c...', 'Props': {'Name': 'shot010'}}
+    '''
+
+    result = {}
+    for field in fields:
+        keys = field.split('.')
+        value = _get(job, field, _MISSING)
+        if value is _MISSING:
+            continue
+        target = result
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        target[keys[-1]] = value
+    return result
+
+
+def _format_bytes(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return '{:.0f} {}'.format(size, unit)
+        size /= 1024.0
+    return '{:.1f} GB'.format(size)
+
+
+class Plan(object):
+    '''
+    A request and the predicates left to apply client-side.
+
+    :param request: 'snapshot', 'ids', 'states' or 'all'
+    :param argument: Job ids or states of the request, snapshot key
+    :param jobs: Estimated number of jobs returned
+    :param size: Estimated bytes transferred
+    :param filters: Descriptions of client-side predicates
+    :param filter_ids: Job ids are filtered client-side
+    :param filter_states: States are filtered client-side
+    '''
+
+    def __init__(self, request, argument, jobs, size, filters,
+                 filter_ids=False, filter_states=False):
+        self.request = request
+        self.argument = argument
+        self.jobs = jobs
+        self.size = size
+        self.filters = filters
+        self.filter_ids = filter_ids
+        self.filter_states = filter_states
+
+    def __str__(self):
+        if self.request == 'snapshot':
+            request = 'reuse snapshot of {}'.format(
+                'Jobs.GetJobs()' if self.argument is None
+                else 'Jobs.GetJobsInStates({})'.format(sorted(self.argument))
+            )
+        elif self.request == 'ids':
+            request = 'Jobs.GetJobs({} ids) in {} requests'.format(
+                len(self.argument),
+                -(-len(self.argument) // IDS_PER_REQUEST),
+            )
+        elif self.request == 'states':
+            request = 'Jobs.GetJobsInStates({})'.format(sorted(self.argument))
+        else:
+            request = 'Jobs.GetJobs()'
+
+        lines = ['{}  ~{} jobs, ~{}'.format(
+            request, self.jobs, _format_bytes(self.size)
+        )]
+        for description in self.filters:
+            lines.append('  filter {}'.format(description))
+        return '\n'.join(lines)
+
+
+class QueryPlanner(object):
+    '''
+    Chooses and runs the requests of JobQuery instances and keeps the
+    snapshots and statistics they are planned with.
+
+    :param connection: deadlineutils.connection.Connection instance
+    :param max_age: Seconds a snapshot may be reused
+    '''
+
+    def __init__(self, connection, max_age=5.0):
+        self.connection = connection
+        self.max_age = max_age
+        self.job_bytes = DEFAULT_JOB_BYTES
+        self.total = None
+        self.counts = {}
+        self._snapshots = {}
+        self._lock = threading.Lock()
+
+    def _estimate(self, states):
+        total = self.total if self.total is not None else DEFAULT_JOB_COUNT
+        if states is None:
+            return total
+        count = 0
+        for state in states:
+            count += self.counts.get(state, total // len(STATES))
+        return count
+
+    def _snapshot(self, states, max_age):
+        '''Key of the freshest snapshot covering states or None'''
+
+        now = time.time()
+        best = None
+        with self._lock:
+            for key, (taken, jobs) in self._snapshots.items():
+                if now - taken > max_age:
+                    continue
+                if key is not None and (states is None or
+                                        not set(states) <= key):
+                    continue
+                if best is None or len(jobs) < best[1]:
+                    best = (key, len(jobs))
+        return best
+
+    def plan(self, query, max_age=None):
+        '''Cheapest Plan for a JobQuery'''
+
+        max_age = self.max_age if max_age is None else max_age
+        states = query.states
+        candidates = []
+
+        snapshot = self._snapshot(states, max_age)
+        if snapshot is not None:
+            candidates.append(('snapshot', snapshot[0], snapshot[1], 0))
+        if query.ids is not None:
+            candidates.append((
+                'ids', query.ids, len(query.ids),
+                len(query.ids) * self.job_bytes,
+            ))
+        if states is not None:
+            count = self._estimate(states)
+            candidates.append(('states', states, count,
+                               count * self.job_bytes))
+        count = self._estimate(None)
+        candidates.append(('all', None, count, count * self.job_bytes))
+
+        request, argument, jobs, size = min(
+            candidates, key=lambda candidate: candidate[3]
+        )
+
+        filter_ids = query.ids is not None and request != 'ids'
+        filter_states = states is not None and not (
+            request == 'states' or
+            (request == 'snapshot' and argument == frozenset(states))
+        )
+        filters = []
+        if filter_ids:
+            filters.append('_id in {} ids'.format(len(query.ids)))
+        if filter_states:
+            filters.append('Stat in {}'.format(sorted(states)))
+        filters.extend(query.filter_descriptions())
+
+        return Plan(request, argument, jobs, size, filters, filter_ids,
+                    filter_states)
+
+    def _record(self, key, jobs):
+        size = sum(len(json.dumps(job)) for job in jobs[:50])
+        with self._lock:
+            self._snapshots[key] = (time.time(), jobs)
+            if jobs:
+                self.job_bytes = size // min(len(jobs), 50) or self.job_bytes
+            if key is None:
+                self.total = len(jobs)
+                self.counts = {}
+                for state, stat in STATES.items():
+                    self.counts[state] = sum(
+                        1 for job in jobs if job.get('Stat') == stat
+                    )
+            elif len(key) == 1:
+                self.counts[list(key)[0]] = len(jobs)
+
+    def fetch(self, plan):
+        '''Run the request of a plan. Returns a list of job dictionaries'''
+
+        if plan.request == 'snapshot':
+            with self._lock:
+                return self._snapshots[plan.argument][1]
+
+        jobs = self.connection.Jobs
+        if plan.request == 'ids':
+            ids = list(plan.argument)
+            result = []
+            for i in range(0, len(ids), IDS_PER_REQUEST):
+                chunk = jobs.GetJobs(ids[i:i + IDS_PER_REQUEST])
+                if isinstance(chunk, list):
+                    result.extend(chunk)
+        elif plan.request == 'states':
+            result = jobs.GetJobsInStates(sorted(plan.argument))
+        else:
+            result = jobs.GetJobs()
+        if not isinstance(result, list):
+            return []
+
+        result = [job for job in result if isinstance(job, dict)]
+        if plan.request == 'states':
+            self._record(frozenset(plan.argument), result)
+        elif plan.request == 'all':
+            self._record(None, result)
+        return result
+
+    def invalidate(self):
+        '''Drop all snapshots, e.g. after changing jobs'''
+
+        with self._lock:
+            self._snapshots.clear()
+
+
+class JobQuery(object):
+    '''
+    Jobs matching all given predicates. Iterating runs the query.
+
+    :param planner: QueryPlanner instance
+    :param state: State name or list of names, see STATES
+    :param pool: Pool name or list of names
+    :param user: User name or list of names
+    :param plugin: Plugin name or list of names
+    :param submitted_after: Seconds since the epoch
+    :param ids: Job ids
+    :param fields: Fields of the returned jobs, all when None
+    :param max_age: Seconds a snapshot may be reused, defaults to the
+        planner's max_age
+    '''
+
+    def __init__(self, planner, state=None, pool=None, user=None,
+                 plugin=None, submitted_after=None, ids=None, fields=None,
+                 max_age=None):
+        self.planner = planner
+        self.states = _values(state)
+        if self.states is not None:
+            unknown = set(self.states) - set(STATES)
+            if unknown:
+                raise ValueError(
+                    'Unknown job states: {}'.format(', '.join(sorted(unknown)))
+                )
+        self.pools = _values(pool)
+        self.users = _values(user)
+        self.plugins = _values(plugin)
+        self.submitted_after = submitted_after
+        self.ids = _values(ids)
+        self.fields = _values(fields)
+        self.max_age = max_age
+
+    def _predicates(self):
+        predicates = []
+        for field, values in (('Props.Pool', self.pools),
+                              ('Props.User', self.users),
+                              ('Plug', self.plugins)):
+            if values is not None:
+                predicates.append((
+                    '{} in {}'.format(field, list(values)),
+                    lambda job, field=field, values=values:
+                        _get(job, field) in values,
+                ))
+        if self.submitted_after is not None:
+            predicates.append((
+                'Date > {}'.format(self.submitted_after),
+                lambda job: (parse_date(job.get('Date')) or 0) >
+                    self.submitted_after,
+            ))
+        return predicates
+
+    def filter_descriptions(self):
+        '''Descriptions of the predicates never pushed to the server'''
+
+        return [description for description, _ in self._predicates()]
+
+    def explain(self):
+        '''The plan the query would run, with estimated jobs and bytes'''
+
+        plan = self.planner.plan(self, self.max_age)
+        lines = [str(plan)]
+        if self.fields is not None:
+            lines.append('  project {}'.format(', '.join(self.fields)))
+        return '\n'.join(lines)
+
+    def run(self):
+        '''Run the query. Returns a list of job dictionaries'''
+
+        plan = self.planner.plan(self, self.max_age)
+        jobs = self.planner.fetch(plan)
+
+        predicates = [predicate for _, predicate in self._predicates()]
+        if plan.filter_ids:
+            ids = set(self.ids)
+            predicates.append(lambda job: job.get('_id') in ids)
+        if plan.filter_states:
+            stats = set(STATES[state] for state in self.states)
+            predicates.append(lambda job: job.get('Stat') in stats)
+
+        result = [
+            job for job in jobs
+            if all(predicate(job) for predicate in predicates)
+        ]
+        if self.fields is not None:
+            result = [project(job, self.fields) for job in result]
+        return result
+
+    def __iter__(self):
+        return iter(self.run())
@@ -0,0 +1,356 @@
+'''
+deadlineutils.reportindex
+=========================
+Local full-text index of job error and log reports::
+
+    index = ReportIndex()
+    index.update(connection)
+    week_ago = time.time() - 7 * 24 * 60 * 60
+    for hit in index.search('"license" AND arnold', since=week_ago):
+        print(hit['job_id'], hit['task_id'], hit['slave'], hit['snippet'])
+
+update only requests report lists for jobs whose error or completed task
+counts changed since the last update, and only downloads the contents of
+reports not indexed yet. Contents are fetched concurrently and stored in an
+SQLite FTS4 table, so searches run offline. When the SQLite build lacks FTS4
+the index falls back to a plain table searched with LIKE. Error responses and
+connection errors are never stored, their reports are requested again on the
+next update.
+'''
+from __future__ import absolute_import
+import json
+import sqlite3
+import time
+
+try:
+    from httplib import HTTPException
+except ImportError:
+    from http.client import HTTPException
+
+from .utils import data_path, parse_date, string_types
+from .workers import run
+
+
+ERROR = 'error'
+LOG = 'log'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS reports (
+    rowid INTEGER PRIMARY KEY,
+    report_id TEXT UNIQUE NOT NULL,
+    kind TEXT NOT NULL,
+    job_id TEXT NOT NULL,
+    task_id TEXT,
+    slave TEXT,
+    plugin TEXT,
+    date REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS reports_job ON reports (job_id);
+CREATE INDEX IF NOT EXISTS reports_date ON reports (date);
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id TEXT PRIMARY KEY,
+    errors INTEGER,
+    completed INTEGER
+);
+'''
+
+# Report fields differ between Deadline versions, the first present is used
+_REPORT_FIELDS = {
+    'report_id': ('ID', '_id', 'Id'),
+    'task_id': ('Task', 'TaskID', 'TaskId'),
+    'slave': ('Slave', 'SlaveName', 'Mach'),
+    'plugin': ('Plugin', 'Plug'),
+    'date': ('Date', 'DateTime', 'Time'),
+}
+
+
+def report_field(report, name):
+    '''
+    Get a report field by name, report_id, task_id, slave, plugin or date,
+    from any of the keys used by the Web Service for it
+    '''
+
+    for key in _REPORT_FIELDS[name]:
+        if report.get(key) not in (None, ''):
+            return report[key]
+    return None
+
+
+def report_text(contents):
+    '''Get report contents returned by the Web Service as one string'''
+
+    if contents is None:
+        return ''
+    if isinstance(contents, string_types):
+        return contents
+    if isinstance(contents, list):
+        return '\n'.join(report_text(item) for item in contents)
+    return json.dumps(contents)
+
+
+class ReportIndex(object):
+    '''
+    SQLite full-text index of report contents keyed by job, task, slave and
+    plugin.
+
+    :param path: Path to the SQLite database, defaults to reports.db in the
+        deadlineutils data directory
+    :param max_workers: Number of reports downloaded concurrently
+    '''
+
+    def __init__(self, path=None, max_workers=8):
+        self.path = path or data_path('reports.db')
+        self.max_workers = max_workers
+
+        db = self._connect()
+        try:
+            db.executescript(_SCHEMA)
+            try:
+                db.execute(
+                    'CREATE VIRTUAL TABLE IF NOT EXISTS report_text '
+                    'USING fts4(contents)'
+                )
+                self.full_text = True
+            except sqlite3.OperationalError:
+                db.execute(
+                    'CREATE TABLE IF NOT EXISTS report_text '
+                    '(docid INTEGER PRIMARY KEY, contents TEXT)'
+                )
+                self.full_text = False
+        finally:
+            db.close()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute('PRAGMA journal_mode=WAL')
+        return db
+
+    def _known(self, report_ids):
+        db = self._connect()
+        try:
+            known = set()
+            report_ids = list(report_ids)
+            for i in range(0, len(report_ids), 500):
+                chunk = report_ids[i:i + 500]
+                rows = db.execute(
+                    'SELECT report_id FROM reports WHERE report_id IN ({})'
+                    .format(','.join('?' * len(chunk))),
+                    chunk
+                ).fetchall()
+                known.update(row[0] for row in rows)
+        finally:
+            db.close()
+        return known
+
+    def _job_counts(self):
+        db = self._connect()
+        try:
+            rows = db.execute(
+                'SELECT job_id, errors, completed FROM jobs'
+            ).fetchall()
+        finally:
+            db.close()
+        return dict((row[0], (row[1], row[2])) for row in rows)
+
+    def _list_reports(self, connection, job, kinds, counts):
+        '''
+        Report metadata of a job for the kinds that changed, None when a list
+        request returned an error or failed to connect
+        '''
+
+        job_id = job['_id']
+        errors, completed = counts.get(job_id, (None, None))
+        listed = []
+
+        try:
+            if ERROR in kinds and job.get('Errs', 1) != errors:
+                listed.append(
+                    (ERROR, connection.JobReports.GetJobErrorReports(job_id))
+                )
+            if LOG in kinds and job.get('CompletedChunks', 1) != completed:
+                listed.append(
+                    (LOG, connection.JobReports.GetJobLogReports(job_id))
+                )
+        except (EnvironmentError, HTTPException):
+            return None
+
+        reports = []
+        for kind, result in listed:
+            if hasattr(result, 'status'):
+                return None
+            for report in result or []:
+                if isinstance(report, dict):
+                    reports.append((kind, job, report))
+        return reports
+
+    def _fetch(self, connection, item):
+        kind, job, report = item
+        report_id = str(report_field(report, 'report_id'))
+        try:
+            if kind == ERROR:
+                contents = connection.JobReports.GetJobErrorReportContents(
+                    job['_id'], report_id
+                )
+            else:
+                contents = connection.JobReports.GetJobLogReportContents(
+                    job['_id'], report_id
+                )
+        except (EnvironmentError, HTTPException):
+            # Timeouts and refused connections, fetched again on the next
+            # update like error responses
+            return None
+        if hasattr(contents, 'status'):
+            # An error response, fetched again on the next update
+            return None
+        return report_text(contents)
+
+    def update(self, connection, jobs=None, kinds=(ERROR, LOG)):
+        '''
+        Index reports not seen before. Returns the number of reports added.
+
+        :param connection: deadlineutils.connection.Connection instance
+        :param jobs: Job dictionaries to index, defaults to every job
+        :param kinds: Report kinds to index, 'error' and/or 'log'
+        '''
+
+        if jobs is None:
+            jobs = connection.Jobs.GetJobs() or []
+        jobs = [job for job in jobs if isinstance(job, dict)]
+        counts = self._job_counts()
+
+        listed = run(
+            lambda job: self._list_reports(connection, job, kinds, counts),
+            jobs,
+            self.max_workers,
+        )
+        # Jobs keep their old counts until their report lists and every new
+        # report were fetched, so they are requested again on the next update
+        incomplete = set(
+            job['_id'] for job, reports in zip(jobs, listed) if reports is None
+        )
+        items = [
+            item for reports in listed for item in reports or []
+            if report_field(item[2], 'report_id') is not None
+        ]
+        known = self._known(
+            str(report_field(item[2], 'report_id')) for item in items
+        )
+        items = [
+            item for item in items
+            if str(report_field(item[2], 'report_id')) not in known
+        ]
+
+        contents = run(
+            lambda item: self._fetch(connection, item),
+            items,
+            self.max_workers,
+        )
+
+        fetched = [
+            (item, text) for item, text in zip(items, contents)
+            if text is not None
+        ]
+        incomplete.update(
+            item[1]['_id'] for item, text in zip(items, contents)
+            if text is None
+        )
+
+        now = time.time()
+        db = self._connect()
+        try:
+            with db:
+                for (kind, job, report), text in fetched:
+                    date = parse_date(report_field(report, 'date')) or now
+                    task_id = report_field(report, 'task_id')
+                    cursor = db.execute(
+                        'INSERT OR IGNORE INTO reports (report_id, kind, '
+                        'job_id, task_id, slave, plugin, date) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        (
+                            str(report_field(report, 'report_id')),
+                            kind,
+                            job['_id'],
+                            None if task_id is None else str(task_id),
+                            report_field(report, 'slave'),
+                            report_field(report, 'plugin') or job.get('Plug'),
+                            date,
+                        )
+                    )
+                    if cursor.rowcount:
+                        db.execute(
+                            'INSERT INTO report_text (docid, contents) '
+                            'VALUES (?, ?)',
+                            (cursor.lastrowid, text)
+                        )
+
+                db.executemany(
+                    'INSERT OR REPLACE INTO jobs (job_id, errors, completed) '
+                    'VALUES (?, ?, ?)',
+                    [
+                        (job['_id'], job.get('Errs'),
+                         job.get('CompletedChunks'))
+                        for job in jobs if job['_id'] not in incomplete
+                    ]
+                )
+        finally:
+            db.close()
+
+        return len(fetched)
+
+    def search(self, query, since=None, until=None, job_id=None, slave=None,
+               plugin=None, kind=None, limit=100):
+        '''
+        Search indexed reports. Returns a list of dictionaries with the
+        report_id, kind, job_id, task_id, slave, plugin, date and a snippet
+        of the matching contents, newest first.
+
+        :param query: FTS4 query, 'license AND arnold', '"exact phrase"'.
+            Matched as a plain substring without FTS4
+        :param since: Only reports dated after since, seconds since the epoch
+        :param until: Only reports dated before until
+        :param job_id: Restrict to a job
+        :param slave: Restrict to a slave
+        :param plugin: Restrict to a plugin
+        :param kind: Restrict to 'error' or 'log' reports
+        :param limit: Maximum number of results
+        '''
+
+        if self.full_text:
+            snippet = "snippet(report_text, '[', ']', '...', -1, 24)"
+            where = ['report_text MATCH ?']
+        else:
+            snippet = 'substr(report_text.contents, 1, 200)'
+            where = ['report_text.contents LIKE ?']
+            query = '%{}%'.format(query)
+
+        params = [query]
+        filters = (
+            ('reports.date >= ?', since),
+            ('reports.date <= ?', until),
+            ('reports.job_id = ?', job_id),
+            ('reports.slave = ?', slave),
+            ('reports.plugin = ?', plugin),
+            ('reports.kind = ?', kind),
+        )
+        for clause, value in filters:
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        params.append(limit)
+
+        sql = (
+            'SELECT reports.report_id, reports.kind, reports.job_id, '
+            'reports.task_id, reports.slave, reports.plugin, reports.date, '
+            '{} FROM report_text JOIN reports '
+            'ON reports.rowid = report_text.docid WHERE {} '
+            'ORDER BY reports.date DESC LIMIT ?'
+        ).format(snippet, ' AND '.join(where))
+
+        columns = ('report_id', 'kind', 'job_id', 'task_id', 'slave',
+                   'plugin', 'date', 'snippet')
+        db = self._connect()
+        try:
+            rows = db.execute(sql, params).fetchall()
+        finally:
+            db.close()
+        return [dict(zip(columns, row)) for row in rows]
@@ -0,0 +1,332 @@
+'''
+deadlineutils.sampler
+=====================
+Slave utilisation time series::
+
+    sampler = SlaveSampler(connection, interval=30)
+    sampler.start()
+    ...
+    sampler.by_pool(start=time.time() - 3600)
+    {'maya': 0.82, 'nuke': 0.35}
+
+Every poll is one Slaves.GetSlaveInfos request. For each slave and field a
+value is stored only when it differs from the previous sample, in fixed size
+preallocated ring buffers. Memory is bounded by the number of slaves, the
+sampled fields and the ring capacity, no matter how long the sampler runs.
+Buffers are NumPy arrays when NumPy is importable, array.array otherwise.
+
+Queries compute time-weighted means over a window, a value holds from the
+time it was sampled until the next change.
+
+Callables in SlaveSampler.listeners receive the slave infos of every poll, so
+other consumers such as a slaveindex.SlaveJobIndex share the same request.
+'''
+from __future__ import absolute_import, print_function
+import array
+import threading
+import time
+
+from .utils import string_types
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Slave Stat value of rendering slaves
+RENDERING = 1
+
+# Slave info fields sampled by default, cpu usage, free memory and state
+FIELDS = ('CPU', 'RAMFree', 'Stat')
+
+
+def _alloc(typecode, capacity):
+    if numpy is not None:
+        dtype = {'I': numpy.uint32, 'd': numpy.float64}[typecode]
+        return numpy.zeros(capacity, dtype=dtype)
+    return array.array(typecode, [0]) * capacity
+
+
+def _members(value):
+    '''Pools and groups come as lists or comma separated strings'''
+
+    if not value:
+        return set()
+    if isinstance(value, string_types):
+        value = value.split(',')
+    return set(item.strip() for item in value if item.strip())
+
+
+class Ring(object):
+    '''
+    Fixed size buffer of (time, value) samples that only stores changes.
+    Times are stored as whole seconds relative to epoch, samples older than
+    epoch are not stored. Values are stored as doubles, so large values like
+    RAMFree in bytes compare equal to the value stored before.
+
+    :param capacity: Number of samples kept
+    :param epoch: Time subtracted from sample times
+    '''
+
+    __slots__ = ('times', 'values', 'head', 'size', 'epoch')
+
+    def __init__(self, capacity, epoch):
+        self.times = _alloc('I', capacity)
+        self.values = _alloc('d', capacity)
+        self.head = 0
+        self.size = 0
+        self.epoch = epoch
+
+    def append(self, when, value):
+        '''
+        Store value at time when unless it equals the last value or when is
+        before epoch
+        '''
+
+        offset = int(when - self.epoch)
+        if offset < 0:
+            return False
+        capacity = len(self.times)
+        if self.size and self.values[(self.head - 1) % capacity] == value:
+            return False
+        self.times[self.head] = offset
+        self.values[self.head] = value
+        self.head = (self.head + 1) % capacity
+        self.size = min(self.size + 1, capacity)
+        return True
+
+    def samples(self):
+        '''(times, values) in chronological order'''
+
+        capacity = len(self.times)
+        start = (self.head - self.size) % capacity
+        if numpy is not None:
+            index = (numpy.arange(self.size) + start) % capacity
+            return self.times[index] + self.epoch, self.values[index]
+        if start + self.size <= capacity:
+            times = self.times[start:start + self.size]
+            values = self.values[start:start + self.size]
+        else:
+            times = self.times[start:] + self.times[:self.head]
+            values = self.values[start:] + self.values[:self.head]
+        return [t + self.epoch for t in times], list(values)
+
+    def mean(self, start, end, transform=None):
+        '''
+        Time-weighted mean of the values between start and end. Returns
+        (mean, seconds covered), mean is None when nothing is covered.
+
+        :param transform: Optional function applied to the values
+        '''
+
+        if not self.size or end <= start:
+            return None, 0
+
+        times, values = self.samples()
+        if numpy is not None:
+            times = times.astype(numpy.float64)
+            values = values.astype(numpy.float64)
+            if transform is not None:
+                values = transform(values).astype(numpy.float64)
+            begins = numpy.clip(times, start, end)
+            ends = numpy.clip(
+                numpy.append(times[1:], end), start, end
+            )
+            durations = ends - begins
+            covered = float(durations.sum())
+            if not covered:
+                return None, 0
+            return float((values * durations).sum() / covered), covered
+
+        total = covered = 0.0
+        for i, value in enumerate(values):
+            begin = min(max(times[i], start), end)
+            finish = times[i + 1] if i + 1 < len(times) else end
+            finish = min(max(finish, start), end)
+            if finish > begin:
+                if transform is not None:
+                    value = transform(value)
+                total += value * (finish - begin)
+                covered += finish - begin
+        if not covered:
+            return None, 0
+        return total / covered, covered
+
+
+def _rendering(values):
+    return values == RENDERING
+
+
+class SlaveSampler(object):
+    '''
+    Polls Slaves.GetSlaveInfos at a fixed cadence and keeps per slave
+    metrics in ring buffers.
+
+    :param connection: deadlineutils.connection.Connection instance
+    :param interval: Seconds between polls
+    :param capacity: Number of changes kept per slave and field
+    :param fields: Numeric slave info fields to sample
+    '''
+
+    def __init__(self, connection, interval=60, capacity=512, fields=FIELDS):
+        self.connection = connection
+        self.interval = interval
+        self.capacity = capacity
+        self.fields = tuple(fields)
+        self.epoch = int(time.time())
+        self.rings = {}
+        self.pools = {}
+        self.groups = {}
+        self.memory = {}
+        self.last_poll = None
+        self.listeners = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def update(self, infos, now=None):
+        '''
+        Add a set of slave infos to the time series
+
+        :param infos: List of slave info dictionaries
+        :param now: Sample time, defaults to the current time
+        '''
+
+        now = time.time() if now is None else now
+        with self._lock:
+            for info in infos or []:
+                if not isinstance(info, dict) or not info.get('Name'):
+                    continue
+                name = info['Name']
+
+                rings = self.rings.get(name)
+                if rings is None:
+                    rings = self.rings[name] = dict(
+                        (field, Ring(self.capacity, self.epoch))
+                        for field in self.fields
+                    )
+                for field in self.fields:
+                    value = info.get(field)
+                    if isinstance(value, (int, float)):
+                        rings[field].append(now, value)
+
+                self.pools[name] = _members(info.get('Pools'))
+                self.groups[name] = _members(info.get('Grps'))
+                if info.get('RAM'):
+                    self.memory[name] = info['RAM']
+            self.last_poll = now
+
+    def poll(self):
+        '''Request slave infos once and sample them. Returns the infos'''
+
+        infos = self.connection.Slaves.GetSlaveInfos()
+        if isinstance(infos, list):
+            self.update(infos)
+            for listener in self.listeners:
+                listener(infos)
+        return infos
+
+    def run(self):
+        '''Poll every interval seconds until stop is called'''
+
+        self._stop.clear()
+        while not self._stop.is_set():
+            started = time.time()
+            try:
+                self.poll()
+            except Exception as e:
+                print('Slave sampler poll failed:', e)
+            self._stop.wait(max(0, self.interval - (time.time() - started)))
+
+    def start(self):
+        '''Run the sampler in a daemon thread'''
+
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self.run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        '''Stop a sampler started with start'''
+
+        self._stop.set()
+
+    def slaves(self, pool=None, group=None):
+        '''Names of sampled slaves, optionally in a pool and/or group'''
+
+        return [
+            name for name in self.rings
+            if (pool is None or pool in self.pools.get(name, ()))
+            and (group is None or group in self.groups.get(name, ()))
+        ]
+
+    def history(self, slave, field='CPU'):
+        '''List of (time, value) changes kept for a slave field'''
+
+        times, values = self.rings[slave][field].samples()
+        return list(zip([float(t) for t in times], [float(v) for v in values]))
+
+    def mean(self, field='CPU', start=None, end=None, pool=None, group=None,
+             transform=None):
+        '''
+        Time-weighted mean of a field over all matching slaves.
+
+        :param field: Sampled field
+        :param start: Window start, defaults to the first sample
+        :param end: Window end, defaults to the last poll
+        :param pool: Only slaves in this pool
+        :param group: Only slaves in this group
+        :param transform: Optional function applied to the values
+        '''
+
+        if self.last_poll is None:
+            return None
+        end = min(end or self.last_poll, self.last_poll)
+        start = self.epoch if start is None else start
+
+        total = covered = 0.0
+        with self._lock:
+            for name in self.slaves(pool, group):
+                value, seconds = self.rings[name][field].mean(
+                    start, end, transform
+                )
+                if value is not None:
+                    total += value * seconds
+                    covered += seconds
+        return total / covered if covered else None
+
+    def utilisation(self, start=None, end=None, pool=None, group=None):
+        '''
+        Fraction of slave time spent rendering in the window, 0 to 1.
+
+        :param start: Window start
+        :param end: Window end
+        :param pool: Only slaves in this pool
+        :param group: Only slaves in this group
+        '''
+
+        return self.mean('Stat', start, end, pool, group, _rendering)
+
+    def _by(self, members, start, end):
+        names = set()
+        for values in members.values():
+            names.update(values)
+        result = {}
+        for name in sorted(names):
+            if members is self.pools:
+                result[name] = self.utilisation(start, end, pool=name)
+            else:
+                result[name] = self.utilisation(start, end, group=name)
+        return result
+
+    def by_pool(self, start=None, end=None):
+        '''Rendering utilisation of every pool in the window'''
+
+        return self._by(self.pools, start, end)
+
+    def by_group(self, start=None, end=None):
+        '''Rendering utilisation of every group in the window'''
+
+        return self._by(self.groups, start, end)
@@ -0,0 +1,125 @@
+'''
+deadlineutils.slaveindex
+========================
+Which slaves are on which job, from a single Slaves.GetSlaveInfos request
+instead of one SlavesRenderingJob.GetSlavesRenderingJob request per job::
+
+    index = SlaveJobIndex()
+    index.refresh(connection)
+    index.slaves_on('5a1c...')
+    ['node01', 'node07']
+    index.job_of('node01')
+    '5a1c...'
+
+refresh and update apply only the slaves whose job changed since the last
+poll. An index can also share the polls of a SlaveSampler::
+
+    sampler.listeners.append(index.update)
+'''
+from __future__ import absolute_import
+import threading
+
+
+# Slave Stat values of slaves working on a job, rendering and starting job
+WORKING = (1, 8)
+
+
+class SlaveJobIndex(object):
+    '''
+    Job to slaves and slave to job mapping built from slave infos.
+
+    :param working_only: Only map slaves that are rendering or starting a
+        job. Idle slaves keep the id of their last job in their info
+    '''
+
+    def __init__(self, working_only=True):
+        self.working_only = working_only
+        self._slave_job = {}
+        self._job_slaves = {}
+        self._lock = threading.Lock()
+
+    def _job_id(self, info):
+        if self.working_only and info.get('Stat') not in WORKING:
+            return None
+        return info.get('JobId') or None
+
+    def _move(self, slave, job_id):
+        old_job_id = self._slave_job.pop(slave, None)
+        if old_job_id is not None:
+            slaves = self._job_slaves[old_job_id]
+            slaves.discard(slave)
+            if not slaves:
+                del self._job_slaves[old_job_id]
+        if job_id is not None:
+            self._slave_job[slave] = job_id
+            self._job_slaves.setdefault(job_id, set()).add(slave)
+
+    def update(self, infos, complete=True):
+        '''
+        Apply slave infos to the index. Returns a list of
+        (slave, old_job_id, new_job_id) changes.
+
+        :param infos: List of slave info dictionaries
+        :param complete: infos cover every slave, slaves missing from them
+            are removed from the index
+        '''
+
+        changes = []
+        seen = set()
+        with self._lock:
+            for info in infos or []:
+                if not isinstance(info, dict) or not info.get('Name'):
+                    continue
+                slave = info['Name']
+                seen.add(slave)
+                job_id = self._job_id(info)
+                old_job_id = self._slave_job.get(slave)
+                if job_id != old_job_id:
+                    self._move(slave, job_id)
+                    changes.append((slave, old_job_id, job_id))
+
+            if complete:
+                for slave in set(self._slave_job) - seen:
+                    changes.append((slave, self._slave_job[slave], None))
+                    self._move(slave, None)
+
+        return changes
+
+    def refresh(self, connection):
+        '''
+        Update the index with one Slaves.GetSlaveInfos request. Returns the
+        list of changes, see update.
+
+        :param connection: deadlineutils.connection.Connection instance
+        '''
+
+        infos = connection.Slaves.GetSlaveInfos()
+        if not isinstance(infos, list):
+            return []
+        return self.update(infos)
+
+    def slaves_on(self, job_id):
+        '''Sorted names of the slaves on a job'''
+
+        with self._lock:
+            return sorted(self._job_slaves.get(job_id, ()))
+
+    def job_of(self, slave):
+        '''Id of the job a slave is on or None'''
+
+        return self._slave_job.get(slave)
+
+    def job_slaves(self):
+        '''Dictionary mapping job ids to sorted lists of slave names'''
+
+        with self._lock:
+            return dict(
+                (job_id, sorted(slaves))
+                for job_id, slaves in self._job_slaves.items()
+            )
+
+    def slave_jobs(self):
+        '''Dictionary mapping slave names to job ids'''
+
+        with self._lock:
+            return dict(self._slave_job)
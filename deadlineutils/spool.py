@@ -0,0 +1,366 @@
+'''
+deadlineutils.spool
+===================
+Durable on-disk submission spool. Submissions that can not reach the Web
+Service are recorded in a local SQLite database and flushed later in bulk
+through Jobs.SubmitJobs.
+
+Every entry moves through these states::
+
+    pending -> sending -> sent
+                       -> failed
+
+Entries are claimed (pending -> sending) inside an exclusive transaction
+before they are posted, so two processes flushing the same spool never post
+the same entry. An entry is only released back to pending when the Web
+Service could not have received it. When the outcome is unknown, for example
+a timeout while reading the response, the entry stays in the sending state
+and is reported by Spool.in_doubt instead of being submitted again.
+
+Only submissions the Web Service could not answer are spooled: unreachable
+servers and 5xx responses. An entry the Web Service rejects when flushed,
+for example a 400 for invalid job info, moves to the failed state with the
+error and is listed by Spool.failures, so it does not block the entries
+behind it.
+'''
+from __future__ import absolute_import, print_function
+import json
+import socket
+import sqlite3
+import time
+import uuid
+
+from .utils import data_path, string_types
+
+try:
+    from urllib2 import URLError
+except ImportError:
+    from urllib.error import URLError
+
+
+PENDING = 'pending'
+SENDING = 'sending'
+SENT = 'sent'
+FAILED = 'failed'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS entries (
+    id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    state TEXT NOT NULL,
+    claimed REAL,
+    job TEXT NOT NULL,
+    result TEXT
+);
+CREATE INDEX IF NOT EXISTS entries_state ON entries (state, created);
+'''
+
+
+def is_unreachable(exc):
+    '''
+    True when exc means the request never reached the Web Service. Timeouts
+    are excluded, the server may have accepted the request before it hung.
+    '''
+
+    if isinstance(exc, socket.timeout):
+        return False
+    if isinstance(exc, URLError):
+        return not isinstance(getattr(exc, 'reason', None), socket.timeout)
+    return isinstance(exc, socket.error)
+
+
+def is_server_error(result):
+    '''
+    True when result is an error response with a 5xx HTTP status, which the
+    Web Service may not return for the same request later
+    '''
+
+    return getattr(result, 'status', 0) >= 500
+
+
+def submitted(result):
+    '''
+    True when result looks like a successful Jobs.SubmitJob/SubmitJobs
+    response. Errors come back from DeadlineSend as plain strings, HTTP
+    error responses as ErrorData carrying the status.
+    '''
+
+    if hasattr(result, 'status'):
+        return False
+    if isinstance(result, (dict, list)):
+        return True
+    if isinstance(result, string_types):
+        return result.strip().lower().startswith('success')
+    return False
+
+
+class Spool(object):
+    '''
+    Local submission spool::
+
+        spool = Spool()
+        spool.add(job_info, plugin_info)
+        spool.flush(connection)
+
+    :param path: Path to the SQLite database, defaults to spool.db in the
+        deadlineutils data directory
+    :param batch_size: Maximum number of jobs posted per Jobs.SubmitJobs call
+    :param min_interval: Minimum number of seconds between two posts
+    '''
+
+    def __init__(self, path=None, batch_size=50, min_interval=1.0):
+        self.path = path or data_path('spool.db')
+        self.batch_size = batch_size
+        self.min_interval = min_interval
+        self._last_post = 0
+
+        db = self._connect()
+        try:
+            db.executescript(_SCHEMA)
+        finally:
+            db.close()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.execute('PRAGMA journal_mode=WAL')
+        return db
+
+    def add(self, job_info, plugin_info, aux=None):
+        '''
+        Record a submission. Returns the new entry id.
+
+        :param job_info: Job information Dictionary
+        :param plugin_info: Plugin info dictionary
+        :param aux: List of auxiliary submission files
+        '''
+
+        entry_id = uuid.uuid4().hex
+        job = {
+            'JobInfo': job_info,
+            'PluginInfo': plugin_info,
+            'AuxFiles': list(aux or []),
+        }
+
+        db = self._connect()
+        try:
+            db.execute(
+                'INSERT INTO entries (id, created, state, job) '
+                'VALUES (?, ?, ?, ?)',
+                (entry_id, time.time(), PENDING, json.dumps(job))
+            )
+        finally:
+            db.close()
+
+        return entry_id
+
+    def count(self, state=PENDING):
+        '''Number of entries in the given state'''
+
+        db = self._connect()
+        try:
+            row = db.execute(
+                'SELECT COUNT(*) FROM entries WHERE state = ?', (state,)
+            ).fetchone()
+        finally:
+            db.close()
+        return row[0]
+
+    def in_doubt(self):
+        '''
+        List the ids of entries that were posted without a definite answer
+        from the Web Service. Check the farm for these jobs, then call
+        release or discard.
+        '''
+
+        db = self._connect()
+        try:
+            rows = db.execute(
+                'SELECT id FROM entries WHERE state = ? ORDER BY created',
+                (SENDING,)
+            ).fetchall()
+        finally:
+            db.close()
+        return [row[0] for row in rows]
+
+    def failures(self):
+        '''
+        List (id, error) of entries the Web Service rejected. Fix and add
+        them again, then discard them.
+        '''
+
+        db = self._connect()
+        try:
+            rows = db.execute(
+                'SELECT id, result FROM entries WHERE state = ? '
+                'ORDER BY created',
+                (FAILED,)
+            ).fetchall()
+        finally:
+            db.close()
+        return [
+            (row[0], None if row[1] is None else json.loads(row[1]))
+            for row in rows
+        ]
+
+    def release(self, entry_ids):
+        '''Move entries back to pending so the next flush posts them'''
+
+        self._set_state(entry_ids, PENDING)
+
+    def discard(self, entry_ids):
+        '''Delete entries from the spool regardless of their state'''
+
+        db = self._connect()
+        try:
+            db.execute('BEGIN IMMEDIATE')
+            db.executemany(
+                'DELETE FROM entries WHERE id = ?',
+                [(entry_id,) for entry_id in entry_ids]
+            )
+            db.execute('COMMIT')
+        finally:
+            db.close()
+
+    def purge(self, older_than=7 * 24 * 60 * 60):
+        '''
+        Delete sent entries older than older_than seconds
+
+        :param older_than: Age in seconds, defaults to one week
+        '''
+
+        db = self._connect()
+        try:
+            db.execute(
+                'DELETE FROM entries WHERE state = ? AND created < ?',
+                (SENT, time.time() - older_than)
+            )
+        finally:
+            db.close()
+
+    def _set_state(self, entry_ids, state, results=None):
+        results = results or [None] * len(entry_ids)
+        db = self._connect()
+        try:
+            db.execute('BEGIN IMMEDIATE')
+            db.executemany(
+                'UPDATE entries SET state = ?, result = ? WHERE id = ?',
+                [
+                    (state, None if result is None else json.dumps(result),
+                     entry_id)
+                    for entry_id, result in zip(entry_ids, results)
+                ]
+            )
+            db.execute('COMMIT')
+        finally:
+            db.close()
+
+    def _claim(self, limit):
+        db = self._connect()
+        try:
+            db.execute('BEGIN IMMEDIATE')
+            rows = db.execute(
+                'SELECT id, job FROM entries WHERE state = ? '
+                'ORDER BY created LIMIT ?',
+                (PENDING, limit)
+            ).fetchall()
+            db.executemany(
+                'UPDATE entries SET state = ?, claimed = ? WHERE id = ?',
+                [(SENDING, time.time(), row[0]) for row in rows]
+            )
+            db.execute('COMMIT')
+        finally:
+            db.close()
+        return [(row[0], json.loads(row[1])) for row in rows]
+
+    def _wait(self):
+        delay = self._last_post + self.min_interval - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        self._last_post = time.time()
+
+    def _post(self, connection, entry_ids, jobs):
+        '''
+        Post claimed entries. A batch the Web Service rejects is posted again
+        entry by entry so the rejected entries can be told apart. Returns the
+        number of entries submitted, None when the Web Service failed.
+        '''
+
+        self._wait()
+        try:
+            result = connection.Jobs.SubmitJobs(jobs)
+        except Exception as e:
+            if is_unreachable(e):
+                self.release(entry_ids)
+            raise
+
+        if submitted(result):
+            if isinstance(result, list) and len(result) == len(entry_ids):
+                self._set_state(entry_ids, SENT, result)
+            else:
+                self._set_state(entry_ids, SENT)
+            return len(entry_ids)
+
+        if is_server_error(result) or not isinstance(result, string_types):
+            self.release(entry_ids)
+            return None
+
+        if len(entry_ids) == 1:
+            self._set_state(entry_ids, FAILED, [result])
+            return 0
+
+        posted = 0
+        for index, (entry_id, job) in enumerate(zip(entry_ids, jobs)):
+            count = self._post(connection, [entry_id], [job])
+            if count is None:
+                self.release(entry_ids[index + 1:])
+                return None
+            posted += count
+        return posted
+
+    def flush(self, connection, max_batches=None):
+        '''
+        Post pending entries with Jobs.SubmitJobs, batch_size jobs at a time
+        and at most one post every min_interval seconds. Entries the Web
+        Service rejects move to the failed state. Stops when the Web Service
+        fails with a 5xx error. Returns the number of entries submitted.
+
+        :param connection: deadlineutils.connection.Connection instance
+        :param max_batches: Maximum number of batches, defaults to no limit
+        '''
+
+        flushed = 0
+        batches = 0
+
+        while max_batches is None or batches < max_batches:
+            claimed = self._claim(self.batch_size)
+            if not claimed:
+                break
+
+            batches += 1
+            count = self._post(
+                connection,
+                [entry_id for entry_id, _ in claimed],
+                [job for _, job in claimed],
+            )
+            if count is None:
+                break
+            flushed += count
+
+        return flushed
+
+    def flush_forever(self, connection, interval=30):
+        '''
+        Flush the spool every interval seconds until interrupted. Meant to run
+        in a small daemon process on a submission host.
+
+        :param connection: deadlineutils.connection.Connection instance
+        :param interval: Seconds to wait between flushes
+        '''
+
+        while True:
+            try:
+                self.flush(connection)
+            except Exception as e:
+                if not is_unreachable(e):
+                    raise
+            time.sleep(interval)
@@ -0,0 +1,192 @@
+'''
+deadlineutils.sweeper
+=====================
+Find failed tasks across the farm and resume or requeue them::
+
+    sweeper = FailedTaskSweeper(connection, rules=[
+        (r'license', 'resume'),
+        (r'Scene file .* not found', 'ignore'),
+    ])
+    result = sweeper.sweep()
+
+Candidate jobs are scanned concurrently. Each failed task is classified by
+matching its error reports against rules, read with one
+JobReports.GetJobErrorReports request per job and grouped by task. Without
+rules every failed task gets the default action and no reports are read.
+Tasks are then resumed or requeued with one
+Tasks.ResumeFailedJobTasks/RequeueJobTasks call per job. Every request made
+during a sweep shares one concurrency limit.
+'''
+from __future__ import absolute_import
+import json
+import re
+
+from .reportindex import report_field
+from .utils import string_types
+from .workers import Slots, run
+
+
+# Job Stat of failed jobs, Task Stat of failed tasks
+FAILED_JOB = 4
+FAILED_TASK = 6
+
+RESUME = 'resume'
+REQUEUE = 'requeue'
+IGNORE = 'ignore'
+
+
+class FailedTaskSweeper(object):
+    '''
+    Scans jobs for failed tasks and recovers them.
+
+    :param connection: deadlineutils.connection.Connection instance
+    :param rules: List of (regex, action) tuples matched in order against a
+        task's error reports. Actions are 'resume', 'requeue' and 'ignore'
+    :param default: Action for tasks no rule matches
+    :param states: Job states scanned for failed tasks
+    :param max_workers: Number of jobs scanned concurrently
+    :param max_requests: Maximum number of requests in flight during a sweep
+    '''
+
+    def __init__(self, connection, rules=None, default=RESUME,
+                 states=('Failed', 'Active'), max_workers=16,
+                 max_requests=16):
+        self.connection = connection
+        self.rules = [
+            (re.compile(pattern, re.IGNORECASE), action)
+            for pattern, action in rules or []
+        ]
+        self.default = default
+        self.states = states
+        self.max_workers = max_workers
+        self.slots = Slots(max_requests)
+
+    def candidates(self):
+        '''Jobs in the scanned states that have or may have failed tasks'''
+
+        jobs = self.connection.Jobs.GetJobsInStates(list(self.states)) or []
+        return [
+            job for job in jobs
+            if job.get('Stat') == FAILED_JOB or job.get('FailedChunks', 1)
+        ]
+
+    def _action(self, reports):
+        '''Action of the first rule matching the text of reports'''
+
+        text = '\n'.join(
+            report if isinstance(report, string_types) else json.dumps(report)
+            for report in reports
+        )
+        for pattern, action in self.rules:
+            if pattern.search(text):
+                return action
+        return self.default
+
+    def _task_reports(self, job_id):
+        '''
+        Error reports of a job grouped by task id with one request, None when
+        the request failed
+        '''
+
+        reports = self.connection.JobReports.GetJobErrorReports(job_id)
+        if not isinstance(reports, list):
+            return None
+        by_task = {}
+        for report in reports:
+            if not isinstance(report, dict):
+                continue
+            task_id = report_field(report, 'task_id')
+            if task_id is not None:
+                by_task.setdefault(str(task_id), []).append(report)
+        return by_task
+
+    def scan_job(self, job):
+        '''
+        Classify the failed tasks of a job. Returns a dictionary mapping
+        actions to lists of task ids. Without rules every failed task gets
+        the default action and no reports are read, otherwise the job's error
+        reports are read with one request. Jobs whose reports can not be read
+        are left out.
+        '''
+
+        tasks = self.connection.Tasks.GetJobTasks(job['_id']) or []
+        failed = [
+            task['TaskID'] for task in tasks
+            if isinstance(task, dict) and task.get('Stat') == FAILED_TASK
+        ]
+        if not failed:
+            return {}
+        if not self.rules:
+            return {self.default: failed}
+
+        by_task = self._task_reports(job['_id'])
+        if by_task is None:
+            return {}
+        actions = {}
+        for task_id in failed:
+            action = self._action(by_task.get(str(task_id), []))
+            actions.setdefault(action, []).append(task_id)
+        return actions
+
+    def scan(self):
+        '''
+        Scan candidate jobs concurrently. Returns a dictionary mapping job ids
+        to the result of scan_job, jobs without failed tasks are left out.
+        '''
+
+        self.connection.transport.push(self.slots)
+        try:
+            jobs = self.candidates()
+            scans = run(self.scan_job, jobs, self.max_workers)
+        finally:
+            self.connection.transport.remove(self.slots)
+
+        return dict(
+            (job['_id'], actions)
+            for job, actions in zip(jobs, scans)
+            if actions
+        )
+
+    def recover(self, scanned):
+        '''
+        Resume and requeue classified tasks, one request per job and action.
+
+        :param scanned: Result of scan
+        '''
+
+        calls = []
+        for job_id, actions in scanned.items():
+            if actions.get(RESUME):
+                calls.append((
+                    self.connection.Tasks.ResumeFailedJobTasks,
+                    job_id,
+                    actions[RESUME],
+                ))
+            if actions.get(REQUEUE):
+                calls.append((
+                    self.connection.Tasks.RequeueJobTasks,
+                    job_id,
+                    actions[REQUEUE],
+                ))
+
+        self.connection.transport.push(self.slots)
+        try:
+            return run(
+                lambda call: call[0](call[1], call[2]),
+                calls,
+                self.max_workers,
+            )
+        finally:
+            self.connection.transport.remove(self.slots)
+
+    def sweep(self, dry_run=False):
+        '''
+        Scan the farm and recover failed tasks. Returns the scan result.
+
+        :param dry_run: Only scan and classify, do not change any task
+        '''
+
+        scanned = self.scan()
+        if not dry_run:
+            self.recover(scanned)
+        return scanned
@@ -0,0 +1,324 @@
+'''
+deadlineutils.tail
+==================
+Follow task log reports without downloading them again::
+
+    for line in connection.tail_task_log(job_id, task_id):
+        print(line)
+
+Each poll requests the task's log report list, which is small, and downloads
+the contents of reports that were not seen before. Lines already yielded are
+never yielded again. Error responses are not taken for log lines, their
+reports are requested again on the next poll. The poll interval starts at
+min_interval, doubles while nothing new arrives up to max_interval and drops
+back once lines arrive.
+
+TailMultiplexer follows many tasks from a single thread and connection::
+
+    tails = TailMultiplexer(connection)
+    for job_id, task_id in tasks:
+        tails.add(job_id, task_id)
+    for job_id, task_id, line in tails:
+        print(task_id, line)
+
+While tailing, GET requests are sent over kept-alive HTTP/1.1 connections
+from a KeepAlivePool instead of a new connection per request, so 50 tails
+polling every second reuse one socket. Requests are passed on unchanged when
+the Connection balances requests over several Web Service instances.
+'''
+from __future__ import absolute_import
+import base64
+import heapq
+import socket
+import threading
+import time
+
+try:
+    import httplib
+except ImportError:
+    import http.client as httplib
+
+try:
+    from Deadline import DeadlineJSON
+    from Deadline.DeadlineSend import errorData
+except ImportError:
+    from .packages.Deadline import DeadlineJSON
+    from .packages.Deadline.DeadlineSend import errorData
+
+from .balance import LoadBalancer
+from .reportindex import report_field, report_text
+from .timeouts import remaining
+
+_AUTH_FAILED = (
+    'Error: HTTP Status Code 401. Authentication with the Web Service '
+    'failed. Please ensure that the authentication credentials are set, are '
+    'correct, and that authentication mode is enabled.'
+)
+
+
+class KeepAlivePool(object):
+    '''
+    Transport interceptor sending GET requests over pooled persistent
+    connections. Other requests and balanced connections are passed on.
+    Responses are decoded like DeadlineSend's.
+
+    Use it as a context manager, it is pushed onto the transport inside the
+    block and its connections are closed when the block exits::
+
+        with KeepAlivePool(connection.transport):
+            ...
+
+    :param transport: deadlineutils.transport.Transport instance
+    '''
+
+    def __init__(self, transport):
+        self.transport = transport
+        self._idle = []
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.transport.push(self, innermost=True)
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.transport.remove(self)
+        self.close()
+        return False
+
+    def close(self):
+        '''Close the idle connections'''
+
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for _, connection in idle:
+            connection.close()
+
+    def _acquire(self, address, connect_timeout):
+        with self._lock:
+            for index, (idle_address, connection) in enumerate(self._idle):
+                if idle_address == address:
+                    del self._idle[index]
+                    return connection, True
+        return httplib.HTTPConnection(address, timeout=connect_timeout), False
+
+    def _release(self, address, connection):
+        with self._lock:
+            self._idle.append((address, connection))
+
+    def __call__(self, method, command, body, send):
+        connection_property = self.transport.connection_property
+        if method != 'GET' or isinstance(connection_property, LoadBalancer):
+            # LoadBalancers choose the endpoint of every request themselves
+            return send(method, command, body)
+
+        address = connection_property.address
+        if address.startswith('http://'):
+            address = address[len('http://'):]
+        connect_timeout, read_timeout = connection_property.RequestTimeout(
+            remaining()
+        )
+        headers = {}
+        if connection_property.useAuth:
+            credentials = base64.b64encode('{}:{}'.format(
+                connection_property.user, connection_property.password
+            ).encode('utf-8')).decode('ascii')
+            headers['Authorization'] = 'Basic ' + credentials
+
+        while True:
+            connection, reused = self._acquire(address, connect_timeout)
+            try:
+                if connection.sock is None:
+                    connection.connect()
+                connection.sock.settimeout(read_timeout)
+                connection.request('GET', command, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+            except socket.timeout:
+                connection.close()
+                raise
+            except (httplib.HTTPException, EnvironmentError):
+                connection.close()
+                if reused:
+                    # The server closed the idle connection, GETs are safe
+                    # to send again on a new one
+                    continue
+                raise
+            break
+
+        if response.will_close:
+            connection.close()
+        else:
+            self._release(address, connection)
+
+        if not 200 <= response.status < 300:
+            if response.status == 401:
+                data = _AUTH_FAILED
+            return errorData(data, response.status)
+        try:
+            return DeadlineJSON.loads(data)
+        except Exception:
+            # Plain text responses keep their newlines replaced
+            return data.replace('\n', ' ')
+
+
+class TaskLogTail(object):
+    '''
+    Tracks the log reports of one task and returns only new lines.
+
+    :param connection: deadlineutils.connection.Connection instance
+    :param job_id: The Job ID
+    :param task_id: The Task ID
+    :param min_interval: Shortest time between polls in seconds
+    :param max_interval: Longest time between polls in seconds
+    '''
+
+    def __init__(self, connection, job_id, task_id, min_interval=1.0,
+                 max_interval=30.0):
+        self.connection = connection
+        self.job_id = job_id
+        self.task_id = task_id
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self.next_poll = 0
+        self._seen = set()
+        self._lines = 0
+
+    def poll(self):
+        '''Request new log lines and schedule the next poll'''
+
+        lines = self._poll()
+        if lines:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.interval * 2, self.max_interval)
+        self.next_poll = time.time() + self.interval
+        return lines
+
+    def _poll(self):
+        reports = self.connection.TaskReports.GetTaskLogReports(
+            self.job_id, self.task_id
+        )
+        if not isinstance(reports, list):
+            return []
+
+        report_ids = [
+            report_field(report, 'report_id')
+            for report in reports if isinstance(report, dict)
+        ]
+        if None in report_ids:
+            return self._poll_contents()
+
+        lines = []
+        for report_id in report_ids:
+            report_id = str(report_id)
+            if report_id in self._seen:
+                continue
+            contents = self.connection.JobReports.GetJobLogReportContents(
+                self.job_id, report_id
+            )
+            if hasattr(contents, 'status'):
+                # An error response, the report is requested again next poll
+                continue
+            self._seen.add(report_id)
+            lines.extend(report_text(contents).splitlines())
+        return lines
+
+    def _poll_contents(self):
+        # Reports without ids, download everything and skip what was seen
+        contents = self.connection.TaskReports.GetAllTaskLogReportsContents(
+            self.job_id, self.task_id
+        )
+        if hasattr(contents, 'status'):
+            return []
+        lines = report_text(contents).splitlines()
+        new_lines = lines[self._lines:]
+        self._lines = len(lines)
+        return new_lines
+
+
+def tail_task_log(connection, job_id, task_id, stop=None, **kwargs):
+    '''
+    Generator yielding new log lines of a task as they are reported.
+
+    :param connection: deadlineutils.connection.Connection instance
+    :param job_id: The Job ID
+    :param task_id: The Task ID
+    :param stop: Optional callable, the generator ends when it returns True
+    :param kwargs: min_interval and max_interval, see TaskLogTail
+    '''
+
+    tail = TaskLogTail(connection, job_id, task_id, **kwargs)
+    with KeepAlivePool(connection.transport):
+        while not (stop and stop()):
+            delay = tail.next_poll - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            for line in tail.poll():
+                yield line
+
+
+class TailMultiplexer(object):
+    '''
+    Follows the logs of many tasks from one thread. Tails are polled in the
+    order they become due, each at its own adaptive interval, over one
+    kept-alive connection.
+
+    :param connection: deadlineutils.connection.Connection instance
+    :param min_interval: Shortest time between polls of one task
+    :param max_interval: Longest time between polls of one task
+    '''
+
+    def __init__(self, connection, min_interval=1.0, max_interval=30.0):
+        self.connection = connection
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self._heap = []
+        self._tails = {}
+        self._generation = 0
+
+    def add(self, job_id, task_id):
+        '''Start following a task'''
+
+        key = (job_id, str(task_id))
+        if key in self._tails:
+            return
+        tail = TaskLogTail(
+            self.connection, job_id, task_id,
+            self.min_interval, self.max_interval,
+        )
+        # Heap entries of a removed tail are told apart by their generation
+        self._generation += 1
+        tail.generation = self._generation
+        self._tails[key] = tail
+        heapq.heappush(self._heap, (tail.next_poll, tail.generation, key))
+
+    def remove(self, job_id, task_id):
+        '''Stop following a task'''
+
+        self._tails.pop((job_id, str(task_id)), None)
+
+    def __len__(self):
+        return len(self._tails)
+
+    def __iter__(self):
+        '''Yield (job_id, task_id, line) until no task is followed'''
+
+        with KeepAlivePool(self.connection.transport):
+            while self._heap:
+                due, generation, key = heapq.heappop(self._heap)
+                tail = self._tails.get(key)
+                if tail is None or tail.generation != generation:
+                    continue
+
+                delay = due - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+
+                for line in tail.poll():
+                    yield tail.job_id, tail.task_id, line
+
+                if self._tails.get(key) is tail:
+                    heapq.heappush(
+                        self._heap, (tail.next_poll, generation, key)
+                    )
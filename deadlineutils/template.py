@@ -0,0 +1,167 @@
+'''
+deadlineutils.template
+======================
+Submit thousands of variants of one job, wedges and shot lists::
+
+    job_info, plugin_info = maya.get_job_info(render_path, prefix, 'beauty')
+    template = JobTemplate(job_info, plugin_info,
+                           job_keys=['Name', 'Frames'],
+                           plugin_keys=['Renderer'])
+    jobs = (
+        template.render(
+            {'Name': 'wedge {} {}'.format(renderer, frames),
+             'Frames': frames},
+            {'Renderer': renderer},
+        )
+        for renderer in ('arnold', 'vray')
+        for frames in ('1-100', '101-200')
+    )
+    results = submit_jobs(connection, jobs, batch_size=500)
+
+The shared fields are encoded to JSON once when the template is built. A
+variant only encodes its own fields and is joined with the shared text, no
+job_info or plugin_info dictionary is copied. job_keys and plugin_keys list
+the shared keys variants replace, keys not in the shared dictionaries can be
+added by any variant.
+
+submit_jobs takes jobs from an iterable as batches are sent, so a generator
+of variants is never held in memory as a whole. Batches are posted with
+Jobs.SubmitJobs concurrently. Sending stops at the first request that
+raises, its exception is returned in place of its result.
+'''
+from __future__ import absolute_import
+
+from .workers import imap
+
+try:
+    from Deadline.DeadlineJSON import Encoded, dumps
+except ImportError:
+    from .packages.Deadline.DeadlineJSON import Encoded, dumps
+
+
+def _members(fields):
+    '''JSON text of a dictionary without its braces'''
+
+    return dumps(fields)[1:-1] if fields else ''
+
+
+class JobTemplate(object):
+    '''
+    Job info and plugin info shared by the variants of a job.
+
+    :param job_info: Job info dictionary shared by every variant
+    :param plugin_info: Plugin info dictionary shared by every variant
+    :param job_keys: Keys of job_info set by each variant
+    :param plugin_keys: Keys of plugin_info set by each variant
+    :param aux_files: Auxiliary files submitted with every variant
+    '''
+
+    def __init__(self, job_info, plugin_info, job_keys=(), plugin_keys=(),
+                 aux_files=None):
+        job_keys = frozenset(job_keys)
+        plugin_keys = frozenset(plugin_keys)
+        shared_job = dict(
+            (key, value) for key, value in job_info.items()
+            if key not in job_keys
+        )
+        shared_plugin = dict(
+            (key, value) for key, value in plugin_info.items()
+            if key not in plugin_keys
+        )
+        self._job_keys = frozenset(shared_job)
+        self._plugin_keys = frozenset(shared_plugin)
+        self._job = _members(shared_job)
+        self._plugin = _members(shared_plugin)
+        self._aux = dumps(list(aux_files or []))
+
+    @staticmethod
+    def _join(shared, shared_keys, fields):
+        if not fields:
+            return shared
+        fixed = shared_keys.intersection(fields)
+        if fixed:
+            raise ValueError(
+                'Shared keys not declared as variant keys: {}'.format(
+                    ', '.join(sorted(fixed))
+                )
+            )
+        if not shared:
+            return _members(fields)
+        return shared + ',' + _members(fields)
+
+    def render(self, job_fields=None, plugin_fields=None):
+        '''
+        JSON text of one variant, a job of Jobs.SubmitJobs
+
+        :param job_fields: Job info fields of the variant
+        :param plugin_fields: Plugin info fields of the variant
+        '''
+
+        return Encoded(''.join((
+            '{"JobInfo":{',
+            self._join(self._job, self._job_keys, job_fields),
+            '},"PluginInfo":{',
+            self._join(self._plugin, self._plugin_keys, plugin_fields),
+            '},"AuxFiles":',
+            self._aux,
+            '}',
+        )))
+
+    def stamp(self, variants):
+        '''
+        Generator rendering (job fields, plugin fields) pairs
+
+        :param variants: Iterable of (job fields, plugin fields) tuples
+        '''
+
+        for job_fields, plugin_fields in variants:
+            yield self.render(job_fields, plugin_fields)
+
+
+def _batches(jobs, batch_size):
+    batch = []
+    for job in jobs:
+        batch.append(job)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def submit_jobs(connection, jobs, batch_size=500, max_workers=4):
+    '''
+    Post jobs with Jobs.SubmitJobs, batch_size jobs per request and
+    max_workers requests at a time. Returns the result of every request sent,
+    in order.
+
+    When a request raises, its exception takes the place of its result and
+    no more batches are sent. Requests still running are waited for, so the
+    returned list covers every batch that was sent: the first
+    len(results) * batch_size jobs.
+
+    :param connection: deadlineutils.connection.Connection instance
+    :param jobs: Iterable of job dictionaries or rendered variants
+    :param batch_size: Maximum number of jobs per request
+    :param max_workers: Number of requests sent concurrently
+    '''
+
+    results = {}
+
+    def submit(task):
+        index, batch = task
+        try:
+            results[index] = connection.Jobs.SubmitJobs(batch)
+        except Exception as e:
+            results[index] = e
+            raise
+
+    try:
+        for _ in imap(submit, enumerate(_batches(jobs, batch_size)),
+                      max_workers):
+            pass
+    except Exception as e:
+        # Errors of the jobs iterable are not results of a request
+        if not any(result is e for result in results.values()):
+            raise
+    return [results[index] for index in sorted(results)]
@@ -0,0 +1,73 @@
+'''
+deadlineutils.timeouts
+======================
+Latency budgets shared by every request made inside a block::
+
+    with connection.budget(2.0):
+        pool = connection.get_best_pool('maya')
+
+A budget is an absolute deadline kept per thread. Every request inside the
+block gets the time left as its connect and read timeout, and a request
+starting after the deadline raises BudgetExceeded without being sent. Nested
+budgets can only shorten the deadline. deadlineutils.workers.run carries the
+deadline into its worker threads.
+'''
+from __future__ import absolute_import
+import threading
+import time
+from contextlib import contextmanager
+
+
+_local = threading.local()
+
+
+class BudgetExceeded(Exception):
+    '''Raised for a request starting after the deadline of its budget'''
+
+
+def current():
+    '''Deadline of the current thread, seconds since the epoch, or None'''
+
+    return getattr(_local, 'deadline', None)
+
+
+@contextmanager
+def deadline_at(deadline):
+    '''
+    Run the block with an absolute deadline, unless an earlier one is set
+
+    :param deadline: Seconds since the epoch or None for no deadline
+    '''
+
+    previous = current()
+    if deadline is not None and (previous is None or deadline < previous):
+        _local.deadline = deadline
+    try:
+        yield
+    finally:
+        _local.deadline = previous
+
+
+def budget(seconds):
+    '''
+    Run the block with a deadline seconds from now
+
+    :param seconds: Latency budget of the block
+    '''
+
+    return deadline_at(time.time() + seconds)
+
+
+def remaining():
+    '''
+    Seconds left until the current deadline, None without a budget. Raises
+    BudgetExceeded when the deadline passed.
+    '''
+
+    deadline = current()
+    if deadline is None:
+        return None
+    left = deadline - time.time()
+    if left <= 0:
+        raise BudgetExceeded('Latency budget exceeded')
+    return left
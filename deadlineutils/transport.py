@@ -0,0 +1,132 @@
+'''
+deadlineutils.transport
+=======================
+Transport stands in for the ConnectionProperty shared by the DeadlineCon
+request groups, so every Web Service request made through a Connection passes
+through one place.
+
+Interceptors are callables pushed onto a Transport::
+
+    def interceptor(method, command, body, send):
+        return send(method, command, body)
+
+    connection.transport.push(interceptor)
+
+They may inspect, change, answer or hold back a request. send passes the
+request on to the next interceptor and finally to the ConnectionProperty.
+Interceptors pushed with innermost=True always come after the others, so they
+see requests as they are sent to the Web Service.
+'''
+from __future__ import absolute_import
+
+from .timeouts import remaining
+
+
+class Transport(object):
+    '''
+    Routes requests through a stack of interceptors before handing them to
+    the wrapped ConnectionProperty.
+
+    :param connection_property: Deadline.ConnectionProperty instance
+    '''
+
+    def __init__(self, connection_property):
+        self.connection_property = connection_property
+        self.interceptors = []
+        self.innermost = []
+
+    @classmethod
+    def install(cls, connection):
+        '''
+        Replace the ConnectionProperty of a DeadlineCon and all of its
+        request groups with a Transport. Returns the Transport.
+
+        :param connection: Deadline.DeadlineConnect.DeadlineCon instance
+        '''
+
+        connection_property = connection.connectionProperties
+        transport = cls(connection_property)
+        connection.connectionProperties = transport
+        for group in vars(connection).values():
+            current = getattr(group, 'connectionProperties', None)
+            if current is connection_property:
+                group.connectionProperties = transport
+        return transport
+
+    def __getattr__(self, attr):
+        # GetAddress, SetAuthentication, ... of the ConnectionProperty
+        return getattr(self.connection_property, attr)
+
+    def push(self, interceptor, innermost=False):
+        '''
+        Add an interceptor, it sees requests after those pushed earlier
+
+        :param interceptor: Callable taking method, command, body and send
+        :param innermost: Place the interceptor after all interceptors pushed
+            without innermost, right before the ConnectionProperty
+        '''
+
+        if innermost:
+            self.innermost.append(interceptor)
+        else:
+            self.interceptors.append(interceptor)
+
+    def remove(self, interceptor):
+        '''Remove an interceptor'''
+
+        if interceptor in self.innermost:
+            self.innermost.remove(interceptor)
+        else:
+            self.interceptors.remove(interceptor)
+
+    def send(self, method, command, body=None):
+        '''
+        Send a request through the interceptors
+
+        :param method: GET, PUT, POST or DELETE
+        :param command: Web Service url path and query, /api/jobs?JobID=...
+        :param body: Request body for PUT and POST
+        '''
+
+        return self._call(
+            self.interceptors + self.innermost, method, command, body
+        )
+
+    def _call(self, interceptors, method, command, body):
+        if not interceptors:
+            return self._send(method, command, body)
+
+        def send(method, command, body=None):
+            return self._call(interceptors[1:], method, command, body)
+
+        return interceptors[0](method, command, body, send)
+
+    def _send(self, method, command, body):
+        connection_property = self.connection_property
+        args = (command,) if method in ('GET', 'DELETE') else (command, body)
+        # The time left of a latency budget limits the request's timeouts
+        timeout = remaining()
+        if timeout is not None:
+            args += (timeout,)
+
+        if method == 'GET':
+            return connection_property.__get__(*args)
+        if method == 'DELETE':
+            return connection_property.__delete__(*args)
+        if method == 'PUT':
+            return connection_property.__put__(*args)
+        if method == 'POST':
+            return connection_property.__post__(*args)
+        raise ValueError('Unsupported request method: {}'.format(method))
+
+    def __get__(self, commandString):
+        return self.send('GET', commandString)
+
+    def __put__(self, commandString, body):
+        return self.send('PUT', commandString, body)
+
+    def __delete__(self, commandString):
+        return self.send('DELETE', commandString)
+
+    def __post__(self, commandString, body):
+        return self.send('POST', commandString, body)
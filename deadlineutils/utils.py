@@ -0,0 +1,90 @@
+'''
+deadlineutils.utils
+===================
+Small helpers shared by the deadlineutils modules
+'''
+from __future__ import absolute_import
+import datetime
+import os
+import re
+
+try:
+    string_types = basestring
+except NameError:
+    string_types = str
+
+
+_DATE = re.compile(
+    r'(\d{4})-(\d\d)-(\d\d)T(\d\d):(\d\d):(\d\d)(?:\.(\d+))?'
+    r'(Z|[+-]\d\d:?\d\d)?'
+)
+
+
+def data_path(*parts):
+    '''
+    Get a path inside the local deadlineutils data directory. The directory
+    defaults to ~/.deadlineutils and can be moved by setting the
+    DEADLINEUTILS_DATA environment variable. Missing parent directories are
+    created.
+
+    :param parts: Path components relative to the data directory
+    '''
+
+    root = os.environ.get(
+        'DEADLINEUTILS_DATA',
+        os.path.join(os.path.expanduser('~'), '.deadlineutils')
+    )
+    path = os.path.join(root, *parts)
+
+    parent = os.path.dirname(path)
+    if not os.path.isdir(parent):
+        try:
+            os.makedirs(parent)
+        except OSError:
+            if not os.path.isdir(parent):
+                raise
+
+    return path
+
+
+def atomic_write(path, data):
+    '''
+    Write data to path through a temporary file so readers never see a
+    partially written file.
+
+    :param path: Destination file path
+    :param data: File contents
+    '''
+
+    tmp_path = '{}.{}.tmp'.format(path, os.getpid())
+    with open(tmp_path, 'w') as f:
+        f.write(data)
+
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # Windows refuses to rename over an existing file
+        os.remove(path)
+        os.rename(tmp_path, path)
+
+
+def parse_date(value):
+    '''Parse a Web Service date string to seconds since the epoch'''
+
+    match = _DATE.match(value or '')
+    if not match:
+        return None
+
+    parts = match.groups()
+    date = datetime.datetime(*[int(part) for part in parts[:6]])
+    seconds = (date - datetime.datetime(1970, 1, 1)).total_seconds()
+    if parts[6]:
+        seconds += float('0.' + parts[6])
+
+    offset = parts[7]
+    if offset and offset != 'Z':
+        offset = offset.replace(':', '')
+        minutes = int(offset[1:3]) * 60 + int(offset[3:5])
+        seconds -= minutes * 60 if offset[0] == '+' else -minutes * 60
+
+    return seconds
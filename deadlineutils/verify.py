@@ -0,0 +1,279 @@
+'''
+deadlineutils.verify
+====================
+Check that the output frames of a job exist on disk and requeue the tasks of
+missing or truncated frames::
+
+    verifier = OutputVerifier(connection, min_size=1024)
+    result = verifier.verify(connection.Jobs.GetJob(job_id))
+    print(result['missing'], result['small'], result['task_ids'])
+
+The output paths come from OutputDirectoryN and OutputFilenameN of a job info
+dictionary, as built by nuke.get_job_info and maya.get_job_info, or from OutDir
+and OutFile of a job returned by the Web Service. Runs of # and printf style
+%04d in the filename are the frame number padding.
+
+Every output directory is listed once with os.scandir, directories are
+scanned concurrently. Frames are matched from the file names, so missing
+frames are never stat'ed one by one and sequences of any length cost one
+listing. Sizes are only read when a size threshold is set. On Windows scandir
+returns them with the listing, elsewhere present files are stat'ed
+concurrently.
+
+Missing frames are mapped to task ids by their position in the render order
+of the job's frame list and its ChunkSize, and requeued with a single
+Tasks.RequeueJobTasks request. Outputs whose directory can not be listed,
+for example an unmounted share, are reported in unreadable and skipped.
+'''
+from __future__ import absolute_import
+import os
+import re
+import sys
+
+from .frames import FrameSet, render_order
+from .workers import run
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+
+_PADDING = re.compile(r'(#+)|%(0?\d*)d')
+
+
+def operating_system():
+    '''Deadline name of the local operating system'''
+
+    if sys.platform.startswith('win'):
+        return 'Windows'
+    if sys.platform == 'darwin':
+        return 'Mac'
+    return 'Linux'
+
+
+def frame_pattern(filename):
+    '''
+    Compile an output filename to a regular expression matching its frames.
+    Returns (regex, padding), the frame number is group 1::
+
+        >>> regex, padding = frame_pattern('comp.####.exr')
+        >>> int(regex.match('comp.0012.exr').group(1)), padding
+        (12, 4)
+    '''
+
+    match = _PADDING.search(filename)
+    if match is None:
+        raise ValueError('No frame padding in {!r}'.format(filename))
+
+    if match.group(1):
+        padding = len(match.group(1))
+    else:
+        padding = int(match.group(2) or 1)
+
+    pattern = '^{}(-?\\d+){}$'.format(
+        re.escape(filename[:match.start()]),
+        re.escape(filename[match.end():]),
+    )
+    flags = re.IGNORECASE if operating_system() == 'Windows' else 0
+    return re.compile(pattern, flags), padding
+
+
+def _outputs(job):
+    '''(directory, filename) pairs of a job info or Web Service job'''
+
+    outputs = []
+    if 'OutDir' in job or 'OutFile' in job:
+        directories = job.get('OutDir') or []
+        filenames = job.get('OutFile') or []
+        outputs = list(zip(directories, filenames))
+    else:
+        index = 0
+        while 'OutputDirectory{}'.format(index) in job:
+            outputs.append((
+                job['OutputDirectory{}'.format(index)],
+                job.get('OutputFilename{}'.format(index)),
+            ))
+            index += 1
+    return [
+        (directory, filename) for directory, filename in outputs
+        if directory and filename
+    ]
+
+
+def _frames_and_chunk_size(job):
+    '''(frame list, FrameSet, ChunkSize) of a job'''
+
+    props = job.get('Props', {})
+    frames = job.get('Frames', props.get('Frames')) or ''
+    chunk_size = job.get('ChunkSize', props.get('Chunk', 1))
+    return frames, FrameSet(frames), int(chunk_size or 1)
+
+
+def _scan(directory):
+    '''
+    Entries of a directory as (name, entry). Returns the OSError when the
+    directory can not be listed.
+    '''
+
+    try:
+        if scandir is not None:
+            return [(entry.name, entry) for entry in scandir(directory)]
+        return [(name, None) for name in os.listdir(directory)]
+    except OSError as e:
+        return e
+
+
+def _size(directory, name, entry):
+    try:
+        if entry is not None:
+            return entry.stat().st_size
+        return os.stat(os.path.join(directory, name)).st_size
+    except OSError:
+        return 0
+
+
+class OutputVerifier(object):
+    '''
+    Finds missing and truncated output frames of jobs.
+
+    :param connection: deadlineutils.connection.Connection instance, used to
+        requeue tasks
+    :param min_size: Frames smaller than min_size bytes count as missing
+    :param min_ratio: Frames smaller than min_ratio times the median frame
+        size of their output count as missing
+    :param max_workers: Number of directories scanned and files stat'ed
+        concurrently
+    :param path_mapper: deadlineutils.pathmap.PathMapper mapping output
+        directories to the local operating system
+    '''
+
+    def __init__(self, connection=None, min_size=None, min_ratio=None,
+                 max_workers=8, path_mapper=None):
+        self.connection = connection
+        self.min_size = min_size
+        self.min_ratio = min_ratio
+        self.max_workers = max_workers
+        self.path_mapper = path_mapper
+
+    def _directory(self, directory):
+        if self.path_mapper is not None:
+            directory = self.path_mapper.map_path(
+                directory, operating_system()
+            )
+        return directory
+
+    def _sizes(self, directory, entries):
+        '''Sizes of (frame, name, entry) items, stat'ed concurrently'''
+
+        chunk_count = max(1, min(self.max_workers, len(entries)))
+        chunks = [entries[i::chunk_count] for i in range(chunk_count)]
+        results = run(
+            lambda chunk: [
+                (frame, _size(directory, name, entry))
+                for frame, name, entry in chunk
+            ],
+            chunks,
+            self.max_workers,
+        )
+        return dict(item for result in results for item in result)
+
+    def _check(self, frames, directory, filename, entries):
+        '''FrameSets of present and too small frames of one output'''
+
+        regex, padding = frame_pattern(filename)
+        found = []
+        for name, entry in entries:
+            match = regex.match(name)
+            if match is None:
+                continue
+            text = match.group(1)
+            frame = int(text)
+            if '{:0{}d}'.format(frame, padding) == text:
+                found.append((frame, name, entry))
+
+        present = FrameSet(frame for frame, _, _ in found) & frames
+        if self.min_size is None and self.min_ratio is None:
+            return present, FrameSet()
+
+        found = [item for item in found if item[0] in present]
+        sizes = self._sizes(directory, found)
+        threshold = self.min_size or 0
+        if self.min_ratio is not None and sizes:
+            ordered = sorted(sizes.values())
+            threshold = max(
+                threshold, self.min_ratio * ordered[len(ordered) // 2]
+            )
+        small = FrameSet(
+            frame for frame, size in sizes.items() if size < threshold
+        )
+        return present, small
+
+    def verify(self, job, requeue=True, job_id=None):
+        '''
+        Verify the output frames of a job. Returns a dictionary with the
+        number of expected frames, the missing and small frames as FrameSets,
+        the output directories that could not be listed mapped to their
+        OSError, the sorted task ids holding missing and small frames and the
+        RequeueJobTasks result. Outputs whose directory can not be listed are
+        skipped, their frames are not reported missing.
+
+        :param job: Job info dictionary or job returned by the Web Service
+        :param requeue: Requeue the tasks of missing and small frames
+        :param job_id: The Job ID, defaults to the job's _id
+        '''
+
+        frame_list, frames, chunk_size = _frames_and_chunk_size(job)
+        outputs = [
+            (self._directory(directory), filename)
+            for directory, filename in _outputs(job)
+        ]
+        if not outputs:
+            raise ValueError('Job has no output directory and filename')
+
+        directories = sorted(set(directory for directory, _ in outputs))
+        listings = dict(zip(
+            directories, run(_scan, directories, self.max_workers)
+        ))
+
+        missing = FrameSet()
+        small = FrameSet()
+        unreadable = {}
+        for directory, filename in outputs:
+            listing = listings[directory]
+            if isinstance(listing, OSError):
+                # An unmounted share or a wrong path mapping, not missing
+                # frames
+                unreadable[directory] = listing
+                continue
+            present, output_small = self._check(
+                frames, directory, filename, listing
+            )
+            missing = missing | (frames - present)
+            small = small | output_small
+
+        requeue_frames = missing | small
+        task_ids = sorted(set(
+            position // chunk_size
+            for position, frame in enumerate(render_order(frame_list))
+            if frame in requeue_frames
+        )) if requeue_frames else []
+
+        result = {
+            'expected': len(frames),
+            'missing': missing,
+            'small': small,
+            'unreadable': unreadable,
+            'task_ids': task_ids,
+            'requeued': None,
+        }
+
+        job_id = job_id or job.get('_id')
+        if requeue and task_ids and job_id and self.connection is not None:
+            result['requeued'] = self.connection.Tasks.RequeueJobTasks(
+                job_id, task_ids
+            )
+        return result
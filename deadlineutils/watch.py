@@ -0,0 +1,366 @@
+'''
+deadlineutils.watch
+===================
+Submit job info and plugin info file pairs dropped into a directory::
+
+    python -m deadlineutils.watch /spool --address webservice --port 8082
+
+or from Python::
+
+    WatchFolder(connection, '/spool').run()
+
+A pair is shot_010.job and shot_010.plugin, see job_suffix and plugin_suffix.
+A file counts as written once its size and modification time stayed the same
+for settle seconds, so files still being copied are left alone. Files with
+other suffixes, like shot_010.job.tmp renamed into place, are ignored.
+
+Ready pairs are read concurrently and posted with Jobs.SubmitJobs, batch_size
+jobs per request. Submitted pairs are renamed into the submitted directory,
+pairs that can not be read or that the Web Service rejects into the failed
+directory next to a .error file holding the reason. When the Web Service can
+not be reached, times out or fails with a 5xx error the pairs stay and are
+tried again. A pair whose request timed out may have been submitted already,
+check the farm for duplicates after long outages.
+
+On Linux the directory is watched with inotify, elsewhere it is listed every
+poll_interval seconds.
+'''
+from __future__ import absolute_import, print_function
+import argparse
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import socket
+import sys
+import threading
+import time
+
+from .infofiles import read_info_file
+from .spool import is_server_error, is_unreachable, submitted
+from .workers import run
+
+try:
+    from urllib2 import URLError
+except ImportError:
+    from urllib.error import URLError
+
+
+# inotify_init1 flags and the events signalling new or finished files
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+
+
+class _Inotify(object):
+    '''Waits for files created, closed or moved into a directory'''
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        path = os.path.abspath(directory)
+        if not isinstance(path, bytes):
+            path = path.encode(sys.getfilesystemencoding())
+        mask = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        if libc.inotify_add_watch(self.fd, path, mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, 'inotify_add_watch failed')
+
+    def wait(self, timeout):
+        '''Wait up to timeout seconds for events, True when there were any'''
+
+        try:
+            readable, _, _ = select.select([self.fd], [], [], timeout)
+        except (OSError, select.error) as e:
+            if e.args[0] == errno.EINTR:
+                return False
+            raise
+        if not readable:
+            return False
+        while True:
+            try:
+                if not os.read(self.fd, 65536):
+                    break
+            except OSError as e:
+                if e.errno == errno.EAGAIN:
+                    break
+                raise
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _Poll(object):
+    '''Stands in for _Inotify where it is not available'''
+
+    def __init__(self, stop):
+        self.stop = stop
+
+    def wait(self, timeout):
+        self.stop.wait(timeout)
+        return True
+
+    def close(self):
+        pass
+
+
+def _is_timeout(exc):
+    return isinstance(exc, socket.timeout) or (
+        isinstance(exc, URLError) and
+        isinstance(getattr(exc, 'reason', None), socket.timeout)
+    )
+
+
+def _move(path, directory):
+    target = os.path.join(directory, os.path.basename(path))
+    try:
+        os.rename(path, target)
+    except OSError:
+        # Windows refuses to rename over an existing file
+        if not os.path.exists(target):
+            raise
+        os.remove(target)
+        os.rename(path, target)
+    return target
+
+
+class WatchFolder(object):
+    '''
+    Watches a directory for info file pairs and submits them in batches.
+
+    :param connection: deadlineutils.connection.Connection instance
+    :param directory: Directory the info files are dropped into
+    :param submitted_dir: Directory submitted pairs are moved to, defaults
+        to the submitted subdirectory
+    :param failed_dir: Directory rejected pairs are moved to, defaults to the
+        failed subdirectory
+    :param job_suffix: File name ending of job info files
+    :param plugin_suffix: File name ending of plugin info files
+    :param settle: Seconds a file must stay unchanged before it is read
+    :param batch_size: Maximum number of jobs per Jobs.SubmitJobs request
+    :param poll_interval: Seconds between listings without inotify
+    :param rescan_interval: Seconds between listings with inotify, in case
+        events were lost
+    :param use_inotify: Use inotify when available
+    :param max_workers: Number of info files read concurrently
+    '''
+
+    def __init__(self, connection, directory, submitted_dir=None,
+                 failed_dir=None, job_suffix='.job', plugin_suffix='.plugin',
+                 settle=2.0, batch_size=100, poll_interval=1.0,
+                 rescan_interval=30.0, use_inotify=True, max_workers=8):
+        self.connection = connection
+        self.directory = directory
+        self.submitted_dir = submitted_dir or os.path.join(
+            directory, 'submitted'
+        )
+        self.failed_dir = failed_dir or os.path.join(directory, 'failed')
+        self.job_suffix = job_suffix
+        self.plugin_suffix = plugin_suffix
+        self.settle = settle
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.use_inotify = use_inotify
+        self.max_workers = max_workers
+        self.submitted = 0
+        self.failed = 0
+        self._seen = {}
+        self._stop = threading.Event()
+        for path in (self.submitted_dir, self.failed_dir):
+            if not os.path.isdir(path):
+                os.makedirs(path)
+
+    def _stem(self, name):
+        if name.startswith('.'):
+            return None, None
+        for suffix, kind in ((self.job_suffix, 'job'),
+                             (self.plugin_suffix, 'plugin')):
+            if name.endswith(suffix):
+                return name[:-len(suffix)], kind
+        return None, None
+
+    def ready_pairs(self, now=None):
+        '''
+        Sorted (job info path, plugin info path) pairs whose files are both
+        completely written. Returns (pairs, seconds until the next file
+        settles or None).
+        '''
+
+        now = time.time() if now is None else now
+        files = {}
+        seen = {}
+        next_settle = None
+        for name in os.listdir(self.directory):
+            stem, kind = self._stem(name)
+            if stem is None:
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature = (stat.st_size, stat.st_mtime)
+            previous = self._seen.get(path)
+            since = previous[1] if previous and previous[0] == signature \
+                else now
+            seen[path] = (signature, since)
+            wait = since + self.settle - now
+            if wait > 0:
+                next_settle = wait if next_settle is None \
+                    else min(next_settle, wait)
+                continue
+            files.setdefault(stem, {})[kind] = path
+        self._seen = seen
+
+        pairs = sorted(
+            (paths['job'], paths['plugin']) for paths in files.values()
+            if len(paths) == 2
+        )
+        return pairs, next_settle
+
+    def _fail(self, pair, reason):
+        for path in pair:
+            _move(path, self.failed_dir)
+        error_path = os.path.join(
+            self.failed_dir, os.path.basename(pair[0]) + '.error'
+        )
+        with open(error_path, 'w') as f:
+            f.write('{}\n'.format(reason))
+        self.failed += 1
+
+    def _read(self, pair):
+        try:
+            return {
+                'JobInfo': read_info_file(pair[0]),
+                'PluginInfo': read_info_file(pair[1]),
+                'AuxFiles': [],
+            }
+        except (IOError, OSError, ValueError) as e:
+            return e
+
+    def _submit(self, pairs, jobs):
+        '''
+        Post one batch. A rejected batch is posted again job by job so one
+        bad job does not fail the others. Returns False when the Web Service
+        failed with a 5xx error, the remaining pairs are left in place.
+        '''
+
+        result = self.connection.Jobs.SubmitJobs(jobs)
+        if submitted(result):
+            for pair in pairs:
+                for path in pair:
+                    _move(path, self.submitted_dir)
+            self.submitted += len(pairs)
+            return True
+
+        if is_server_error(result):
+            return False
+        if len(jobs) == 1:
+            self._fail(pairs[0], result)
+            return True
+        for pair, job in zip(pairs, jobs):
+            if not self._submit([pair], [job]):
+                return False
+        return True
+
+    def process(self):
+        '''
+        Submit the ready pairs once. Returns seconds until the next file
+        settles or None.
+        '''
+
+        pairs, next_settle = self.ready_pairs()
+        jobs = run(self._read, pairs, self.max_workers)
+
+        readable = []
+        for pair, job in zip(pairs, jobs):
+            if isinstance(job, Exception):
+                self._fail(pair, job)
+            else:
+                readable.append((pair, job))
+
+        for start in range(0, len(readable), self.batch_size):
+            batch = readable[start:start + self.batch_size]
+            try:
+                done = self._submit([pair for pair, _ in batch],
+                                    [job for _, job in batch])
+            except Exception as e:
+                if not is_unreachable(e) and not _is_timeout(e):
+                    raise
+                done = False
+            if not done:
+                # Tried again on the next pass
+                return self.poll_interval
+        return next_settle
+
+    def run(self):
+        '''Submit pairs as they are dropped into the directory until stop'''
+
+        watcher = None
+        if self.use_inotify and sys.platform.startswith('linux'):
+            try:
+                watcher = _Inotify(self.directory)
+            except (OSError, AttributeError):
+                watcher = None
+        interval = self.rescan_interval
+        if watcher is None:
+            watcher = _Poll(self._stop)
+            interval = self.poll_interval
+
+        try:
+            while not self._stop.is_set():
+                next_settle = self.process()
+                timeout = interval if next_settle is None \
+                    else min(interval, next_settle)
+                watcher.wait(timeout)
+        finally:
+            watcher.close()
+
+    def stop(self):
+        '''Make run return after the current pass'''
+
+        self._stop.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Submit Deadline info file pairs dropped into a directory'
+    )
+    parser.add_argument('directory')
+    parser.add_argument('--address', default='localhost',
+                        help='Web Service host')
+    parser.add_argument('--port', type=int, default=8082)
+    parser.add_argument('--job-suffix', default='.job')
+    parser.add_argument('--plugin-suffix', default='.plugin')
+    parser.add_argument('--settle', type=float, default=2.0)
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--poll-interval', type=float, default=1.0)
+    parser.add_argument('--poll', action='store_true',
+                        help='List the directory instead of using inotify')
+    args = parser.parse_args(argv)
+
+    from .connection import Connection
+
+    watch = WatchFolder(
+        Connection(args.address, args.port), args.directory,
+        job_suffix=args.job_suffix, plugin_suffix=args.plugin_suffix,
+        settle=args.settle, batch_size=args.batch_size,
+        poll_interval=args.poll_interval, use_inotify=not args.poll,
+    )
+    print('Watching {}'.format(os.path.abspath(args.directory)))
+    try:
+        watch.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
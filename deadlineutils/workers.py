@@ -0,0 +1,220 @@
+'''
+deadlineutils.workers
+=====================
+Thread helpers used to send Web Service requests concurrently. Worker
+threads know the calling code that handed them their items, see
+submitted_from.
+'''
+from __future__ import absolute_import
+import sys
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from .timeouts import current, deadline_at
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+
+_local = threading.local()
+
+
+def submitted_from():
+    '''
+    Stack of the code that handed the current thread its work through run
+    or imap, outermost first, as (filename, line number, function name)
+    tuples. Empty outside worker threads.
+    '''
+
+    return getattr(_local, 'stack', ())
+
+
+def _submitter_stack():
+    '''Stack of the code calling run or imap, including its submitters'''
+
+    frames = []
+    frame = sys._getframe(2)
+    while frame is not None:
+        frames.append(
+            (frame.f_code.co_filename, frame.f_lineno, frame.f_code.co_name)
+        )
+        frame = frame.f_back
+    return submitted_from() + tuple(reversed(frames))
+
+
+@contextmanager
+def _submitted(stack):
+    previous = submitted_from()
+    _local.stack = stack
+    try:
+        yield
+    finally:
+        _local.stack = previous
+
+
+def run(func, items, max_workers=8):
+    '''
+    Call func on every item using up to max_workers threads. Returns the
+    results in the order of items. When func raises, the remaining items are
+    still processed and the first exception is raised afterwards. Workers
+    share the latency budget and submitting stack of the calling thread.
+
+    :param func: Callable taking a single item
+    :param items: Iterable of items
+    :param max_workers: Maximum number of threads
+    '''
+
+    items = list(items)
+    results = [None] * len(items)
+    errors = []
+
+    if len(items) <= 1 or max_workers <= 1:
+        for index, item in enumerate(items):
+            results[index] = func(item)
+        return results
+
+    work = queue.Queue()
+    for index, item in enumerate(items):
+        work.put((index, item))
+    deadline = current()
+    stack = _submitter_stack()
+
+    def worker():
+        while True:
+            try:
+                index, item = work.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                with deadline_at(deadline), _submitted(stack):
+                    results[index] = func(item)
+            except Exception as e:
+                errors.append(e)
+
+    threads = [
+        threading.Thread(target=worker)
+        for _ in range(min(max_workers, len(items)))
+    ]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+    return results
+
+
+class _Slot(object):
+    '''Result of one item of imap'''
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error = None
+        self.result = None
+
+
+def imap(func, items, max_workers=8):
+    '''
+    Call func on every item using up to max_workers threads and yield the
+    results in the order of items. Items are taken from the iterable as
+    results are consumed, at most twice max_workers ahead, so items can be
+    generated lazily. Workers share the latency budget and submitting stack
+    of the calling thread.
+
+    When func raises, no more items are taken and queued items are skipped.
+    The exception is raised when its result is reached, after the calls
+    still running returned, so func is not called once it was raised.
+
+    :param func: Callable taking a single item
+    :param items: Iterable of items
+    :param max_workers: Maximum number of threads
+    '''
+
+    work = queue.Queue()
+    pending = deque()
+    deadline = current()
+    stack = _submitter_stack()
+    failed = threading.Event()
+
+    def worker():
+        while True:
+            task = work.get()
+            if task is None:
+                return
+            item, slot = task
+            if not failed.is_set():
+                try:
+                    with deadline_at(deadline), _submitted(stack):
+                        slot.result = func(item)
+                except Exception as e:
+                    slot.error = e
+                    failed.set()
+            slot.done.set()
+
+    def pop():
+        slot = pending.popleft()
+        slot.done.wait()
+        if slot.error is not None:
+            for other in pending:
+                other.done.wait()
+            raise slot.error
+        return slot.result
+
+    threads = []
+    try:
+        for item in items:
+            if len(threads) < max_workers:
+                thread = threading.Thread(target=worker)
+                thread.daemon = True
+                thread.start()
+                threads.append(thread)
+            slot = _Slot()
+            pending.append(slot)
+            work.put((item, slot))
+            while pending and (len(pending) >= 2 * max_workers
+                               or pending[0].done.is_set()):
+                yield pop()
+            if failed.is_set():
+                break
+        while pending:
+            yield pop()
+    finally:
+        for _ in threads:
+            work.put(None)
+
+
+class Slots(object):
+    '''
+    Caps the number of Web Service requests in flight. Push it onto a
+    Transport to share one limit between every thread using a connection::
+
+        slots = Slots(16)
+        connection.transport.push(slots)
+
+    It can also guard any block of code with ``with slots:``. Not to be
+    confused with deadlineutils.timeouts.budget, which bounds time.
+
+    :param limit: Maximum number of concurrent requests
+    '''
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit)
+
+    def __enter__(self):
+        self._semaphore.acquire()
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self._semaphore.release()
+        return False
+
+    def __call__(self, method, command, body, send):
+        with self:
+            return send(method, command, body)
@@ -0,0 +1,114 @@
+from __future__ import absolute_import
+import socket
+import unittest
+
+from deadlineutils.balance import LoadBalancer
+from deadlineutils.packages.Deadline.DeadlineSend import ErrorData
+
+
+class FakeConnectionProperty(object):
+    '''Answers requests with the behaviour set for its address'''
+
+    behaviour = {}
+    calls = []
+
+    def __init__(self, address):
+        self.address = address
+        self.useAuth = False
+        self.user = ''
+        self.password = ''
+        self.timeout = None
+
+    def GetAddress(self):
+        return self.address
+
+    def _answer(self, method, command):
+        self.calls.append((self.address, method))
+        answer = self.behaviour.get(self.address, 'ok')
+        if isinstance(answer, Exception):
+            raise answer
+        if answer == 'busy':
+            return ErrorData('Internal server error', 503)
+        return '{} from {}'.format(command, self.address)
+
+    def __get__(self, commandString, timeout=None):
+        return self._answer('GET', commandString)
+
+    def __put__(self, commandString, body, timeout=None):
+        return self._answer('PUT', commandString)
+
+
+class TestLoadBalancer(unittest.TestCase):
+
+    def setUp(self):
+        FakeConnectionProperty.behaviour = {}
+        FakeConnectionProperty.calls = []
+        self.balancer = LoadBalancer(
+            FakeConnectionProperty('a:8082'), ['a:8082', 'b:8082'],
+            max_failures=2,
+        )
+
+    def endpoint(self, address):
+        for endpoint in self.balancer.endpoints:
+            if endpoint.address == address:
+                return endpoint
+
+    def test_server_errors_on_get_try_the_next_endpoint(self):
+        FakeConnectionProperty.behaviour['a:8082'] = 'busy'
+        for _ in range(4):
+            self.assertEqual(self.balancer.__get__('/api/pools'),
+                             '/api/pools from b:8082')
+        self.assertEqual(self.endpoint('a:8082').failures, 1)
+        self.assertGreater(self.endpoint('a:8082').ejected_until, 0)
+
+    def test_server_error_returned_when_every_endpoint_fails(self):
+        FakeConnectionProperty.behaviour = {'a:8082': 'busy',
+                                            'b:8082': 'busy'}
+        result = self.balancer.__get__('/api/pools')
+        self.assertEqual(result.status, 503)
+        self.assertEqual(len(FakeConnectionProperty.calls), 2)
+
+    def test_writes_are_not_sent_twice(self):
+        FakeConnectionProperty.behaviour = {'a:8082': 'busy',
+                                            'b:8082': 'busy'}
+        self.assertEqual(self.balancer.__put__('/api/jobs', '{}').status, 503)
+        self.assertEqual(len(FakeConnectionProperty.calls), 1)
+
+        FakeConnectionProperty.calls = []
+        FakeConnectionProperty.behaviour = {
+            'a:8082': socket.timeout('timed out'),
+            'b:8082': socket.timeout('timed out'),
+        }
+        self.assertRaises(socket.timeout, self.balancer.__put__,
+                          '/api/jobs', '{}')
+        self.assertEqual(len(FakeConnectionProperty.calls), 1)
+
+    def test_unreachable_writes_try_the_next_endpoint(self):
+        FakeConnectionProperty.behaviour['a:8082'] = socket.error(
+            111, 'Connection refused'
+        )
+        FakeConnectionProperty.behaviour['b:8082'] = socket.error(
+            111, 'Connection refused'
+        )
+        self.assertRaises(socket.error, self.balancer.__put__,
+                          '/api/jobs', '{}')
+        self.assertEqual(len(FakeConnectionProperty.calls), 2)
+
+        del FakeConnectionProperty.behaviour['b:8082']
+        self.assertEqual(self.balancer.__put__('/api/jobs', '{}'),
+                         '/api/jobs from b:8082')
+
+    def test_set_addresses_keeps_health(self):
+        endpoint = self.endpoint('a:8082')
+        endpoint.failures = 1
+        self.balancer.set_addresses(['a:8082', 'c:8082'])
+        self.assertIs(self.endpoint('a:8082'), endpoint)
+        self.assertEqual(
+            [endpoint.address for endpoint in self.balancer.endpoints],
+            ['a:8082', 'c:8082']
+        )
+        self.assertRaises(ValueError, self.balancer.set_addresses, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+from __future__ import absolute_import
+import json
+import unittest
+
+from deadlineutils.batch import Batch
+
+
+class FakeTransport(object):
+
+    def __init__(self):
+        self.sent = []
+
+    def push(self, interceptor):
+        pass
+
+    def remove(self, interceptor):
+        pass
+
+    def send(self, method, command, body=None):
+        self.sent.append((method, command, json.loads(body)))
+        return 'Success'
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = FakeTransport()
+        self.batch = Batch(self.transport, max_workers=1)
+
+    def put(self, route, command, job_id, tasks=None):
+        data = {'Command': command, 'JobID': job_id}
+        if tasks is not None:
+            data['TaskList'] = tasks
+        return self.batch(
+            'PUT', route, json.dumps(data), self.transport.send
+        )
+
+    def sent(self):
+        return [
+            (command, data['Command'], data['JobID'], data.get('TaskList'))
+            for _, command, data in self.transport.sent
+        ]
+
+    def test_merges_task_commands(self):
+        for task in (3, 1, 2):
+            self.assertIsNone(self.put('/api/tasks', 'requeue', 'a', [task]))
+        self.put('/api/tasks', 'requeue', 'b', [0])
+        self.assertEqual(len(self.batch), 2)
+        self.batch.flush()
+        self.assertEqual(self.sent(), [
+            ('/api/tasks', 'requeue', 'a', [1, 2, 3]),
+            ('/api/tasks', 'requeue', 'b', [0]),
+        ])
+        self.assertEqual(len(self.batch.results), 2)
+
+    def test_keeps_order_of_conflicting_commands(self):
+        self.put('/api/tasks', 'suspend', 'a', [1])
+        self.put('/api/tasks', 'resume', 'a', [1])
+        self.put('/api/tasks', 'suspend', 'a', [1, 2])
+        self.batch.flush()
+        self.assertEqual(self.sent(), [
+            ('/api/tasks', 'suspend', 'a', [1]),
+            ('/api/tasks', 'resume', 'a', [1]),
+            ('/api/tasks', 'suspend', 'a', [1, 2]),
+        ])
+
+    def test_merges_across_unrelated_tasks(self):
+        self.put('/api/tasks', 'suspend', 'a', [1])
+        self.put('/api/tasks', 'resume', 'a', [5])
+        self.put('/api/tasks', 'suspend', 'a', [2])
+        self.batch.flush()
+        self.assertEqual(self.sent(), [
+            ('/api/tasks', 'suspend', 'a', [1, 2]),
+            ('/api/tasks', 'resume', 'a', [5]),
+        ])
+
+    def test_job_command_conflicts_with_task_commands(self):
+        self.put('/api/tasks', 'requeue', 'a', [1])
+        self.put('/api/jobs', 'suspend', 'a')
+        self.put('/api/tasks', 'requeue', 'a', [2])
+        self.put('/api/jobs', 'suspend', 'a')
+        self.batch.flush()
+        self.assertEqual(self.sent(), [
+            ('/api/tasks', 'requeue', 'a', [1]),
+            ('/api/jobs', 'suspend', 'a', None),
+            ('/api/tasks', 'requeue', 'a', [2]),
+            ('/api/jobs', 'suspend', 'a', None),
+        ])
+
+    def test_all_tasks_command_absorbs_task_list(self):
+        self.put('/api/tasks', 'requeue', 'a', [1])
+        self.put('/api/tasks', 'requeue', 'a')
+        self.put('/api/tasks', 'requeue', 'a', [2])
+        self.batch.flush()
+        self.assertEqual(self.sent(), [('/api/tasks', 'requeue', 'a', None)])
+
+    def test_passes_other_requests_through(self):
+        self.assertEqual(
+            self.put('/api/tasks', 'unknown', 'a', [1]), 'Success'
+        )
+        self.assertEqual(self.batch(
+            'PUT', '/api/jobs',
+            json.dumps({'Command': 'setjob', 'JobID': 'a', 'Props': {}}),
+            self.transport.send,
+        ), 'Success')
+        self.assertEqual(len(self.batch), 0)
+        self.assertEqual(len(self.transport.sent), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
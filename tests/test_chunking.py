@@ -0,0 +1,138 @@
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+import unittest
+
+from deadlineutils.chunking import (
+    ChunkAdvisor, batch_prefix, parse_timespan,
+)
+from deadlineutils.utils import parse_date
+
+
+class FakeJobs(object):
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+
+    def GetJobsInState(self, state):
+        return self.jobs
+
+    def CalculateJobStatistics(self, job_id):
+        return {'AvgFrameRendTime': '00:01:00'}
+
+
+class FakeTasks(object):
+
+    def __init__(self, tasks):
+        self.tasks = tasks
+        self.requests = 0
+
+    def GetJobTasks(self, job_id):
+        self.requests += 1
+        return self.tasks.get(job_id, [])
+
+
+class FakeConnection(object):
+
+    def __init__(self, jobs, tasks):
+        self.Jobs = FakeJobs(jobs)
+        self.Tasks = FakeTasks(tasks)
+
+
+def job(job_id, batch='shot010_comp_v001.nk', target='Write1'):
+    return {
+        '_id': job_id, 'Stat': 3, 'Plug': 'Nuke',
+        'Props': {'Batch': batch, 'PlugInfo': {'WriteNode': target}},
+    }
+
+
+def task(frames, seconds):
+    return {
+        'Frames': frames,
+        'StartRen': '2016-01-01T10:00:00Z',
+        'Comp': '2016-01-01T10:{:02d}:{:02d}Z'.format(
+            seconds // 60, seconds % 60
+        ),
+    }
+
+
+class TestHelpers(unittest.TestCase):
+
+    def test_batch_prefix(self):
+        self.assertEqual(batch_prefix('shot010_comp_v003.nk'), 'shot010_comp')
+        self.assertEqual(batch_prefix('shot010_comp.v12.ma'), 'shot010_comp')
+        self.assertEqual(batch_prefix('render'), 'render')
+
+    def test_parse_timespan(self):
+        self.assertEqual(parse_timespan(12), 12.0)
+        self.assertEqual(parse_timespan('01:02:03'), 3723.0)
+        self.assertEqual(parse_timespan('1.00:00:01'), 86401.0)
+
+    def test_parse_date(self):
+        self.assertEqual(parse_date('1970-01-01T00:01:00Z'), 60)
+        self.assertEqual(parse_date('1970-01-01T02:00:00+01:00'), 3600)
+        self.assertIsNone(parse_date(None))
+        self.assertIsNone(parse_date('yesterday'))
+
+
+class TestChunkAdvisor(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'chunk_stats.json')
+        self.advisor = ChunkAdvisor(self.path, target_duration=600)
+
+    def test_no_stats(self):
+        self.assertEqual(
+            self.advisor.advise('a.nk', 'Nuke', 'Write1', default=5), 5
+        )
+
+    def test_update_and_advise(self):
+        connection = FakeConnection(
+            [job('a'), job('b', 'shot010_comp_v002.nk')],
+            {'a': [task('1-10', 200)], 'b': [task('1-5', 150)]},
+        )
+        self.assertEqual(self.advisor.update(connection), 2)
+        # 20 and 30 seconds per frame, median 25
+        self.assertEqual(
+            self.advisor.advise('shot010_comp_v009.nk', 'Nuke', 'Write1'), 24
+        )
+        self.assertEqual(self.advisor.advise(
+            'shot010_comp_v009.nk', 'Nuke', 'Write1', frame_count=10
+        ), 10)
+
+        # Known jobs are not measured again
+        self.assertEqual(self.advisor.update(connection), 0)
+        self.assertEqual(connection.Tasks.requests, 2)
+
+        # Other processes read the saved cache
+        other = ChunkAdvisor(self.path, target_duration=600)
+        self.assertEqual(other.advise('shot010_comp.nk', 'Nuke', 'Write1'), 24)
+
+    def test_statistics_fallback(self):
+        connection = FakeConnection([job('a')], {})
+        self.advisor.update(connection)
+        self.assertEqual(self.advisor.advise('shot010_comp.nk', 'Nuke',
+                                             'Write1'), 10)
+
+    def test_unreadable_stats_count_as_empty(self):
+        for contents in ('{"broken', '[1, 2]', '{"key": 1}'):
+            with open(self.path, 'w') as f:
+                f.write(contents)
+            advisor = ChunkAdvisor(self.path)
+            self.assertIsNone(advisor.advise('a.nk', 'Nuke', 'Write1'))
+            self.assertEqual(advisor.stats, {} if contents != '{"key": 1}'
+                             else {'key': 1})
+
+        advisor = ChunkAdvisor(self.path)
+        advisor.record(advisor.make_key('a.nk', 'Nuke', 'Write1'), 'j', 6.0)
+        advisor.save()
+        self.assertEqual(
+            ChunkAdvisor(self.path).advise('a.nk', 'Nuke', 'Write1'), 100
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
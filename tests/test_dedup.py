@@ -0,0 +1,117 @@
+from __future__ import absolute_import
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+from deadlineutils.connection import Connection
+from deadlineutils.dedup import Deduplicator, fingerprint
+from deadlineutils.packages.Deadline.DeadlineSend import ErrorData
+from deadlineutils.spool import Spool
+
+
+class FakeJobs(object):
+
+    def __init__(self):
+        self.posts = 0
+        self.answer = None
+
+    def SubmitJob(self, job_info, plugin_info):
+        self.posts += 1
+        if isinstance(self.answer, Exception):
+            raise self.answer
+        if self.answer is not None:
+            return self.answer
+        return {'_id': 'job{}'.format(self.posts)}
+
+
+class TestFingerprint(unittest.TestCase):
+
+    def test_independent_of_key_order_and_types(self):
+        a = fingerprint(
+            {'Name': 'comp', 'ChunkSize': 10, 'Frames': '1-10'},
+            {'Version': 11.0, 'UseGpu': True},
+        )
+        b = fingerprint(
+            {'Frames': ' 1-10', 'ChunkSize': '10', 'Name': 'comp'},
+            {'UseGpu': 'true', 'Version': '11.0'},
+        )
+        self.assertEqual(a, b)
+
+    def test_differs_for_other_submissions(self):
+        self.assertNotEqual(
+            fingerprint({'Name': 'comp'}, {}),
+            fingerprint({'Name': 'comp2'}, {})
+        )
+        self.assertNotEqual(
+            fingerprint({'Name': 'comp'}, {'A': '1'}),
+            fingerprint({'Name': 'comp', 'A': '1'}, {})
+        )
+
+
+class TestDeduplicator(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.dedup = Deduplicator(
+            os.path.join(directory, 'dedup.db'), window=60, claim_timeout=0.5
+        )
+
+    def test_claim_record(self):
+        self.assertIsNone(self.dedup.claim('a'))
+        self.dedup.record('a', 'job1')
+        self.assertEqual(self.dedup.claim('a'), 'job1')
+
+    def test_release(self):
+        self.assertIsNone(self.dedup.claim('a'))
+        self.dedup.release('a')
+        self.assertIsNone(self.dedup.claim('a'))
+
+    def test_unfinished_claim_times_out(self):
+        self.assertIsNone(self.dedup.claim('a'))
+        self.assertIsNone(self.dedup.claim('a'))
+
+
+class TestSubmitJob(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.spool = Spool(os.path.join(directory, 'spool.db'))
+        self.connection = Connection(
+            'localhost', 8082, spool=self.spool,
+            dedup=Deduplicator(os.path.join(directory, 'dedup.db'),
+                               window=60, claim_timeout=0.5),
+        )
+        self.connection.Jobs = FakeJobs()
+
+    def submit(self, name='comp'):
+        return self.connection.submit_job({'Name': name}, {'Version': '11'})
+
+    def test_duplicates_return_the_first_job(self):
+        self.assertEqual(self.submit(), {'_id': 'job1'})
+        self.assertEqual(self.submit(), {'_id': 'job1'})
+        self.assertEqual(self.submit('other'), {'_id': 'job2'})
+        self.assertEqual(self.connection.Jobs.posts, 2)
+
+    def test_spooled_submissions_are_not_spooled_twice(self):
+        for answer in (socket.error(111, 'Connection refused'),
+                       ErrorData('Error', 503)):
+            self.connection.Jobs.answer = answer
+            self.assertIsNone(self.submit(name=str(answer)))
+            self.assertIsNone(self.submit(name=str(answer)))
+        self.assertEqual(self.connection.Jobs.posts, 2)
+        self.assertEqual(self.spool.count(), 2)
+
+    def test_rejected_submissions_release_their_claim(self):
+        self.connection.Jobs.answer = ErrorData('Error: bad plugin', 400)
+        self.assertEqual(self.submit().status, 400)
+        self.connection.Jobs.answer = None
+        self.assertEqual(self.submit(), {'_id': 'job2'})
+        self.assertEqual(self.spool.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
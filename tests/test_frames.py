@@ -0,0 +1,105 @@
+from __future__ import absolute_import
+import random
+import time
+import unittest
+
+from deadlineutils.frames import FrameSet
+
+
+class TestFrameSet(unittest.TestCase):
+
+    def test_parse_and_format(self):
+        self.assertEqual(str(FrameSet('1-100,200-300x10')), '1-100,200-300x10')
+        self.assertEqual(str(FrameSet('10, 5 ,1-3')), '1-3,5,10')
+        self.assertEqual(str(FrameSet('1-10:2')), '1-9x2')
+        self.assertEqual(str(FrameSet('5-1')), '1-5')
+        self.assertEqual(str(FrameSet([3, 1, 2, 2])), '1-3')
+        self.assertEqual(str(FrameSet('')), '')
+        self.assertRaises(ValueError, FrameSet, '1-a')
+
+    def test_len_contains_index(self):
+        frames = FrameSet('1-100,200-300x10')
+        self.assertEqual(len(frames), 111)
+        self.assertIn(250, frames)
+        self.assertNotIn(255, frames)
+        self.assertNotIn(150, frames)
+        self.assertEqual(frames.index(200), 100)
+        self.assertEqual(frames.index(300), 110)
+        self.assertRaises(ValueError, frames.index, 255)
+        self.assertEqual((frames.first, frames.last), (1, 300))
+
+    def test_set_operations(self):
+        frames = FrameSet('1-100,200-300x10')
+        self.assertEqual(str(frames - FrameSet('50-60')),
+                         '1-49,61-100,200-300x10')
+        self.assertEqual(str(FrameSet('1-20x2') & FrameSet('1-20x3')),
+                         '1-19x6')
+        self.assertEqual(str(FrameSet('1-5') | FrameSet('6-10')), '1-10')
+        self.assertEqual(FrameSet('1-3'), [1, 2, 3])
+        self.assertNotEqual(FrameSet('1-3'), FrameSet('1-4'))
+
+    def test_set_operations_match_python_sets(self):
+        rng = random.Random(30)
+        for _ in range(200):
+            a = set(rng.sample(range(-20, 80), rng.randint(0, 40)))
+            b = set(rng.sample(range(-20, 80), rng.randint(0, 40)))
+            self.assertEqual(list(FrameSet(a) | FrameSet(b)), sorted(a | b))
+            self.assertEqual(list(FrameSet(a) - FrameSet(b)), sorted(a - b))
+            self.assertEqual(list(FrameSet(a) & FrameSet(b)), sorted(a & b))
+
+    def test_stepped_operations_match_python_sets(self):
+        rng = random.Random(29)
+        for _ in range(200):
+            sets = []
+            for _ in range(2):
+                tokens = []
+                for _ in range(rng.randint(0, 6)):
+                    start = rng.randint(-20, 80)
+                    tokens.append('{}-{}x{}'.format(
+                        start, start + rng.randint(0, 60),
+                        rng.choice([1, 2, 3, 4, 6, 7])
+                    ))
+                sets.append(','.join(tokens))
+            a, b = FrameSet(sets[0]), FrameSet(sets[1])
+            set_a, set_b = set(a), set(b)
+            self.assertEqual(list(a | b), sorted(set_a | set_b))
+            self.assertEqual(list(a - b), sorted(set_a - set_b))
+            self.assertEqual(list(a & b), sorted(set_a & set_b))
+            self.assertEqual(len(a | b), len(set_a | set_b))
+            self.assertEqual(a | b, b | a)
+            self.assertEqual(FrameSet(str(a)), a)
+            for frame in sorted(set_a)[:5]:
+                self.assertEqual(a.index(frame), sorted(set_a).index(frame))
+
+    def test_large_stepped_sets(self):
+        full = FrameSet('1-10000000')
+        x3 = FrameSet('1-10000000x3')
+        x7 = FrameSet('1-10000000x7')
+        start = time.time()
+
+        self.assertEqual(len(full - x3), 6666666)
+        self.assertEqual(len(x3 | x7), 3333334 + 1428572 - 476191)
+        self.assertEqual(len(x3 - x7), 3333334 - 476191)
+        self.assertEqual(str(x3 & x7), '1-9999991x21')
+        self.assertEqual(full - x3 | x3, full)
+        self.assertNotEqual(x3 | x7, x7 | FrameSet('1-10000000x6'))
+        self.assertIn(9999999, full - x3)
+        self.assertEqual(str(FrameSet('1-10000000x2,2-10000000x2')),
+                         '1-10000000')
+
+        self.assertLess(time.time() - start, 1.0)
+
+    def test_chunks(self):
+        self.assertEqual(
+            [str(chunk) for chunk in FrameSet('1-25').chunks(10)],
+            ['1-10', '11-20', '21-25']
+        )
+        self.assertEqual(
+            [str(chunk) for chunk in FrameSet('1-3,10-20x5').chunks(2)],
+            ['1-2', '3,10', '15,20']
+        )
+        self.assertRaises(ValueError, list, FrameSet('1-3').chunks(0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+from __future__ import absolute_import
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from deadlineutils.infofiles import read_info_directory, read_info_file
+from deadlineutils.packages.Deadline.Jobs import fileRead
+
+
+class TestInfoFiles(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def write(self, name, data):
+        path = os.path.join(self.directory, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_read_info_file(self):
+        path = self.write('shot.job', (
+            b'\xef\xbb\xbfPlugin=Nuke\r\n'
+            b'  Name = shot010 comp \n'
+            b'no separator\n'
+            b'\n'
+            b'=no key\n'
+            b'Frames=1-10\n'
+            b'Comment=a=b "quoted" C:\\renders\n'
+            b'Frames=1-20'
+        ))
+        self.assertEqual(read_info_file(path), {
+            'Plugin': 'Nuke',
+            'Name': 'shot010 comp',
+            'Frames': '1-20',
+            'Comment': 'a=b "quoted" C:\\renders',
+        })
+
+    def test_empty_file(self):
+        self.assertEqual(read_info_file(self.write('empty.job', b'')), {})
+
+    def test_json_escapes_values(self):
+        path = self.write('plugin.job', b'Path="C:\\renders"\n')
+        self.assertEqual(json.loads(fileRead(path)),
+                         {'Path': '"C:\\renders"'})
+
+    def test_read_info_directory(self):
+        for index in range(10):
+            self.write('{}.job'.format(index), 'Name={}\n'.format(
+                index
+            ).encode('ascii'))
+        self.write('0.plugin', b'Name=plugin\n')
+
+        infos = read_info_directory(self.directory, max_workers=4)
+        self.assertEqual(len(infos), 10)
+        self.assertEqual(infos[os.path.join(self.directory, '7.job')],
+                         {'Name': '7'})
+
+
+if __name__ == '__main__':
+    unittest.main()
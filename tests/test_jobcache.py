@@ -0,0 +1,99 @@
+from __future__ import absolute_import
+import binascii
+import os
+import shutil
+import tempfile
+import unittest
+
+from deadlineutils.jobcache import CachedJobReports, JobResultCache
+from deadlineutils.packages.Deadline.DeadlineSend import ErrorData
+
+
+class FakeJobs(object):
+
+    def __init__(self):
+        self.requests = 0
+        self.results = []
+
+    def CalculateJobStatistics(self, job_id):
+        self.requests += 1
+        return self.results.pop(0)
+
+    def GetJob(self, job_id):
+        self.requests += 1
+        return {'_id': job_id, 'Stat': 3}
+
+
+class FakeConnection(object):
+
+    def __init__(self):
+        self.Jobs = FakeJobs()
+
+
+class TestJobResultCache(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'jobcache.db')
+        self.cache = JobResultCache(self.path)
+
+    def test_get_and_put(self):
+        self.assertEqual(self.cache.get('a', 'statistics'), (False, None))
+        self.cache.put('a', 'statistics', {'Frames': 10})
+        self.assertEqual(self.cache.get('a', 'statistics'),
+                         (True, {'Frames': 10}))
+        self.assertEqual(self.cache.get('a', 'statistics', ('1',)),
+                         (False, None))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+        # Other processes share the database
+        self.assertEqual(JobResultCache(self.path).get('a', 'statistics'),
+                         (True, {'Frames': 10}))
+
+    def test_evicts_least_recently_used(self):
+        results = [
+            [binascii.hexlify(os.urandom(40)).decode('ascii')]
+            for _ in range(3)
+        ]
+        cache = JobResultCache(self.path, max_bytes=200)
+        for job_id, result in zip('abc', results):
+            cache.put(job_id, 'history', result)
+            cache.get('a', 'history')
+        self.assertLessEqual(cache.size(), 200)
+        self.assertEqual(cache.get('a', 'history'), (True, results[0]))
+        self.assertFalse(cache.get('b', 'history')[0])
+        self.assertTrue(cache.get('c', 'history')[0])
+
+    def test_only_terminal_results_are_cached(self):
+        reports = CachedJobReports(FakeConnection(), self.cache)
+        jobs = reports.connection.Jobs
+        jobs.results = [{'Frames': 1}, {'Frames': 2}, {'Frames': 3}]
+
+        active = {'_id': 'a', 'Stat': 1}
+        self.assertEqual(reports.job_statistics(active), {'Frames': 1})
+        self.assertEqual(reports.job_statistics(active), {'Frames': 2})
+
+        self.assertEqual(reports.job_statistics('b'), {'Frames': 3})
+        self.assertEqual(reports.job_statistics('b'), {'Frames': 3})
+        self.assertEqual(jobs.requests, 4)
+
+    def test_errors_are_not_cached(self):
+        reports = CachedJobReports(FakeConnection(), self.cache)
+        jobs = reports.connection.Jobs
+        jobs.results = [
+            ErrorData('Internal server error', 500),
+            ErrorData('Job not found', 404),
+            'Error: timed out',
+            None,
+            {'Frames': 1},
+        ]
+        job = {'_id': 'a', 'Stat': 3}
+        for _ in range(5):
+            reports.job_statistics(job)
+        self.assertEqual(reports.job_statistics(job), {'Frames': 1})
+        self.assertEqual(jobs.requests, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
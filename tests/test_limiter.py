@@ -0,0 +1,137 @@
+from __future__ import absolute_import
+import socket
+import threading
+import time
+import unittest
+
+from deadlineutils.limiter import (
+    AdaptiveLimiter, RateLimiter, TokenBucket, endpoint_class, endpoint_key,
+    is_overload,
+)
+from deadlineutils.packages.Deadline.DeadlineSend import ErrorData
+from deadlineutils.timeouts import BudgetExceeded
+
+
+def answer(result):
+    def send(method, command, body=None):
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return send
+
+
+def record(limiter, latency, key):
+    limiter.acquire()
+    limiter.release(latency, key=key)
+
+
+class TestHelpers(unittest.TestCase):
+
+    def test_endpoint_class(self):
+        self.assertEqual(endpoint_class('GET', '/api/jobs'), 'reads')
+        self.assertEqual(endpoint_class('PUT', '/api/jobs'), 'writes')
+        self.assertEqual(endpoint_class(
+            'GET', '/api/jobreports?JobID=a&Data=logcontents'
+        ), 'reports')
+        self.assertEqual(endpoint_class(
+            'GET', '/api/jobreports?JobID=a&Data=log'
+        ), 'reads')
+
+    def test_endpoint_key(self):
+        self.assertEqual(endpoint_key('GET', '/api/jobs?JobID=a'),
+                         endpoint_key('GET', '/API/jobs?JobID=b'))
+        self.assertNotEqual(endpoint_key('GET', '/api/jobs?JobID=a'),
+                            endpoint_key('GET', '/api/jobs'))
+
+    def test_is_overload(self):
+        self.assertTrue(is_overload(error=socket.timeout()))
+        self.assertFalse(is_overload(error=BudgetExceeded()))
+        self.assertTrue(is_overload(ErrorData('Error', 503)))
+        self.assertFalse(is_overload(ErrorData('Error', 404)))
+        self.assertFalse(is_overload({}))
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+
+    def test_additive_increase(self):
+        limiter = AdaptiveLimiter(initial=2, max_limit=3)
+        for _ in range(20):
+            record(limiter, 0.01, 'a')
+        self.assertEqual(limiter.limit, 3)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_multiplicative_decrease(self):
+        limiter = AdaptiveLimiter(initial=8)
+        key = endpoint_key('GET', '/api/jobs')
+        record(limiter, 0.5, key)
+        limiter.limit = 8
+        self.assertRaises(socket.timeout, limiter, 'GET', '/api/jobs', None,
+                          answer(socket.timeout('timed out')))
+        self.assertEqual((limiter.limit, limiter.decreases), (4, 1))
+
+        # Answers of requests sent before the decrease do not decrease again
+        limiter('GET', '/api/jobs', None, answer(ErrorData('Error', 503)))
+        self.assertEqual(limiter.limit, 4)
+        self.assertEqual(limiter.in_flight, 0)
+
+    def test_latency_per_endpoint(self):
+        limiter = AdaptiveLimiter(initial=8, smoothing=1.0)
+        record(limiter, 0.01, 'fast')
+        record(limiter, 1.0, 'slow')
+        self.assertEqual(limiter.decreases, 0)
+        record(limiter, 0.1, 'fast')
+        self.assertEqual(limiter.decreases, 1)
+
+    def test_other_errors_leave_the_limit(self):
+        limiter = AdaptiveLimiter(initial=4)
+        self.assertRaises(BudgetExceeded, limiter, 'GET', '/api/jobs', None,
+                          answer(BudgetExceeded()))
+        self.assertEqual((limiter.limit, limiter.in_flight), (4, 0))
+
+    def test_limits_requests_in_flight(self):
+        limiter = AdaptiveLimiter(initial=2, max_limit=2)
+        lock = threading.Lock()
+        counts = {'now': 0, 'max': 0}
+
+        def send(method, command, body=None):
+            with lock:
+                counts['now'] += 1
+                counts['max'] = max(counts['max'], counts['now'])
+            time.sleep(0.02)
+            with lock:
+                counts['now'] -= 1
+            return {}
+
+        threads = [
+            threading.Thread(target=limiter,
+                             args=('GET', '/api/jobs', None, send))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(counts['max'], 2)
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(50, burst=2)
+        started = time.time()
+        for _ in range(4):
+            bucket.take()
+        self.assertGreaterEqual(time.time() - started, 0.035)
+
+    def test_caps_only_configured_classes(self):
+        limiter = RateLimiter({'writes': 1, 'reads': 0})
+        self.assertEqual(list(limiter.buckets), ['writes'])
+        started = time.time()
+        for _ in range(5):
+            limiter('GET', '/api/jobs', None, answer({}))
+        limiter('PUT', '/api/jobs', '{}', answer('Success'))
+        self.assertLess(time.time() - started, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
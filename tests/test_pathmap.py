@@ -0,0 +1,102 @@
+from __future__ import absolute_import
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from deadlineutils.pathmap import PathMapper
+
+
+RULES = [
+    {'Path': '\\\\server\\projects', 'WindowsPath': 'P:\\',
+     'LinuxPath': '/mnt/projects', 'MacPath': '/Volumes/projects'},
+    {'Path': '\\\\server\\projects\\shot010', 'WindowsPath': 'S:\\',
+     'LinuxPath': '/mnt/shot010', 'MacPath': '/Volumes/shot010'},
+    {'Path': '/mnt/Case', 'WindowsPath': 'C:\\case', 'LinuxPath': '/mnt/Case',
+     'MacPath': '/mnt/Case', 'CaseSensitive': True},
+    {'Path': '/regional', 'WindowsPath': 'R:\\', 'LinuxPath': '/east',
+     'MacPath': '/east', 'Region': 'east'},
+]
+
+
+class FakeMappedPaths(object):
+
+    def __init__(self):
+        self.requests = []
+
+    def MapPaths(self, paths, operating_system, region):
+        self.requests.append(list(paths))
+        return ['server:' + path for path in paths]
+
+
+class FakeConnection(object):
+
+    def __init__(self):
+        self.MappedPaths = FakeMappedPaths()
+
+
+class TestPathMapper(unittest.TestCase):
+
+    def test_first_rule_wins(self):
+        mapper = PathMapper(rules=RULES)
+        self.assertEqual(
+            mapper.map_path('\\\\server\\projects\\shot010\\comp.nk', 'Linux'),
+            '/mnt/projects/shot010/comp.nk'
+        )
+        self.assertEqual(
+            mapper.map_path('//SERVER/projects/a.nk', 'Windows'),
+            'P:\\a.nk'
+        )
+
+    def test_case_sensitive_rules(self):
+        mapper = PathMapper(rules=RULES)
+        self.assertEqual(
+            mapper.map_path('/mnt/Case/a.exr', 'Windows'), 'C:\\case\\a.exr'
+        )
+        self.assertEqual(
+            mapper.map_path('/mnt/case/a.exr', 'Windows'), '/mnt/case/a.exr'
+        )
+
+    def test_regions(self):
+        mapper = PathMapper(rules=RULES)
+        self.assertEqual(
+            mapper.map_path('/regional/a', 'Linux'), '/regional/a'
+        )
+        self.assertEqual(
+            mapper.map_path('/regional/a', 'Linux', 'east'), '/east/a'
+        )
+
+    def test_unknown_operating_system(self):
+        self.assertRaises(ValueError, PathMapper(rules=RULES).map_path,
+                          '/a', 'Amiga')
+
+    def test_server_rules_batch_one_request(self):
+        connection = FakeConnection()
+        rules = [{'Path': '.*', 'LinuxPath': '/x', 'Regex': True}] + RULES
+        mapper = PathMapper(connection, rules=rules)
+        paths = ['/a', '/b', '/a']
+        self.assertEqual(
+            mapper.map_paths(paths, 'Linux'),
+            ['server:/a', 'server:/b', 'server:/a']
+        )
+        self.assertEqual(connection.MappedPaths.requests, [['/a', '/b']])
+        # Cached afterwards
+        mapper.map_paths(paths, 'Linux')
+        self.assertEqual(mapper.server_requests, 1)
+
+    def test_load_json_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'rules.json')
+        with open(path, 'w') as f:
+            json.dump(RULES, f)
+        mapper = PathMapper(rules=path)
+        self.assertEqual(
+            mapper.map_path('\\\\server\\projects\\a', 'Mac'),
+            '/Volumes/projects/a'
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
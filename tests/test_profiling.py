@@ -0,0 +1,76 @@
+from __future__ import absolute_import
+import functools
+import json
+import unittest
+
+from deadlineutils.profiling import Profile, endpoint, suggest
+from deadlineutils.transport import Transport
+from deadlineutils.workers import run
+
+
+class FakeConnectionProperty(object):
+
+    def __get__(self, commandString, timeout=None):
+        return {}
+
+    def __put__(self, commandString, body, timeout=None):
+        return 'Success'
+
+
+def requeue(transport, job_id, task_ids):
+    body = json.dumps({'Command': 'requeue', 'JobID': job_id,
+                       'TaskList': task_ids})
+    return transport.send('PUT', '/api/tasks', body)
+
+
+class TestProfile(unittest.TestCase):
+
+    def setUp(self):
+        self.transport = Transport(FakeConnectionProperty())
+        self.profile = Profile(self.transport)
+
+    def test_endpoint_and_suggest(self):
+        name, ids = endpoint('GET', '/api/jobs?JobID=5a1c&Statistics=true')
+        self.assertEqual(name, 'GET /api/jobs?JobID=<id>&Statistics=true')
+        self.assertEqual(ids, ('5a1c',))
+        self.assertIsNone(suggest(name))
+        self.assertEqual(suggest('GET /api/jobs?JobID=<id>'),
+                         'Jobs.GetJobs(ids) or Connection.query(ids=ids)')
+
+    def test_loop_is_n_plus_one(self):
+        with self.profile:
+            for job_id in 'abcdef':
+                self.transport.send('GET', '/api/jobs?JobID=' + job_id)
+        findings = self.profile.n_plus_one()
+        self.assertEqual(len(findings), 1)
+        self.assertEqual(findings[0].count, 6)
+        self.assertEqual(findings[0].call_site[2], 'test_loop_is_n_plus_one')
+        self.assertRaises(AssertionError, self.profile.assert_no_n_plus_one)
+        self.assertEqual(self.transport.innermost, [])
+
+    def test_worker_threads_belong_to_their_caller(self):
+        with self.profile:
+            run(
+                functools.partial(self.transport.send, 'GET'),
+                ['/api/jobs?JobID=' + job_id for job_id in 'abcdef'],
+            )
+        findings = self.profile.n_plus_one()
+        self.assertEqual(len(findings), 1)
+        self.assertEqual(findings[0].call_site[2],
+                         'test_worker_threads_belong_to_their_caller')
+
+    def test_one_task_command_per_job_is_batched(self):
+        with self.profile:
+            run(lambda job_id: requeue(self.transport, job_id, [1, 2]),
+                'abcdef')
+        self.profile.assert_no_n_plus_one()
+        self.profile.assert_requests(6, 'PUT /api/tasks')
+
+        with self.profile:
+            for task_id in range(6):
+                requeue(self.transport, 'a', [task_id])
+        self.assertEqual(len(self.profile.n_plus_one()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
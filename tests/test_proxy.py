@@ -0,0 +1,143 @@
+from __future__ import absolute_import
+import json
+import threading
+import time
+import unittest
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+
+from deadlineutils.packages.Deadline.DeadlineConnect import DeadlineCon
+from deadlineutils.packages.Deadline.Jobs import STREAM_JOBS
+from deadlineutils.proxy import ProxyCache, ProxyServer
+
+
+class Upstream(ThreadingMixIn, HTTPServer):
+    '''Web Service stand-in recording the requests it received'''
+
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), UpstreamHandler)
+        self.requests = []
+        self.delay = 0
+
+    def handle_error(self, request, client_address):
+        # The proxy hangs up on responses slower than its timeout
+        pass
+
+
+class UpstreamHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, data, headers=()):
+        data = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        for name, value in headers:
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self.server.requests.append(('GET', self.path, None))
+        if self.headers.get('Authorization') is None:
+            return self._send(
+                401, 'Unauthorized',
+                [('WWW-Authenticate', 'Basic realm="Deadline"')]
+            )
+        self._send(200, ['none', 'cpu'])
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length).decode('utf-8'))
+        self.server.requests.append(('POST', self.path, body))
+        time.sleep(self.server.delay)
+        self._send(200, [{'_id': str(i)} for i in range(len(body['Jobs']))])
+
+
+def serve(server):
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+class TestProxy(unittest.TestCase):
+
+    def setUp(self):
+        self.upstream = serve(Upstream())
+        self.addCleanup(self.upstream.shutdown)
+
+    def connect(self, timeout=60):
+        self.cache = ProxyCache(
+            '127.0.0.1:{}'.format(self.upstream.server_address[1]),
+            timeout=timeout,
+        )
+        proxy = serve(ProxyServer(('127.0.0.1', 0), self.cache))
+        self.addCleanup(proxy.shutdown)
+        return DeadlineCon('127.0.0.1', proxy.server_address[1])
+
+    def posts(self):
+        return [
+            request for request in self.upstream.requests
+            if request[0] == 'POST'
+        ]
+
+    def test_streamed_submission(self):
+        connection = self.connect()
+        jobs = [
+            {'JobInfo': {'Name': str(i)}, 'PluginInfo': {}, 'AuxFiles': []}
+            for i in range(STREAM_JOBS + 50)
+        ]
+        result = connection.Jobs.SubmitJobs(jobs)
+        self.assertEqual(len(result), len(jobs))
+
+        posts = self.posts()
+        self.assertEqual(len(posts), 1)
+        self.assertEqual(
+            [job['JobInfo']['Name'] for job in posts[0][2]['Jobs']],
+            [job['JobInfo']['Name'] for job in jobs]
+        )
+
+    def test_post_not_sent_again_after_timeout(self):
+        self.upstream.delay = 1.0
+        connection = self.connect(timeout=0.3)
+        result = connection.Jobs.SubmitJobs(
+            [{'JobInfo': {'Name': 'a'}, 'PluginInfo': {}, 'AuxFiles': []}]
+        )
+        self.assertEqual(getattr(result, 'status', None), 502)
+        time.sleep(1.0)
+        self.assertEqual(len(self.posts()), 1)
+
+    def test_authentication_challenge_reaches_client(self):
+        connection = self.connect()
+        connection.EnableAuthentication(True)
+        connection.SetAuthenticationCredentials('user', 'password')
+        self.assertEqual(connection.Pools.GetPoolNames(), ['none', 'cpu'])
+
+    def test_cached_until_written(self):
+        connection = self.connect()
+        connection.EnableAuthentication(True)
+        connection.SetAuthenticationCredentials('user', 'password')
+        for _ in range(3):
+            self.assertEqual(connection.Pools.GetPoolNames(), ['none', 'cpu'])
+        # 401 challenges are passed on, the authorized response is cached
+        self.assertEqual(self.cache.metrics['hits'], 2)
+
+        self.cache.invalidate('/api/pools')
+        self.assertEqual(connection.Pools.GetPoolNames(), ['none', 'cpu'])
+        self.assertEqual(self.cache.metrics['invalidations'], 1)
+        self.assertEqual(self.cache.metrics['hits'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+from __future__ import absolute_import
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+try:
+    from urllib2 import URLError
+except ImportError:
+    from urllib.error import URLError
+
+from deadlineutils.reportindex import ReportIndex
+
+
+class FakeReports(object):
+
+    def __init__(self, reports):
+        self.reports = reports
+        self.failing = set()
+        self.requests = []
+
+    def _request(self, key):
+        self.requests.append(key)
+        if key in self.failing:
+            raise self.failing_error(key)
+
+    def failing_error(self, key):
+        if key[0] == 'list':
+            return socket.timeout('timed out')
+        return URLError(socket.error(111, 'Connection refused'))
+
+    def GetJobErrorReports(self, job_id):
+        self._request(('list', job_id))
+        return [{'_id': report_id} for report_id in self.reports[job_id]]
+
+    def GetJobLogReports(self, job_id):
+        return []
+
+    def GetJobErrorReportContents(self, job_id, report_id):
+        self._request(('contents', report_id))
+        return self.reports[job_id][report_id]
+
+
+class FakeConnection(object):
+
+    def __init__(self, reports):
+        self.JobReports = FakeReports(reports)
+
+
+class TestReportIndex(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.index = ReportIndex(os.path.join(directory, 'reports.db'))
+        self.connection = FakeConnection({
+            'a': {'a1': 'license checkout failed'},
+            'b': {'b1': 'license server down', 'b2': 'scene not found'},
+            'c': {'c1': 'license expired'},
+        })
+        self.jobs = [{'_id': job_id, 'Errs': 1} for job_id in 'abc']
+
+    def search(self, query):
+        return sorted(hit['report_id'] for hit in self.index.search(query))
+
+    def test_update_and_search(self):
+        self.assertEqual(self.index.update(self.connection, self.jobs), 4)
+        self.assertEqual(self.search('license'), ['a1', 'b1', 'c1'])
+
+        # Unchanged jobs are not listed again
+        requests = len(self.connection.JobReports.requests)
+        self.assertEqual(self.index.update(self.connection, self.jobs), 0)
+        self.assertEqual(len(self.connection.JobReports.requests), requests)
+
+    def test_connection_errors_keep_other_reports(self):
+        reports = self.connection.JobReports
+        reports.failing = set([('list', 'a'), ('contents', 'b2')])
+
+        self.assertEqual(self.index.update(self.connection, self.jobs), 2)
+        self.assertEqual(self.search('license'), ['b1', 'c1'])
+
+        # Failed jobs are requested again once the Web Service is back
+        reports.failing = set()
+        reports.requests = []
+        self.assertEqual(self.index.update(self.connection, self.jobs), 2)
+        self.assertEqual(self.search('license'), ['a1', 'b1', 'c1'])
+        self.assertEqual(self.search('scene'), ['b2'])
+        self.assertNotIn(('list', 'c'), reports.requests)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+from __future__ import absolute_import
+import unittest
+
+from deadlineutils.sampler import RENDERING, Ring, SlaveSampler
+
+
+class TestRing(unittest.TestCase):
+
+    def test_stores_changes_only(self):
+        ring = Ring(4, 1000)
+        self.assertTrue(ring.append(1000, 34359738369))
+        self.assertFalse(ring.append(1010, 34359738369))
+        self.assertTrue(ring.append(1020, 34359738370))
+        self.assertEqual(ring.samples(), ([1000, 1020],
+                                          [34359738369, 34359738370]))
+
+    def test_wraps_around(self):
+        ring = Ring(3, 0)
+        for when in range(5):
+            ring.append(when, when * 10)
+        self.assertEqual(ring.samples(), ([2, 3, 4], [20, 30, 40]))
+
+    def test_skips_samples_before_epoch(self):
+        ring = Ring(4, 1000)
+        self.assertFalse(ring.append(999, 1))
+        self.assertEqual(ring.size, 0)
+
+    def test_time_weighted_mean(self):
+        ring = Ring(4, 0)
+        ring.append(0, 0)
+        ring.append(30, 100)
+        self.assertEqual(ring.mean(0, 40), (25.0, 40))
+        self.assertEqual(ring.mean(10, 40), (100 * 10 / 30.0, 30))
+        self.assertEqual(ring.mean(40, 40), (None, 0))
+
+
+class FakeSlaves(object):
+
+    def __init__(self, infos):
+        self.infos = infos
+
+    def GetSlaveInfos(self):
+        return self.infos
+
+
+class FakeConnection(object):
+
+    def __init__(self, infos):
+        self.Slaves = FakeSlaves(infos)
+
+
+def info(name, stat, pools='maya', ram_free=34359738369):
+    return {'Name': name, 'Stat': stat, 'CPU': 50, 'RAMFree': ram_free,
+            'Pools': pools, 'Grps': ['gpu']}
+
+
+class TestSlaveSampler(unittest.TestCase):
+
+    def setUp(self):
+        self.sampler = SlaveSampler(None, capacity=8)
+        self.epoch = self.sampler.epoch
+
+    def test_unchanged_values_are_not_stored(self):
+        for offset in range(0, 60, 10):
+            self.sampler.update([info('a', RENDERING)], self.epoch + offset)
+        self.assertEqual(self.sampler.rings['a']['RAMFree'].size, 1)
+        self.assertEqual(self.sampler.history('a', 'RAMFree'),
+                         [(self.epoch, 34359738369.0)])
+
+    def test_utilisation_by_pool_and_group(self):
+        self.sampler.update([
+            info('a', RENDERING), info('b', 2, 'nuke,maya'),
+        ], self.epoch)
+        self.sampler.update([
+            info('a', RENDERING), info('b', RENDERING, 'nuke,maya'),
+        ], self.epoch + 30)
+        self.sampler.update([], self.epoch + 60)
+
+        self.assertEqual(self.sampler.utilisation(), 0.75)
+        self.assertEqual(self.sampler.by_pool(), {'maya': 0.75, 'nuke': 0.5})
+        self.assertEqual(self.sampler.by_group(), {'gpu': 0.75})
+        self.assertEqual(self.sampler.mean('CPU'), 50)
+
+    def test_poll_notifies_listeners(self):
+        infos = [info('a', RENDERING)]
+        sampler = SlaveSampler(FakeConnection(infos))
+        seen = []
+        sampler.listeners.append(seen.append)
+        self.assertEqual(sampler.poll(), infos)
+        self.assertEqual(seen, [infos])
+        self.assertEqual(sampler.slaves(pool='maya'), ['a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
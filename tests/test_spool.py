@@ -0,0 +1,206 @@
+from __future__ import absolute_import
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import unittest
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from deadlineutils.packages.Deadline import DeadlineSend
+from deadlineutils.packages.Deadline.DeadlineSend import ErrorData
+from deadlineutils.spool import (
+    FAILED, PENDING, SENDING, SENT, Spool, is_server_error, is_unreachable,
+    submitted,
+)
+
+
+class FakeJobs(object):
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.posts = []
+
+    def SubmitJobs(self, jobs):
+        names = [job['JobInfo']['Name'] for job in jobs]
+        self.posts.append(names)
+        return self.respond(names)
+
+
+class FakeConnection(object):
+
+    def __init__(self, respond):
+        self.Jobs = FakeJobs(respond)
+
+
+def accept(names):
+    return [{'_id': name} for name in names]
+
+
+class TestHelpers(unittest.TestCase):
+
+    def test_is_unreachable(self):
+        self.assertTrue(is_unreachable(socket.error(111, 'refused')))
+        self.assertFalse(is_unreachable(socket.timeout()))
+        self.assertFalse(is_unreachable(ValueError()))
+
+    def test_is_server_error(self):
+        self.assertTrue(is_server_error(ErrorData('Error', 503)))
+        self.assertFalse(is_server_error(ErrorData('Error', 400)))
+        self.assertFalse(is_server_error('Success'))
+        self.assertFalse(is_server_error(None))
+
+    def test_submitted(self):
+        self.assertTrue(submitted({'_id': 'a'}))
+        self.assertTrue(submitted('Success'))
+        self.assertFalse(submitted('Error: invalid job'))
+        self.assertFalse(submitted(ErrorData('Success', 500)))
+        self.assertFalse(submitted(None))
+
+
+class JSONErrorHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        data = b'{"Message": "Internal server error"}'
+        self.send_response(500)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class TestErrorResponses(unittest.TestCase):
+
+    def test_json_error_body_keeps_status(self):
+        server = HTTPServer(('127.0.0.1', 0), JSONErrorHandler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.shutdown)
+
+        result = DeadlineSend.pSend(
+            '127.0.0.1:{}'.format(server.server_address[1]),
+            '/api/jobs', 'POST', '{}'
+        )
+        self.assertEqual(result.status, 500)
+        self.assertIn('Internal server error', result)
+        self.assertFalse(submitted(result))
+
+
+class TestSpool(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.spool = Spool(
+            os.path.join(directory, 'spool.db'), batch_size=3, min_interval=0
+        )
+
+    def add(self, *names):
+        return [self.spool.add({'Name': name}, {}) for name in names]
+
+    def counts(self):
+        return dict(
+            (state, self.spool.count(state))
+            for state in (PENDING, SENDING, SENT, FAILED)
+        )
+
+    def test_flush_sends_in_batches(self):
+        self.add('a', 'b', 'c', 'd')
+        connection = FakeConnection(accept)
+        self.assertEqual(self.spool.flush(connection), 4)
+        self.assertEqual(connection.Jobs.posts, [['a', 'b', 'c'], ['d']])
+        self.assertEqual(self.counts()[SENT], 4)
+        self.assertEqual(self.spool.flush(connection), 0)
+
+    def test_max_batches(self):
+        self.add('a', 'b', 'c', 'd')
+        self.assertEqual(
+            self.spool.flush(FakeConnection(accept), max_batches=1), 3
+        )
+        self.assertEqual(self.counts()[PENDING], 1)
+
+    def test_unreachable_releases_entries(self):
+        self.add('a', 'b')
+
+        def refuse(names):
+            raise socket.error(111, 'Connection refused')
+
+        self.assertRaises(
+            socket.error, self.spool.flush, FakeConnection(refuse)
+        )
+        self.assertEqual(self.counts()[PENDING], 2)
+        self.assertEqual(self.spool.in_doubt(), [])
+
+    def test_timeout_leaves_entries_in_doubt(self):
+        entry_ids = self.add('a', 'b')
+
+        def hang(names):
+            raise socket.timeout('timed out')
+
+        self.assertRaises(
+            socket.timeout, self.spool.flush, FakeConnection(hang)
+        )
+        self.assertEqual(self.spool.in_doubt(), entry_ids)
+        self.assertEqual(self.spool.flush(FakeConnection(accept)), 0)
+
+        self.spool.release(entry_ids[:1])
+        self.spool.discard(entry_ids[1:])
+        self.assertEqual(self.spool.flush(FakeConnection(accept)), 1)
+        self.assertEqual(self.counts(), {
+            PENDING: 0, SENDING: 0, SENT: 1, FAILED: 0,
+        })
+
+    def test_server_error_stops_flush(self):
+        self.add('a', 'b', 'c', 'd')
+        connection = FakeConnection(
+            lambda names: ErrorData('Error: busy', 503)
+        )
+        self.assertEqual(self.spool.flush(connection), 0)
+        self.assertEqual(connection.Jobs.posts, [['a', 'b', 'c']])
+        self.assertEqual(self.counts()[PENDING], 4)
+
+    def test_rejected_entries_fail_without_blocking(self):
+        entry_ids = self.add('a', 'bad', 'c', 'd')
+
+        def respond(names):
+            if 'bad' in names:
+                return ErrorData('Error: invalid job info', 400)
+            return accept(names)
+
+        connection = FakeConnection(respond)
+        self.assertEqual(self.spool.flush(connection), 3)
+        self.assertEqual(connection.Jobs.posts, [
+            ['a', 'bad', 'c'], ['a'], ['bad'], ['c'], ['d'],
+        ])
+        self.assertEqual(
+            self.spool.failures(),
+            [(entry_ids[1], 'Error: invalid job info')]
+        )
+        self.assertEqual(self.counts(), {
+            PENDING: 0, SENDING: 0, SENT: 3, FAILED: 1,
+        })
+
+    def test_server_error_while_splitting_releases_the_rest(self):
+        self.add('bad', 'b', 'c')
+
+        def respond(names):
+            if names == ['b']:
+                return ErrorData('Error: busy', 500)
+            return ErrorData('Error: invalid job info', 400)
+
+        self.assertEqual(self.spool.flush(FakeConnection(respond)), 0)
+        self.assertEqual(self.counts(), {
+            PENDING: 2, SENDING: 0, SENT: 0, FAILED: 1,
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+from __future__ import absolute_import
+import threading
+import unittest
+
+from deadlineutils.sweeper import (
+    FAILED_JOB, FAILED_TASK, FailedTaskSweeper,
+)
+
+
+class FakeTransport(object):
+
+    def __init__(self):
+        self.hooks = []
+
+    def push(self, hook, innermost=False):
+        self.hooks.append(hook)
+
+    def remove(self, hook):
+        self.hooks.remove(hook)
+
+
+class FakeConnection(object):
+
+    def __init__(self, jobs, tasks, reports):
+        self.jobs = jobs
+        self.tasks = tasks
+        self.reports = reports
+        self.calls = []
+        self.lock = threading.Lock()
+        self.transport = FakeTransport()
+        self.Jobs = self.JobReports = self.Tasks = self
+
+    def record(self, *call):
+        with self.lock:
+            self.calls.append(call)
+
+    def GetJobsInStates(self, states):
+        return self.jobs
+
+    def GetJobTasks(self, job_id):
+        self.record('GetJobTasks', job_id)
+        return self.tasks.get(job_id, [])
+
+    def GetJobErrorReports(self, job_id):
+        self.record('GetJobErrorReports', job_id)
+        return self.reports.get(job_id, 'Error: no reports')
+
+    def ResumeFailedJobTasks(self, job_id, task_ids):
+        self.record('ResumeFailedJobTasks', job_id, sorted(task_ids))
+        return 'Success'
+
+    def RequeueJobTasks(self, job_id, task_ids):
+        self.record('RequeueJobTasks', job_id, sorted(task_ids))
+        return 'Success'
+
+
+def tasks(*stats):
+    return [
+        {'TaskID': task_id, 'Stat': stat}
+        for task_id, stat in enumerate(stats)
+    ]
+
+
+class TestFailedTaskSweeper(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = FakeConnection(
+            [
+                {'_id': 'a', 'Stat': FAILED_JOB},
+                {'_id': 'b', 'Stat': 1, 'FailedChunks': 1},
+                {'_id': 'c', 'Stat': 1, 'FailedChunks': 0},
+            ],
+            {
+                'a': tasks(FAILED_TASK, 5, FAILED_TASK, FAILED_TASK),
+                'b': tasks(FAILED_TASK),
+            },
+            {
+                'a': [
+                    {'Task': 0, 'Title': 'License checkout failed'},
+                    {'Task': 2, 'Title': 'Scene file x.ma not found'},
+                ],
+            },
+        )
+        self.sweeper = FailedTaskSweeper(self.connection, rules=[
+            (r'license', 'requeue'),
+            (r'Scene file .* not found', 'ignore'),
+        ])
+
+    def test_scan_reads_reports_once_per_job(self):
+        scanned = self.sweeper.scan()
+
+        self.assertEqual(scanned, {
+            'a': {'requeue': [0], 'ignore': [2], 'resume': [3]},
+        })
+        reads = sorted(call for call in self.connection.calls
+                       if call[0] == 'GetJobErrorReports')
+        self.assertEqual(reads, [('GetJobErrorReports', 'a'),
+                                 ('GetJobErrorReports', 'b')])
+        self.assertNotIn(('GetJobTasks', 'c'), self.connection.calls)
+        self.assertEqual(self.connection.transport.hooks, [])
+
+    def test_sweep_recovers_per_job(self):
+        self.sweeper.sweep()
+
+        recovered = sorted(call for call in self.connection.calls
+                           if call[0] in ('ResumeFailedJobTasks',
+                                          'RequeueJobTasks'))
+        self.assertEqual(recovered, [
+            ('RequeueJobTasks', 'a', [0]),
+            ('ResumeFailedJobTasks', 'a', [3]),
+        ])
+
+    def test_dry_run_and_no_rules(self):
+        sweeper = FailedTaskSweeper(self.connection)
+        self.assertEqual(sweeper.sweep(dry_run=True), {
+            'a': {'resume': [0, 2, 3]}, 'b': {'resume': [0]},
+        })
+        names = set(call[0] for call in self.connection.calls)
+        self.assertEqual(names, set(['GetJobTasks']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+from __future__ import absolute_import
+import json
+import threading
+import unittest
+
+try:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import parse_qs, urlparse
+except ImportError:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import parse_qs, urlparse
+
+from deadlineutils.connection import Connection
+from deadlineutils.tail import TailMultiplexer
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), Handler)
+        self.reports = {}
+        self.clients = set()
+        self.requests = 0
+        self.fail = set()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    wbufsize = -1
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.clients.add(self.client_address)
+        server.requests += 1
+        query = dict(
+            (key, values[0])
+            for key, values in parse_qs(urlparse(self.path).query).items()
+        )
+        status = 200
+        if query.get('Data') == 'log':
+            body = json.dumps([
+                {'_id': report_id}
+                for report_id in server.reports.get(query['TaskID'], {})
+            ])
+        elif query['ReportID'] in server.fail:
+            status, body = 500, 'Error: report unavailable'
+        else:
+            for reports in server.reports.values():
+                if query['ReportID'] in reports:
+                    body = json.dumps(reports[query['ReportID']])
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestTailMultiplexer(unittest.TestCase):
+
+    def setUp(self):
+        self.server = Server()
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.connection = Connection(*self.server.server_address)
+
+    def test_tails_share_one_connection(self):
+        reports = self.server.reports
+        tails = TailMultiplexer(self.connection, 0, 0)
+        for task_id in range(20):
+            reports[str(task_id)] = {'r{}'.format(task_id): 'task {}'.format(
+                task_id
+            )}
+            tails.add('job', task_id)
+        reports['0']['late'] = 'second line\nthird line'
+        self.server.fail.add('late')
+
+        lines = []
+        for job_id, task_id, line in tails:
+            lines.append((task_id, line))
+            if len(lines) == 20:
+                self.server.fail.clear()
+            if len(lines) == 22:
+                break
+
+        self.assertEqual(sorted(lines[:20]), sorted(
+            (task_id, 'task {}'.format(task_id)) for task_id in range(20)
+        ))
+        self.assertEqual(lines[20:], [(0, 'second line'), (0, 'third line')])
+        self.assertGreater(self.server.requests, 40)
+        self.assertEqual(len(self.server.clients), 1)
+        self.assertEqual(self.connection.transport.innermost, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
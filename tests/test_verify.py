@@ -0,0 +1,112 @@
+from __future__ import absolute_import
+import os
+import shutil
+import tempfile
+import unittest
+
+from deadlineutils.frames import render_order
+from deadlineutils.verify import OutputVerifier, frame_pattern
+
+
+class FakeTasks(object):
+
+    def __init__(self):
+        self.requeued = []
+
+    def RequeueJobTasks(self, job_id, task_ids):
+        self.requeued.append((job_id, task_ids))
+        return 'Success'
+
+
+class FakeConnection(object):
+
+    def __init__(self):
+        self.Tasks = FakeTasks()
+
+
+class TestHelpers(unittest.TestCase):
+
+    def test_frame_pattern(self):
+        regex, padding = frame_pattern('comp.####.exr')
+        self.assertEqual(int(regex.match('comp.0012.exr').group(1)), 12)
+        self.assertEqual(padding, 4)
+        self.assertIsNone(regex.match('comp.0012.exr.tmp'))
+        self.assertEqual(frame_pattern('beauty_%03d.png')[1], 3)
+        self.assertRaises(ValueError, frame_pattern, 'comp.exr')
+
+    def test_render_order(self):
+        self.assertEqual(list(render_order('5-3,1,4')), [5, 4, 3, 1])
+        self.assertEqual(list(render_order('10-1x3')), [10, 7, 4, 1])
+        self.assertEqual(list(render_order('1-3,2-4')), [1, 2, 3, 4])
+        self.assertEqual(list(render_order([3, 1, 3, 2])), [3, 1, 2])
+
+
+class TestOutputVerifier(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        for frame in range(1, 11):
+            if frame in (3, 8):
+                continue
+            size = 10 if frame == 5 else 2000
+            path = os.path.join(self.directory, 'comp.{:04d}.exr'.format(
+                frame
+            ))
+            with open(path, 'wb') as f:
+                f.write(b'x' * size)
+        # Neither frames of the output nor correctly padded
+        open(os.path.join(self.directory, 'comp.12.exr'), 'wb').close()
+        open(os.path.join(self.directory, 'other.0001.exr'), 'wb').close()
+
+        self.connection = FakeConnection()
+        self.job = {
+            '_id': 'job',
+            'Frames': '1-10',
+            'ChunkSize': 2,
+            'OutputDirectory0': self.directory,
+            'OutputFilename0': 'comp.####.exr',
+        }
+
+    def test_missing_frames_requeue_their_tasks(self):
+        result = OutputVerifier(self.connection).verify(self.job)
+
+        self.assertEqual(result['expected'], 10)
+        self.assertEqual(str(result['missing']), '3,8')
+        self.assertEqual(result['task_ids'], [1, 3])
+        self.assertEqual(self.connection.Tasks.requeued, [('job', [1, 3])])
+
+    def test_small_frames(self):
+        verifier = OutputVerifier(self.connection, min_size=1024)
+        result = verifier.verify(self.job, requeue=False)
+
+        self.assertEqual(str(result['small']), '5')
+        self.assertEqual(result['task_ids'], [1, 2, 3])
+        self.assertEqual(self.connection.Tasks.requeued, [])
+
+        result = OutputVerifier(min_ratio=0.5).verify(self.job)
+        self.assertEqual(str(result['small']), '5')
+
+    def test_tasks_follow_the_render_order(self):
+        self.job['Frames'] = '10-1'
+        result = OutputVerifier(self.connection).verify(self.job)
+        # Frame 8 renders in task 1, frame 3 in task 3
+        self.assertEqual(result['task_ids'], [1, 3])
+
+        # 9, 7, 5, 3, 1, 2, 4, 6, 8, 10
+        self.job['Frames'] = '9-1x2,2-10x2'
+        result = OutputVerifier(self.connection).verify(self.job)
+        self.assertEqual(result['task_ids'], [1, 4])
+
+    def test_unreadable_directories_are_skipped(self):
+        self.job['OutputDirectory1'] = os.path.join(self.directory, 'gone')
+        self.job['OutputFilename1'] = 'comp.####.exr'
+        result = OutputVerifier(self.connection).verify(self.job)
+
+        self.assertEqual(list(result['unreadable']),
+                         [self.job['OutputDirectory1']])
+        self.assertEqual(str(result['missing']), '3,8')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+from __future__ import absolute_import
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+from deadlineutils.packages.Deadline.DeadlineSend import ErrorData
+from deadlineutils.watch import WatchFolder
+
+
+class FakeJobs(object):
+
+    def __init__(self):
+        self.batches = []
+        self.answer = None
+
+    def SubmitJobs(self, jobs):
+        self.batches.append([job['JobInfo']['Name'] for job in jobs])
+        if self.answer is not None:
+            answer = self.answer(jobs)
+            if isinstance(answer, Exception):
+                raise answer
+            return answer
+        return [{'_id': job['JobInfo']['Name']} for job in jobs]
+
+
+class FakeConnection(object):
+
+    def __init__(self):
+        self.Jobs = FakeJobs()
+
+
+class TestWatchFolder(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.connection = FakeConnection()
+        self.watch = WatchFolder(
+            self.connection, self.directory, settle=0, batch_size=2,
+            use_inotify=False,
+        )
+
+    def drop(self, name, job=True, plugin=True):
+        if job:
+            with open(os.path.join(self.directory, name + '.job'), 'w') as f:
+                f.write('Name={}\nPlugin=Nuke\n'.format(name))
+        if plugin:
+            path = os.path.join(self.directory, name + '.plugin')
+            with open(path, 'w') as f:
+                f.write('WriteNode=Write1\n')
+
+    def listing(self, directory=None):
+        return sorted(
+            name for name in os.listdir(directory or self.directory)
+            if os.path.isfile(os.path.join(directory or self.directory, name))
+        )
+
+    def test_submits_complete_pairs_in_batches(self):
+        for name in ('a', 'b', 'c'):
+            self.drop(name)
+        self.drop('d', plugin=False)
+        with open(os.path.join(self.directory, 'e.job.tmp'), 'w') as f:
+            f.write('Name=e\n')
+
+        self.assertIsNone(self.watch.process())
+        self.assertEqual(self.connection.Jobs.batches, [['a', 'b'], ['c']])
+        self.assertEqual(self.watch.submitted, 3)
+        self.assertEqual(self.listing(), ['d.job', 'e.job.tmp'])
+        self.assertEqual(len(self.listing(self.watch.submitted_dir)), 6)
+
+    def test_waits_for_files_to_settle(self):
+        self.watch.settle = 10
+        self.drop('a')
+        pairs, next_settle = self.watch.ready_pairs(now=1000)
+        self.assertEqual(pairs, [])
+        self.assertEqual(next_settle, 10)
+        pairs, next_settle = self.watch.ready_pairs(now=1010)
+        self.assertEqual(len(pairs), 1)
+        self.assertIsNone(next_settle)
+
+    def test_rejected_jobs_fail_alone(self):
+        for name in ('a', 'b'):
+            self.drop(name)
+
+        def answer(jobs):
+            if any(job['JobInfo']['Name'] == 'b' for job in jobs):
+                return ErrorData('Error: bad plugin', 400)
+            return [{'_id': 'a'}]
+
+        self.connection.Jobs.answer = answer
+        self.watch.process()
+        self.assertEqual(self.connection.Jobs.batches,
+                         [['a', 'b'], ['a'], ['b']])
+        self.assertEqual((self.watch.submitted, self.watch.failed), (1, 1))
+        self.assertEqual(self.listing(self.watch.failed_dir),
+                         ['b.job', 'b.job.error', 'b.plugin'])
+        with open(os.path.join(self.watch.failed_dir, 'b.job.error')) as f:
+            self.assertIn('bad plugin', f.read())
+
+    def test_outages_leave_pairs_in_place(self):
+        self.drop('a')
+        for answer in (ErrorData('Error', 503),
+                       socket.error(111, 'Connection refused'),
+                       socket.timeout('timed out')):
+            self.connection.Jobs.answer = lambda jobs: answer
+            self.assertEqual(self.watch.process(), self.watch.poll_interval)
+            self.assertEqual(self.listing(), ['a.job', 'a.plugin'])
+        self.assertEqual((self.watch.submitted, self.watch.failed), (0, 0))
+
+        self.connection.Jobs.answer = None
+        self.watch.process()
+        self.assertEqual(self.listing(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()